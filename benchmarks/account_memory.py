@@ -0,0 +1,55 @@
+"""Bytes per cached account: the old dict layout against Account slots records.
+
+    python -m benchmarks.account_memory [accounts]
+"""
+import sys
+import tracemalloc
+from datetime import datetime
+
+from utils.economy_store import Account
+
+
+def measure(build):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    accounts = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return accounts, after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    base_id = 400_000_000_000_000_000
+    claimed = datetime(2026, 1, 1).isoformat()
+
+    def dict_layout():
+        return {
+            str(base_id + i): {
+                "wallet": 1000 + i,
+                "bank": 0,
+                "daily_streak": 1,
+                "last_daily": claimed,
+                "inventory": []
+            }
+            for i in range(count)
+        }
+
+    def slots_layout():
+        cache = {}
+        for i in range(count):
+            cache[base_id + i] = Account(1000 + i, 0, 1, claimed)
+        return cache
+
+    results = {}
+    for label, build in (("dict per account", dict_layout), ("Account slots", slots_layout)):
+        accounts, size = measure(build)
+        results[label] = size / count
+        print(f"{label:<18} {size / 2**20:>9,.1f} MiB  {size / count:>6.0f} bytes/account")
+        del accounts
+    print(f"saving: {1 - results['Account slots'] / results['dict per account']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Monte-Carlo house edge for the blackjack rules in utils.blackjack.RULES.
+
+Plays basic strategy (hit / stand / double, no splits, like the bot) over
+tens of millions of hands with NumPy, a batch of hands per step, and
+reports the house edge and the variance of the payout per hand. A smaller
+run through the real BlackjackTable checks that the engine pays what the
+vectorised model says. Re-run it whenever the rules or multipliers change.
+
+Cards are drawn with replacement, i.e. an infinite shoe; for six decks that
+moves the edge by a few hundredths of a percent.
+
+Needs numpy (not a bot dependency): pip install numpy
+
+    python -m benchmarks.blackjack_sim [hands] [engine_hands]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from utils.blackjack import RULES, BlackjackTable, hand_value
+
+BATCH = 1_000_000
+
+HIT, STAND, DOUBLE, DOUBLE_OR_STAND = 0, 1, 2, 3
+
+# Card value by rank, ace as 1
+VALUES = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int8)
+
+
+def strategy(rules):
+    """Basic strategy without splits: [soft][player total][dealer up card] -> action."""
+    table = np.full((2, 32, 11), STAND, dtype=np.int8)
+    for up in range(1, 11):
+        low = 2 <= up <= 6
+        # Hard totals
+        table[0, :12, up] = HIT
+        table[0, 9, up] = DOUBLE if 3 <= up <= 6 else HIT
+        table[0, 10, up] = DOUBLE if 2 <= up <= 9 else HIT
+        table[0, 11, up] = DOUBLE if up != 1 or rules.dealer_hits_soft_17 else HIT
+        table[0, 12, up] = STAND if 4 <= up <= 6 else HIT
+        table[0, 13:17, up] = STAND if low else HIT
+        # Soft totals (an ace counted as 11)
+        table[1, 12, up] = HIT
+        table[1, 13:15, up] = DOUBLE if 5 <= up <= 6 else HIT
+        table[1, 15:17, up] = DOUBLE if 4 <= up <= 6 else HIT
+        table[1, 17, up] = DOUBLE if 3 <= up <= 6 else HIT
+        if 3 <= up <= 6 or (up == 2 and rules.dealer_hits_soft_17):
+            table[1, 18, up] = DOUBLE_OR_STAND
+        elif up in (9, 10, 1):
+            table[1, 18, up] = HIT
+    if not rules.double_any_two:
+        # Doubling on 9-11 only
+        table[1][table[1] == DOUBLE] = HIT
+        table[1][table[1] == DOUBLE_OR_STAND] = STAND
+    return table
+
+
+def totals(hard, aces):
+    soft = aces & (hard <= 11)
+    return np.where(soft, hard + 10, hard), soft
+
+
+def play_batch(count, rules, table, rng):
+    """Net result per unit bet for `count` hands."""
+    def draw(size):
+        return VALUES[rng.integers(0, 13, size)]
+
+    first = draw((4, count))
+    hard = first[0] + first[1]
+    aces = (first[0] == 1) | (first[1] == 1)
+    up, hole = first[2], first[3]
+    dealer_hard = up + hole
+    dealer_aces = (up == 1) | (hole == 1)
+
+    player_total, soft = totals(hard, aces)
+    dealer_total, _ = totals(dealer_hard, dealer_aces)
+    player_bj = player_total == 21
+    dealer_bj = dealer_total == 21
+
+    net = np.zeros(count, dtype=np.float64)
+    net[player_bj & ~dealer_bj] = rules.blackjack_pays
+    net[dealer_bj & ~player_bj] = -1
+    playing = ~(player_bj | dealer_bj)
+
+    # First decision, the only one where doubling is allowed
+    action = table[soft.astype(np.int8), player_total, up]
+    doubled = playing & ((action == DOUBLE) | (action == DOUBLE_OR_STAND))
+    hitting = playing & (action == HIT)
+    if doubled.any():
+        card = draw(int(doubled.sum()))
+        hard[doubled] += card
+        aces[doubled] |= card == 1
+
+    while hitting.any():
+        index = np.flatnonzero(hitting)
+        card = draw(index.size)
+        hard[index] += card
+        aces[index] |= card == 1
+        total, is_soft = totals(hard[index], aces[index])
+        action = table[is_soft.astype(np.int8), np.minimum(total, 31), up[index]]
+        hitting[index] = (total < 21) & ((action == HIT) | (action == DOUBLE))
+
+    player_total, _ = totals(hard, aces)
+    stake = np.where(doubled, 2, 1)
+    busted = playing & (player_total > 21)
+    net[busted] = -stake[busted]
+
+    # Dealer draws for every hand still standing
+    standing = playing & ~busted
+    drawing = standing.copy()
+    while True:
+        total, dealer_soft = totals(dealer_hard, dealer_aces)
+        needs = total < 17
+        if rules.dealer_hits_soft_17:
+            needs |= (total == 17) & dealer_soft
+        drawing &= needs
+        if not drawing.any():
+            break
+        index = np.flatnonzero(drawing)
+        card = draw(index.size)
+        dealer_hard[index] += card
+        dealer_aces[index] |= card == 1
+
+    dealer_total, _ = totals(dealer_hard, dealer_aces)
+    won = standing & ((dealer_total > 21) | (player_total > dealer_total))
+    lost = standing & (dealer_total <= 21) & (player_total < dealer_total)
+    net[won] = stake[won]
+    net[lost] = -stake[lost]
+    return net
+
+
+def simulate(hands, rules=RULES, seed=0):
+    rng = np.random.default_rng(seed)
+    table = strategy(rules)
+    total = total_squares = 0.0
+    played = 0
+    while played < hands:
+        count = min(BATCH, hands - played)
+        net = play_batch(count, rules, table, rng)
+        total += net.sum()
+        total_squares += np.square(net).sum()
+        played += count
+    mean = total / played
+    return mean, total_squares / played - mean * mean
+
+
+def simulate_engine(hands, rules=RULES, seed=0):
+    """The same strategy through BlackjackTable, paid with Rules.payout."""
+    table = strategy(rules)
+    engine = BlackjackTable(rules, rng=random.Random(seed))
+    total = total_squares = 0.0
+    for user_id in range(hands):
+        session = engine.deal(0, user_id, 1)
+        if engine.natural(session) is None:
+            up = min(session.dealer[0] % 13 + 1, 10)
+            first = True
+            while True:
+                player, soft = hand_value(session.player)
+                if player >= 21:
+                    break
+                action = int(table[int(soft), player, up])
+                if first and action in (DOUBLE, DOUBLE_OR_STAND) and session.can_double(rules):
+                    engine.double(0, session)
+                    break
+                if action == STAND or action == DOUBLE_OR_STAND:
+                    break
+                first = False
+                engine.hit(0, session)
+        outcome = engine.settle(0, session)
+        net = rules.payout(outcome, session.doubled) - session.stake
+        total += net
+        total_squares += net * net
+    mean = total / hands
+    return mean, total_squares / hands - mean * mean
+
+
+def report(label, hands, mean, variance, elapsed):
+    error = 1.96 * (variance / hands) ** 0.5
+    print(f"{label:<8} {hands:>12,} hands  house edge {-mean * 100:6.3f}% ± {error * 100:.3f}  "
+          f"variance {variance:.4f}  sd {variance ** 0.5:.4f}  {hands / elapsed:12,.0f} hands/s")
+    return error
+
+
+def main():
+    hands = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    engine_hands = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    rules = RULES
+    print(f"{rules.decks} decks, dealer {'hits' if rules.dealer_hits_soft_17 else 'stands on'} soft 17, "
+          f"blackjack pays {rules.blackjack_pays:g}:1, double {'any two' if rules.double_any_two else '9-11'}")
+
+    started = time.perf_counter()
+    mean, variance = simulate(hands, rules)
+    error = report("numpy", hands, mean, variance, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    engine_mean, engine_variance = simulate_engine(engine_hands, rules)
+    engine_error = report("engine", engine_hands, engine_mean, engine_variance, time.perf_counter() - started)
+
+    # The engine uses a finite shoe, so allow a little on top of the sampling error
+    tolerance = (error ** 2 + engine_error ** 2) ** 0.5 + 0.002
+    if abs(mean - engine_mean) > tolerance:
+        print(f"MISMATCH: engine edge differs from the model by {abs(mean - engine_mean) * 100:.3f}%")
+        sys.exit(1)
+    print("engine matches the model")
+
+
+if __name__ == "__main__":
+    main()
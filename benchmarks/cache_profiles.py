@@ -0,0 +1,156 @@
+"""Gateway cache memory for each cache profile on a synthetic 100k-member guild.
+
+Feeds discord.py's own ConnectionState the payloads a bot would see: the
+GUILD_CREATE, startup chunking (full only), presences for the online share,
+a stream of member joins and messages. Memory is what tracemalloc sees
+retained once the payloads are dropped.
+
+    python -m benchmarks.cache_profiles [members] [messages]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+import discord
+
+from utils.cache_profiles import PROFILES
+
+GUILD_ID = 900_000_000_000_000_000
+BASE_USER = 500_000_000_000_000_000
+BOT_ID = 1
+ONLINE_SHARE = 0.25
+JOIN_SHARE = 0.01
+
+
+def user_payload(user_id):
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id % 1_000_000}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": "a" * 32,
+        "bot": False
+    }
+
+
+def member_payload(user_id, role_ids):
+    return {
+        "user": user_payload(user_id),
+        "roles": role_ids,
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0
+    }
+
+
+def presence_payload(user_id):
+    return {
+        "user": {"id": str(user_id)},
+        "status": "online",
+        "activities": [{"name": "Elite Red Edition", "type": 0}],
+        "client_status": {"desktop": "online"}
+    }
+
+
+def guild_payload(members, roles, channels):
+    return {
+        "id": str(GUILD_ID),
+        "name": "Synthetic",
+        "owner_id": str(BASE_USER),
+        "member_count": members,
+        "roles": [
+            {"id": str(GUILD_ID + i), "name": f"role{i}", "permissions": "0", "position": i, "color": 0,
+             "hoist": False, "managed": False, "mentionable": False}
+            for i in range(roles)
+        ],
+        "channels": [
+            {"id": str(GUILD_ID + 10_000 + i), "type": 0, "name": f"channel{i}", "position": i,
+             "permission_overwrites": []}
+            for i in range(channels)
+        ],
+        "members": [member_payload(BOT_ID, [])],
+        "presences": [],
+        "voice_states": [],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "threads": []
+    }
+
+
+def simulate(profile, members, messages, roles=500, channels=1000):
+    client = discord.Client(**profile.client_options())
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+
+    def role_ids(i):
+        return [str(GUILD_ID + 1 + (i * 7 + k) % (roles - 1)) for k in range(3)]
+
+    guild = discord.Guild(data=guild_payload(members, roles, channels), state=state)
+    state._add_guild(guild)
+
+    if profile.chunk_guilds_at_startup:
+        # What ChunkRequest does with every GUILD_MEMBERS_CHUNK
+        for i in range(members):
+            guild._add_member(discord.Member(data=member_payload(BASE_USER + i, role_ids(i)), guild=guild, state=state))
+    if profile.intents.presences:
+        for i in range(int(members * ONLINE_SHARE)):
+            member = guild.get_member(BASE_USER + i)
+            if member is not None:
+                member._presence_update(presence_payload(BASE_USER + i), ())
+
+    # Runtime traffic: joins and messages across the channels
+    for i in range(int(members * JOIN_SHARE)):
+        data = member_payload(BASE_USER + members + i, [])
+        data["guild_id"] = str(GUILD_ID)
+        state.parse_guild_member_add(data)
+    channel_ids = [channel.id for channel in guild.channels]
+    for i in range(messages):
+        author = BASE_USER + (i * 31) % members
+        state.parse_message_create({
+            "id": str(GUILD_ID + 100_000 + i),
+            "channel_id": str(channel_ids[i % len(channel_ids)]),
+            "guild_id": str(GUILD_ID),
+            "author": user_payload(author),
+            "member": {"roles": role_ids(author - BASE_USER), "joined_at": "2024-01-01T00:00:00+00:00",
+                       "deaf": False, "mute": False, "flags": 0},
+            "content": f"message {i} with some ordinary chatter in it",
+            "timestamp": "2026-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0
+        })
+    return client, guild
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+
+    print(f"{members:,} members, 500 roles, 1,000 channels, {messages:,} messages")
+    print(f"{'profile':<10}{'memory':>12}{'members':>10}{'messages':>10}{'build':>9}")
+    for name, build in PROFILES.items():
+        profile = build()
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        client, guild = simulate(profile, members, messages)
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        cached_messages = len(client._connection._messages or ())
+        print(f"{name:<10}{size / 2**20:>9,.1f} MiB{len(guild.members):>10,}{cached_messages:>10,}{elapsed:>8.1f}s")
+        del client, guild
+
+
+if __name__ == "__main__":
+    main()
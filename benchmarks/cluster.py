@@ -0,0 +1,276 @@
+"""Cluster mode against a stand-in gateway: event throughput with 1 worker process vs N.
+
+A local stand-in gateway hands each worker the synthetic events of the
+shards it identifies for: chat messages, which go through the word filter
+and the message router, and economy commands (balance, daily, rob,
+blackjack), which go through the shared economy store and build their
+reply embed. Unacknowledged events are handed out again when a worker
+reconnects, like a resumed session. The real Supervisor runs the workers,
+so --crash (one worker is told to die halfway) exercises the restart path.
+At the end every wallet is checked against the store's ledger.
+
+Throughput only scales up to the number of cores; this prints how many
+there are.
+
+    python -m benchmarks.cluster [events] [workers] [--crash]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import discord
+
+from utils.blackjack import BlackjackTable
+from utils.cluster import Supervisor, shard_for, watch_supervisor
+from utils.cluster_store import RemoteEconomy, StoreServer, parse_address
+from utils.economy_service import EconomyService
+from utils.message_router import MessageRouter
+from utils.word_filter import WordFilter
+
+SHARDS = 16
+GUILDS = 2_000
+USERS = 50_000
+# Events a worker may hold without acknowledging them
+WINDOW = 256
+COMMAND_SHARE = 0.2
+WORDS = ["scam", "free nitro", "raid", "spam link", "token grabber"]
+CHAT = ["hello", "gg", "anyone", "tonight", "lol", "server", "nice", "free", "nitro", "link", "raid"]
+
+
+def make_events(count, rng):
+    guild_ids = [(rng.randrange(1, 2 ** 41) << 22) | rng.randrange(2 ** 22) for _ in range(GUILDS)]
+    events = {shard: [] for shard in range(SHARDS)}
+    for seq in range(count):
+        guild_id = rng.choice(guild_ids)
+        user_id = rng.randrange(1, USERS)
+        if rng.random() < COMMAND_SHARE:
+            data = {"name": rng.choice(("balance", "daily", "rob", "blackjack")), "target": user_id % (USERS - 1) + 1}
+            event = {"t": "INTERACTION_CREATE", "s": seq, "d": {"guild_id": guild_id, "user_id": user_id, **data}}
+        else:
+            # Roughly the shape and size of a MESSAGE_CREATE payload
+            event = {"t": "MESSAGE_CREATE", "s": seq, "d": {
+                "id": seq, "guild_id": guild_id, "channel_id": guild_id + rng.randrange(50),
+                "content": " ".join(rng.choices(CHAT, k=rng.randint(3, 20))),
+                "author": {"id": user_id, "username": f"user{user_id}", "global_name": None, "avatar": "a" * 32, "bot": False},
+                "member": {"roles": [str(guild_id + i) for i in range(rng.randint(0, 8))], "joined_at": "2024-01-01T00:00:00+00:00"},
+                "mentions": [], "attachments": [], "embeds": [], "timestamp": "2026-01-01T00:00:00+00:00", "flags": 0
+            }}
+        events[shard_for(guild_id, SHARDS)].append(json.dumps(event).encode() + b"\n")
+    return events
+
+
+class StandInGateway:
+    """Serves pre-built events per shard to whichever worker identifies for that shard."""
+
+    def __init__(self, events, crash_after=None):
+        self.events = events
+        self.remaining = sum(len(queue) for queue in events.values())
+        self.total = self.remaining
+        self.crash_after = crash_after
+        self.crashed = False
+        self.identified = set()
+        self.all_identified = asyncio.Event()
+        self.done = asyncio.Event()
+        self.address = None
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.address = f"{host}:{port}"
+        return self
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        shards = json.loads(await reader.readline())["shards"]
+        self.identified.update(shards)
+        if len(self.identified) == SHARDS:
+            self.all_identified.set()
+        # Unacknowledged events of this session, by sequence number, to hand back on disconnect
+        inflight = {}
+        credit = asyncio.Semaphore(WINDOW)
+
+        async def feed():
+            for shard in shards:
+                queue = self.events[shard]
+                while queue:
+                    await credit.acquire()
+                    line = queue.pop()
+                    inflight[json.loads(line)["s"]] = (shard, line)
+                    writer.write(line)
+                    await writer.drain()
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while line := await reader.readline():
+                seq = json.loads(line)["ack"]
+                if inflight.pop(seq, None) is None:
+                    continue
+                credit.release()
+                self.remaining -= 1
+                if self.crash_after is not None and not self.crashed and self.total - self.remaining >= self.crash_after:
+                    self.crashed = True
+                    writer.write(b'{"t": "CRASH"}\n')
+                if not self.remaining:
+                    self.done.set()
+        except ConnectionError:
+            pass
+        finally:
+            feeder.cancel()
+            for shard, line in inflight.values():
+                self.events[shard].append(line)
+            writer.close()
+
+
+async def handle(event, economy, word_filter, router, table):
+    data = event["d"]
+    if event["t"] == "MESSAGE_CREATE":
+        word_filter.find(data["content"])
+        await router.dispatch(Message(data))
+        return
+
+    user_id = data["user_id"]
+    name = data["name"]
+    if name == "balance":
+        account = await economy.account(user_id)
+        description = f"💰 **Wallet:** ${account.wallet:,}\n🏦 **Bank:** ${account.bank:,}"
+    elif name == "daily":
+        claimed = await economy.claim_daily(user_id)
+        description = "Already claimed" if claimed is None else f"**New Balance:** ${claimed[2].wallet:,}"
+    elif name == "rob":
+        outcome, amount, robber, _ = await economy.rob(user_id, data["target"])
+        description = f"{outcome}: ${amount:,}, balance ${robber.wallet:,}"
+    else:
+        bet = 100
+        if not await economy.transfer({user_id: -bet}, "blackjack"):
+            description = "Insufficient funds"
+        else:
+            session = table.deal(data["guild_id"], user_id, bet)
+            outcome = table.settle(data["guild_id"], session)
+            winnings = int(bet * table.rules.payout(outcome))
+            if winnings:
+                await economy.transfer({user_id: winnings}, "blackjack")
+            description = f"{outcome}: ${winnings:,}"
+    embed = discord.Embed(title=name.title(), description=description, color=0xff0000)
+    embed.set_footer(text="Task completed successfully")
+    json.dumps({"type": 4, "data": {"embeds": [embed.to_dict()]}})
+
+
+class Stub:
+    __slots__ = ("id",)
+
+    def __init__(self, object_id):
+        self.id = object_id
+
+
+class Message:
+    __slots__ = ("guild", "channel", "author", "content")
+
+    def __init__(self, data):
+        self.guild = Stub(data["guild_id"])
+        self.channel = Stub(data["channel_id"])
+        self.author = Stub(data["author"]["id"])
+        self.content = data["content"]
+
+
+async def worker():
+    """One cluster worker: identify for our shards and process events until the supervisor goes away."""
+    shards = [int(shard) for shard in os.environ["SHARD_IDS"].split(",")]
+    economy = RemoteEconomy(os.environ["CLUSTER_STORE"])
+    await economy.start()
+    word_filter = WordFilter(WORDS)
+    router = MessageRouter()
+    # Some idle waiters, as confirmations and community service would leave
+    for user_id in range(0, USERS, 100):
+        router.subscribe(lambda message: None, author_id=user_id)
+    table = BlackjackTable()
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    watch_supervisor(lambda: loop.call_soon_threadsafe(stopped.set))
+
+    reader, writer = await asyncio.open_connection(*parse_address(os.environ["STANDIN_GATEWAY"]))
+    writer.write(json.dumps({"shards": shards}).encode() + b"\n")
+
+    async def process(event):
+        await handle(event, economy, word_filter, router, table)
+        writer.write(json.dumps({"ack": event["s"]}).encode() + b"\n")
+
+    async def listen():
+        tasks = set()
+        while line := await reader.readline():
+            event = json.loads(line)
+            if event["t"] == "CRASH":
+                os._exit(1)
+            task = asyncio.create_task(process(event))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    listener = asyncio.create_task(listen())
+    await stopped.wait()
+    listener.cancel()
+    writer.close()
+    await economy.close()
+
+
+async def run(event_lines, workers, crash):
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = EconomyService(data_dir=data_dir)
+        store = await StoreServer(service).start()
+        gateway = await StandInGateway(
+            {shard: list(queue) for shard, queue in event_lines.items()},
+            crash_after=sum(map(len, event_lines.values())) // 2 if crash else None
+        ).start()
+        supervisor = Supervisor(
+            [sys.executable, "-m", "benchmarks.cluster", "worker"], workers, SHARDS,
+            env={"CLUSTER_STORE": store.address, "STANDIN_GATEWAY": gateway.address}
+        )
+        await supervisor.start()
+        await gateway.all_identified.wait()
+        started = time.perf_counter()
+        await gateway.done.wait()
+        elapsed = time.perf_counter() - started
+        await supervisor.stop()
+        await gateway.close()
+
+        # Every wallet must match what its ledger says
+        wallets = {user_id: account.wallet for user_id, account in service.user_data.items()}
+        service.ledger.flush()
+        balances = {}
+        for entry in service.ledger.replay():
+            balances[entry.user_id] = entry.balance
+        assert all(balances.get(user_id, 1000) == wallet for user_id, wallet in wallets.items()), "wallets diverged from the ledger"
+        await store.close()
+        return elapsed, supervisor.restarts
+
+
+def main():
+    if sys.argv[1:2] == ["worker"]:
+        asyncio.run(worker())
+        return
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    events = int(args[0]) if args else 100_000
+    workers = int(args[1]) if len(args) > 1 else max(2, os.cpu_count() or 1)
+    crash = "--crash" in sys.argv
+
+    event_lines = make_events(events, random.Random(0))
+    print(f"{events:,} events over {SHARDS} shards, {os.cpu_count()} CPU(s)")
+    results = {}
+    for count in sorted({1, workers}):
+        elapsed, restarts = asyncio.run(run(event_lines, count, crash))
+        results[count] = elapsed
+        note = f", {restarts} restart(s)" if crash else ""
+        print(f"{count:>2} worker(s): {elapsed:6.2f}s  {events / elapsed:10,.0f} events/s{note}")
+    if len(results) > 1:
+        print(f"speedup: {results[1] / results[workers]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Stress test for Economy locking: thousands of concurrent robbery and blackjack transfers.
+
+The service's own critical sections never await, so on its real stores the
+locks are never contended. Here it runs over a store that yields one round
+trip between reading the wallets and writing them back, the way a remote
+store would. The benchmark applies every transfer it saw succeed to its own
+expected wallets and checks the service against them (no wallet negative,
+every wallet as expected, total = start + the house's net), then compares
+throughput with one lock stripe against the default table. A run without
+locks must fail the same check, to show it catches lost updates.
+Also checks, through the cluster store whose transfers really yield, that
+concurrent /blackjack calls from one user cannot lose a stake and that a
+hand settled by a click while the expiry sweep is paying out is paid once.
+
+    python -m benchmarks.economy_concurrency [operations] [users]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from benchmarks.fakes import FakeBot, FakeInteraction, FakeMessage, FakeUser
+from cogs.economy import Economy
+from utils.cluster_store import StoreServer
+from utils.economy_service import EconomyService
+from utils.locks import StripedLock
+
+# Seconds the simulated store takes between reading balances and writing them back
+STORE_LATENCY = 0.001
+
+
+class RoundTripEconomy(EconomyService):
+    """EconomyService whose transfers read, wait one store round trip, then write read value + delta."""
+
+    async def transfer(self, changes, kind):
+        async with self.locks.hold(*changes):
+            wallets = {user_id: self.get_user_data(user_id).wallet for user_id in changes}
+            await asyncio.sleep(STORE_LATENCY)
+            if any(wallets[user_id] + delta < 0 for user_id, delta in changes.items()):
+                return False
+            for user_id, delta in changes.items():
+                self.get_account_for_update(user_id).wallet = wallets[user_id] + delta
+            self.save_data(*changes)
+            return True
+
+
+class NoLock:
+    @asynccontextmanager
+    async def hold(self, *keys):
+        yield
+
+
+async def run(stripes, operations, users, seed=0):
+    """Returns (seconds, wallets that differ from the expected balance)."""
+    rng = random.Random(seed)
+    service = RoundTripEconomy(data_dir=".")
+    service.locks = StripedLock(stripes) if stripes else NoLock()
+    user_ids = list(range(1, users + 1))
+    expected = dict.fromkeys(user_ids, 1000)
+    house = 0
+
+    async def rob(robber, target, amount):
+        if await service.transfer({robber: amount, target: -amount}, "rob"):
+            expected[robber] += amount
+            expected[target] -= amount
+
+    async def blackjack(player, bet, winnings):
+        nonlocal house
+        if not await service.transfer({player: -bet}, "blackjack"):
+            return
+        expected[player] -= bet
+        house += bet
+        if winnings and await service.transfer({player: winnings}, "blackjack"):
+            expected[player] += winnings
+            house -= winnings
+
+    calls = []
+    for _ in range(operations):
+        player, target = rng.sample(user_ids, 2)
+        if rng.random() < 0.5:
+            calls.append(rob(player, target, rng.randint(50, 500)))
+        else:
+            bet = rng.randint(1, 800)
+            calls.append(blackjack(player, bet, rng.choice((0, 0, bet * 2, bet * 5 // 2))))
+
+    started = time.perf_counter()
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - started
+
+    wallets = {user_id: service.get_user_data(user_id).wallet for user_id in user_ids}
+    await service.close()
+    wrong = sum(1 for user_id in user_ids if wallets[user_id] != expected[user_id])
+    if stripes:
+        assert min(wallets.values()) >= 0, "a wallet went negative"
+        assert not wrong, f"{wrong} wallets differ from the transfers that succeeded"
+        assert sum(wallets.values()) == 1000 * users - house, "money was not conserved"
+    return elapsed, wrong
+
+
+@asynccontextmanager
+async def remote_cog():
+    """Economy cog over RemoteEconomy; unloads it and stops its store server even if a check fails."""
+    store = await StoreServer(EconomyService(data_dir=".")).start()
+    os.environ["CLUSTER_STORE"] = store.address
+    try:
+        cog = Economy(FakeBot())
+    finally:
+        del os.environ["CLUSTER_STORE"]
+    await cog.cog_load()
+    try:
+        yield cog
+    finally:
+        await cog.cog_unload()
+        await store.close()
+
+
+async def blackjack_race(calls=5, bet=100):
+    """Concurrent /blackjack from one user over RemoteEconomy: one hand, one stake."""
+    async with remote_cog() as cog:
+        dealt = []
+        deal = cog.table.deal
+        cog.table.deal = lambda *args: dealt.append(deal(*args)) or dealt[-1]
+        player = FakeUser(1)
+        await asyncio.gather(*(
+            Economy.blackjack.callback(cog, FakeInteraction(cog.bot, player), bet) for _ in range(calls)
+        ))
+
+        assert len(dealt) == 1, f"{len(dealt)} hands dealt for one player"
+        session = dealt[0]
+        wallet = (await cog.economy.account(player.id)).wallet
+        if cog.table.get(player.id) is session:
+            expected = 1000 - bet
+        else:
+            # Settled on the spot (a natural); the payout is already in
+            expected = 1000 - bet + int(bet * cog.table.rules.payout(cog.table.natural(session), session.doubled))
+        assert wallet == expected, f"wallet {wallet}, expected {expected}: a stake was lost"
+
+
+async def expiry_race(bet=100):
+    """The expiry sweep pays one hand while a Stand click settles the next: each is paid once."""
+    async with remote_cog() as cog:
+        players = [FakeUser(1), FakeUser(2)]
+        commands = []
+        for player in players:
+            await cog.economy.transfer({player.id: -bet}, "blackjack")
+            commands.append(FakeInteraction(cog.bot, player))
+            session = cog.table.deal(0, player.id, bet, commands[-1])
+            # 20 against the dealer's 18: every settlement pays
+            session.player[:] = (9, 9)
+            session.dealer[:] = (9, 7)
+            session.expires_at = 0
+
+        settled = []
+        settle = cog.table.settle
+        cog.table.settle = lambda guild_id, session: settled.append(settle(guild_id, session)) or settled[-1]
+        sweep = asyncio.create_task(Economy.expire_blackjack.coro(cog))
+        # The sweep settles the first hand and waits on its payout; the click lands then
+        await asyncio.sleep(0)
+        message = FakeMessage(None, None, "")
+        message.interaction = commands[1]
+        await cog.blackjack_action(FakeInteraction(cog.bot, players[1], message=message), "stand")
+        await sweep
+
+        payouts = [outcome for outcome in settled if outcome is not None]
+        assert len(payouts) == 2, f"{len(payouts)} settlements paid for 2 hands"
+        for player in players:
+            wallet = (await cog.economy.account(player.id)).wallet
+            assert wallet == 1000 + bet, f"wallet {wallet}, expected {1000 + bet}: a hand was paid twice"
+
+
+def in_tempdir(coro):
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            return asyncio.run(coro)
+        finally:
+            os.chdir(cwd)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    for stripes in (1, 1024):
+        elapsed, _ = in_tempdir(run(stripes, operations, users))
+        print(f"stripes={stripes:<5} {operations} ops in {elapsed:.2f}s ({operations / elapsed:,.0f} ops/s), money conserved")
+    _, wrong = in_tempdir(run(0, operations, users))
+    assert wrong, "without locks no update was lost; the check would not catch a race"
+    print(f"no locks     {wrong} wallets lost updates (expected: the check catches races)")
+    in_tempdir(blackjack_race())
+    print("concurrent /blackjack from one user: one hand dealt, no stake lost")
+    in_tempdir(expiry_race())
+    print("expiry sweep and a click on the same hand: paid once")
+
+
+if __name__ == "__main__":
+    main()
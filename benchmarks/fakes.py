@@ -0,0 +1,410 @@
+"""Lightweight stand-ins for the discord.py objects the cogs touch.
+
+They only implement what the cogs use, and count every call that would
+have been a REST request so benchmarks can report it.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import discord
+
+from utils.message_router import MessageRouter
+from utils.rest_scheduler import RestScheduler
+
+
+class RestCounter:
+    def __init__(self):
+        self.calls = {}
+
+    def hit(self, route):
+        self.calls[route] = self.calls.get(route, 0) + 1
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeBot:
+    def __init__(self):
+        self.rest_counter = RestCounter()
+        self.rest = RestScheduler()
+        self.router = MessageRouter()
+        self.intents = discord.Intents.all()
+        self.guilds = []
+        self.emoji_ids = {
+            'raid': 1,
+            'mod': 2,
+            'banned': 3,
+            'member': 4,
+            'success': 5,
+            'warning': 6,
+            'loading': 7,
+            'locked': 8
+        }
+        self.views = []
+
+    async def wait_until_ready(self):
+        return None
+
+    def add_view(self, view, message_id=None):
+        self.views.append(view)
+
+    def owns_guild(self, guild_id):
+        return True
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    async def fetch_user(self, user_id):
+        self.rest_counter.hit("user_fetch")
+        await asyncio.sleep(0)
+        return FakeUser(user_id)
+
+    async def fetch_guild(self, guild_id, with_counts=True):
+        self.rest_counter.hit("fetch_guild")
+        guild = self.get_guild(guild_id)
+        await asyncio.sleep(guild.rest_latency)
+        guild.approximate_presence_count = sum(member.status != discord.Status.offline for member in guild.members)
+        return guild
+
+
+class FakeHTTPResponse:
+    # Enough of aiohttp's response for discord.HTTPException
+    def __init__(self, status, reason="Fake"):
+        self.status = status
+        self.reason = reason
+
+
+class FakeUser:
+    def __init__(self, user_id, name=None, bot=False):
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.bot = bot
+        self.avatar = None
+        self.banner = None
+        self.created_at = discord.utils.snowflake_time(user_id << 22)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, *args, **kwargs):
+        self._interaction.bot.rest_counter.hit("interaction_response")
+        self._done = True
+        await asyncio.sleep(0)
+
+    async def defer(self, *args, **kwargs):
+        self._interaction.bot.rest_counter.hit("interaction_response")
+        self._done = True
+        await asyncio.sleep(0)
+
+    async def edit_message(self, *args, **kwargs):
+        self._interaction.bot.rest_counter.hit("interaction_response")
+        self._done = True
+        await asyncio.sleep(0)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        self._interaction.bot.rest_counter.hit("webhook_message")
+        await asyncio.sleep(0)
+
+
+class FakeInteraction:
+    def __init__(self, bot, user, guild=None, channel=None, message=None):
+        self.bot = bot
+        self.client = bot
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel = channel
+        # For component interactions: the message the button is on
+        self.message = message
+        self.channel_id = channel.id if channel else None
+        self.extras = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, *args, **kwargs):
+        self.bot.rest_counter.hit("edit_original_response")
+        await asyncio.sleep(0)
+
+
+class FakePermissions:
+    def __init__(self, administrator=False):
+        self.administrator = administrator
+        self.manage_guild = administrator
+        self.manage_roles = administrator
+        self.manage_channels = administrator
+        self.manage_messages = administrator
+        self.kick_members = administrator
+        self.ban_members = administrator
+        self.moderate_members = administrator
+
+
+class FakeRole:
+    def __init__(self, guild, role_id, position, administrator=False, managed=False):
+        self.guild = guild
+        self.id = role_id
+        self.name = f"role{role_id}"
+        self.position = position
+        self.permissions = FakePermissions(administrator)
+        self.managed = managed
+        self.color = discord.Colour.default()
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def is_default(self):
+        return self.id == self.guild.id
+
+    def is_assignable(self):
+        return not self.is_default() and not self.managed and self.position < self.guild.me_top_position
+
+    @property
+    def members(self):
+        # Same shape as discord.py: a filter over every cached member
+        return [member for member in self.guild.members if self.id in member._roles]
+
+    def __lt__(self, other):
+        return (self.position, self.id) < (other.position, other.id)
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, user_id, role_ids=(), bot=False, status=discord.Status.offline, premium_since=None):
+        super().__init__(user_id, bot=bot)
+        self.guild = guild
+        self._roles = set(role_ids)
+        self.status = status
+        self.activity = None
+        self.premium_since = premium_since
+        self.joined_at = guild.created_at
+        self.color = discord.Colour.default()
+
+    @property
+    def __class__(self):
+        # Slash command options and interaction.user are discord.Member in a guild,
+        # and the cogs skip member fetches for those
+        return discord.Member
+
+    @property
+    def roles(self):
+        # Same shape as discord.py: resolve every role ID and sort
+        result = [self.guild.get_role(role_id) for role_id in self._roles]
+        result = [role for role in result if role is not None]
+        result.append(self.guild.default_role)
+        result.sort()
+        return result
+
+    @property
+    def top_role(self):
+        return self.roles[-1]
+
+    @property
+    def guild_permissions(self):
+        # The owner has every permission, whatever their roles
+        return FakePermissions(self.id == self.guild.owner_id or any(role.permissions.administrator for role in self.roles))
+
+    def get_role(self, role_id):
+        return self.guild.get_role(role_id) if role_id in self._roles else None
+
+    async def edit(self, **kwargs):
+        self.guild.bot.rest_counter.hit("member_edit")
+        await asyncio.sleep(self.guild.rest_latency)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.guild.bot.rest_counter.hit("remove_roles")
+        await asyncio.sleep(self.guild.rest_latency)
+        self._roles.difference_update(role.id for role in roles)
+
+
+class FakeChannel:
+    def __init__(self, guild, channel_id, kind=discord.ChannelType.text):
+        self.guild = guild
+        self.id = channel_id
+        self.name = f"channel{channel_id}"
+        self.type = kind
+        self.overwrites = {}
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def overwrites_for(self, target):
+        overwrite = self.overwrites.get(target)
+        return discord.PermissionOverwrite() if overwrite is None else discord.PermissionOverwrite(**dict(overwrite))
+
+    async def set_permissions(self, target, *, overwrite=discord.utils.MISSING, reason=None, **permissions):
+        self.guild.bot.rest_counter.hit("channel_permissions")
+        await asyncio.sleep(self.guild.rest_latency)
+        if overwrite is None:
+            self.overwrites.pop(target, None)
+        else:
+            self.overwrites[target] = discord.PermissionOverwrite(**permissions) if overwrite is discord.utils.MISSING else overwrite
+
+    async def send(self, *args, **kwargs):
+        self.guild.bot.rest_counter.hit("send_message")
+        await asyncio.sleep(self.guild.rest_latency)
+
+    async def create_thread(self, name, type=None, reason=None):
+        self.guild.bot.rest_counter.hit("thread_create")
+        await asyncio.sleep(self.guild.rest_latency)
+        thread = FakeChannel(self.guild, self.guild.next_id(), discord.ChannelType.public_thread)
+        thread.name = name
+        return thread
+
+
+class FakeMessage:
+    def __init__(self, author, channel, content, guild=None, message_id=0):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.guild = guild if guild is not None else getattr(channel, "guild", None)
+        self.content = content
+        # For messages the bot sent in reply to a slash command: that command's interaction
+        self.interaction = None
+
+    async def delete(self):
+        self.guild.bot.rest_counter.hit("delete_message")
+        await asyncio.sleep(0)
+
+
+class FakeGuild:
+    def __init__(self, bot, guild_id=1, rest_latency=0.0):
+        self.bot = bot
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.description = None
+        self.created_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.premium_tier = 2
+        self.premium_subscription_count = 0
+        self.mfa_level = 1
+        self.verification_level = discord.VerificationLevel.medium
+        self.features = ["COMMUNITY", "NEWS"]
+        self.icon = None
+        self.approximate_presence_count = None
+        self.rest_latency = rest_latency
+        self.channels = []
+        self._channels_by_id = {}
+        self._next_id = 9_000_000
+        self.members = []
+        self._members_by_id = {}
+        self._roles = {}
+        self.me_top_position = 1 << 30
+        self.owner_id = None
+        self.chunked = True
+        self.default_role = self._add_role(FakeRole(self, guild_id, 0))
+
+    def _add_role(self, role):
+        self._roles[role.id] = role
+        return role
+
+    @property
+    def roles(self):
+        return sorted(self._roles.values())
+
+    @property
+    def member_count(self):
+        return len(self.members)
+
+    @property
+    def text_channels(self):
+        return [channel for channel in self.channels if channel.type == discord.ChannelType.text]
+
+    @property
+    def voice_channels(self):
+        return [channel for channel in self.channels if channel.type == discord.ChannelType.voice]
+
+    @property
+    def categories(self):
+        return [channel for channel in self.channels if channel.type == discord.ChannelType.category]
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, user_id):
+        return self._members_by_id.get(user_id)
+
+    def get_channel(self, channel_id):
+        return self._channels_by_id.get(channel_id)
+
+    def next_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    async def fetch_member(self, user_id):
+        self.bot.rest_counter.hit("member_fetch")
+        await asyncio.sleep(self.rest_latency)
+        member = self.get_member(user_id)
+        if member is None:
+            raise discord.NotFound(FakeHTTPResponse(404), "Unknown Member")
+        return member
+
+    async def create_text_channel(self, name, overwrites=None):
+        self.bot.rest_counter.hit("channel_create")
+        await asyncio.sleep(self.rest_latency)
+        channel = FakeChannel(self, self.next_id())
+        channel.name = name
+        channel.overwrites = dict(overwrites or {})
+        self.channels.append(channel)
+        self._channels_by_id[channel.id] = channel
+        return channel
+
+    async def chunk(self, cache=True):
+        self.bot.rest_counter.hit("gateway_chunk")
+        await asyncio.sleep(0)
+        return list(self.members)
+
+
+def make_guild(bot, members=1000, roles=50, admin_roles=3, admins=20, channels=50, rest_latency=0.0, seed=0):
+    """Synthesize a guild: every member gets a few ordinary roles, `admins` of them an admin role.
+
+    A quarter of the members are online, one in 50 is a bot and one in 200 boosts.
+    """
+    import random
+    rng = random.Random(seed)
+    guild = FakeGuild(bot, rest_latency=rest_latency)
+    base = 1_000_000
+    ordinary = [guild._add_role(FakeRole(guild, base + i, i + 1)) for i in range(roles)]
+    admin = [
+        guild._add_role(FakeRole(guild, base + roles + i, roles + i + 1, administrator=True))
+        for i in range(admin_roles)
+    ]
+    for i in range(members):
+        role_ids = {role.id for role in rng.sample(ordinary, min(3, len(ordinary)))}
+        guild.members.append(FakeMember(
+            guild, 10_000_000 + i, role_ids,
+            bot=i % 50 == 1,
+            status=discord.Status.online if i % 4 == 0 else discord.Status.offline,
+            premium_since=guild.created_at if i % 200 == 2 else None
+        ))
+    for member in rng.sample(guild.members, admins):
+        member._roles.add(rng.choice(admin).id)
+    kinds = (discord.ChannelType.category, discord.ChannelType.voice) + (discord.ChannelType.text,) * 8
+    guild.channels = [FakeChannel(guild, 2_000_000 + i, kinds[i % len(kinds)]) for i in range(channels)]
+    guild.premium_subscription_count = sum(member.premium_since is not None for member in guild.members)
+    guild.owner_id = guild.members[0].id
+    guild._members_by_id = {member.id: member for member in guild.members}
+    guild._channels_by_id = {channel.id: channel for channel in guild.channels}
+    return guild
@@ -0,0 +1,47 @@
+"""Leaderboard index against a naive sort, at one million accounts.
+
+    python -m benchmarks.leaderboard [accounts]
+"""
+import random
+import sys
+import time
+
+from utils.leaderboard import Leaderboard
+
+
+def timed(label, func, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<36} {per_call * 1e6:>12,.1f} us")
+    return result
+
+
+def main():
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    scores = {user_id: random.randint(0, 10_000_000) for user_id in range(accounts)}
+    board = Leaderboard()
+    timed(f"bulk load ({accounts:,} accounts)", lambda: board.load(scores.items()))
+
+    user_ids = random.sample(range(accounts), 10_000)
+    for user_id in user_ids:
+        scores[user_id] = random.randint(0, 10_000_000)
+    updates = iter(user_ids)
+
+    def apply_update():
+        user_id = next(updates)
+        board.update(user_id, scores[user_id])
+
+    timed("update balance", apply_update, repeat=10_000)
+    probe = user_ids[0]
+    timed("top 10", lambda: board.top(10), repeat=10_000)
+    timed("rank of one user", lambda: board.rank(probe), repeat=10_000)
+    timed("users around one user", lambda: board.around(probe), repeat=10_000)
+
+    naive = timed("naive sort top 10", lambda: sorted(scores.items(), key=lambda item: -item[1])[:10], repeat=3)
+    assert [score for _, score in naive] == [score for _, _, score in board.top(10)]
+
+
+if __name__ == "__main__":
+    main()
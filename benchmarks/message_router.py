@@ -0,0 +1,143 @@
+"""10k active message waiters against a busy message stream: linear check scanning vs the indexed router.
+
+The linear side mirrors bot.wait_for('message'): every waiter's check runs
+on every message. Waiters are confirmations and community-service style
+consumers spread over 200 guilds, each keyed on an author (and a channel
+for half of them); the stream is mostly traffic none of them care about.
+
+    python -m benchmarks.message_router [waiters] [messages]
+
+Also checks that a subscriber which raises does not stop the others.
+"""
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.fakes import FakeUser
+from utils.message_router import MessageRouter
+
+GUILDS = 200
+CHANNELS_PER_GUILD = 20
+USERS = 100_000
+
+
+class Stub:
+    __slots__ = ("id",)
+
+    def __init__(self, object_id):
+        self.id = object_id
+
+
+class Message:
+    __slots__ = ("guild", "channel", "author", "content")
+
+    def __init__(self, guild, channel, author, content):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+
+
+def make_waiters(count, rng):
+    # (guild, channel or None, author, expected content)
+    waiters = []
+    for i in range(count):
+        guild = rng.randrange(GUILDS)
+        channel = guild * CHANNELS_PER_GUILD + rng.randrange(CHANNELS_PER_GUILD) if i % 2 else None
+        waiters.append((guild, channel, rng.randrange(USERS), "CONFIRM STRIP" if i % 3 else "I will not spam"))
+    return waiters
+
+
+def make_stream(count, waiters, rng):
+    guilds = [Stub(i) for i in range(GUILDS)]
+    channels = [Stub(i) for i in range(GUILDS * CHANNELS_PER_GUILD)]
+    authors = {}
+    messages = []
+    for i in range(count):
+        if i % 100 == 0:
+            # 1% of traffic is from a waiting author, in the right place
+            guild, channel, author, content = rng.choice(waiters)
+            channel = channel if channel is not None else guild * CHANNELS_PER_GUILD
+        else:
+            guild = rng.randrange(GUILDS)
+            channel = guild * CHANNELS_PER_GUILD + rng.randrange(CHANNELS_PER_GUILD)
+            author, content = rng.randrange(USERS), "just chatting"
+        user = authors.get(author) or authors.setdefault(author, FakeUser(author))
+        messages.append(Message(guilds[guild], channels[channel], user, content))
+    return messages
+
+
+def linear(waiters, messages):
+    listeners = []
+    for guild, channel, author, content in waiters:
+        def check(m, guild=guild, channel=channel, author=author, content=content):
+            return (m.guild.id == guild and (channel is None or m.channel.id == channel)
+                    and m.author.id == author and m.content == content)
+        listeners.append(check)
+    started = time.perf_counter()
+    for message in messages:
+        for check in listeners:
+            check(message)
+    return time.perf_counter() - started
+
+
+async def routed(waiters, messages):
+    router = MessageRouter()
+    matched = 0
+
+    def on_message(message):
+        nonlocal matched
+        matched += 1
+
+    for guild, channel, author, content in waiters:
+        router.subscribe(on_message, guild_id=guild, channel_id=channel, author_id=author,
+                         check=lambda m, content=content: m.content == content)
+    started = time.perf_counter()
+    for message in messages:
+        await router.dispatch(message)
+    return time.perf_counter() - started, matched
+
+
+async def check_failing_subscriber():
+    router = MessageRouter()
+    seen = []
+
+    def broken(message):
+        raise RuntimeError("broken consumer")
+
+    router.subscribe(broken, channel_id=1)
+    router.subscribe(seen.append, channel_id=1)
+    waiter = asyncio.ensure_future(router.wait_for(author_id=2))
+    await asyncio.sleep(0)
+    message = Message(Stub(0), Stub(1), FakeUser(2), "hello")
+    await router.dispatch(message)
+    assert seen == [message], "a failing subscriber starved the others"
+    assert await waiter is message, "a failing subscriber starved a waiter"
+
+
+def main():
+    waiter_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    rng = random.Random(0)
+    waiters = make_waiters(waiter_count, rng)
+    messages = make_stream(message_count, waiters, rng)
+
+    # The linear scan is far slower; time it on a slice and extrapolate
+    sample = messages[:max(1, message_count // 50)]
+    old = linear(waiters, sample)
+    old_per_message = old / len(sample)
+    new, matched = asyncio.run(routed(waiters, messages))
+    new_per_message = new / len(messages)
+
+    print(f"{waiter_count:,} waiters, {message_count:,} messages")
+    print(f"linear checks  {old_per_message * 1e6:10.1f} µs/message  {1 / old_per_message:12,.0f} messages/s  (on {len(sample):,})")
+    print(f"indexed router {new_per_message * 1e6:10.1f} µs/message  {1 / new_per_message:12,.0f} messages/s  {matched:,} matched")
+    print(f"speedup: {old_per_message / new_per_message:.0f}x")
+
+    asyncio.run(check_failing_subscriber())
+    print("failing subscriber: others still dispatched")
+
+
+if __name__ == "__main__":
+    main()
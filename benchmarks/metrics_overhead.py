@@ -0,0 +1,110 @@
+"""Cost of the built-in metrics (utils.metrics) per command, event and REST request.
+
+Times the hooks a slash command goes through (InstrumentedTree's
+interaction_check plus record_command), a histogram observation, the
+instrumented HTTPClient.request wrapper around a request that returns
+immediately, and rendering the registry; then serves it on a local port
+and fetches /metrics once to check the endpoint.
+
+    python -m benchmarks.metrics_overhead [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from utils.metrics import (
+    COMMAND_SECONDS, METRICS, InstrumentedTree, MetricsServer, instrument_http, record_command
+)
+
+COMMANDS = ["balance", "daily", "rob", "blackjack", "userinfo", "server_info", "jail", "sue"]
+
+
+class Interaction:
+    __slots__ = ("extras",)
+
+    def __init__(self):
+        self.extras = {}
+
+
+class Command:
+    __slots__ = ("qualified_name",)
+
+    def __init__(self, name):
+        self.qualified_name = name
+
+
+class Route:
+    __slots__ = ("method", "path")
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+
+
+class HTTP:
+    async def request(self, route, **kwargs):
+        return None
+
+
+def per_call_us(elapsed, iterations):
+    return elapsed / iterations * 1e6
+
+
+async def run(iterations):
+    tree = InstrumentedTree.__new__(InstrumentedTree)
+    commands = [Command(name) for name in COMMANDS]
+
+    # Baseline: the same loop without the hooks
+    started = time.perf_counter()
+    for i in range(iterations):
+        interaction = Interaction()
+        commands[i % len(commands)]
+    baseline = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        interaction = Interaction()
+        await tree.interaction_check(interaction)
+        record_command(interaction, commands[i % len(commands)])
+    command = time.perf_counter() - started - baseline
+    print(f"command hooks:    {per_call_us(command, iterations):6.2f} µs/command")
+
+    histogram = COMMAND_SECONDS.labels("balance")
+    started = time.perf_counter()
+    for _ in range(iterations):
+        histogram.observe(0.0042)
+    print(f"observe:          {per_call_us(time.perf_counter() - started, iterations):6.2f} µs/observation")
+
+    http = HTTP()
+    route = Route("GET", "/guilds/{guild_id}/members/{user_id}")
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await http.request(route)
+    raw = time.perf_counter() - started
+    instrument_http(http)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await http.request(route)
+    print(f"REST wrapper:     {per_call_us(time.perf_counter() - started - raw, iterations):6.2f} µs/request")
+
+    started = time.perf_counter()
+    text = METRICS.render()
+    print(f"render:           {(time.perf_counter() - started) * 1000:6.2f} ms ({len(text):,} bytes)")
+
+    server = await MetricsServer(port=0).start()
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    await server.close()
+    assert response.startswith(b"HTTP/1.1 200 OK") and b"bot_command_duration_seconds_bucket" in response
+    print(f"GET /metrics:     200, {len(response):,} bytes")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    asyncio.run(run(iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Synthetic join flood through the raid detector.
+
+Simulates steady organic joins across many guilds, then a flood of accounts
+created in the same batch into one guild, and reports the per-join cost
+and how quickly the flood was flagged. Also checks that a guild's own
+join limit (GuildSettings.raid_joins/raid_window) replaces the default,
+that raid mode ends under a steady trickle of ordinary joins, and that a
+batch created across a creation-bucket edge is still caught.
+
+    python -m benchmarks.raid_detector [organic_joins] [raid_joins]
+"""
+import random
+import sys
+import time
+
+from utils.raid_detector import JOIN_RATE, RaidDetector
+
+
+def check_guild_threshold():
+    """A busy guild that raised its limit is not flagged for a burst the default would call a raid."""
+    detector = RaidDetector()
+    created = 1_700_000_000.0
+    default, raised = [], []
+    for i in range(20):
+        joined_at = 1_800_000_000.0 + i * 0.25
+        # Accounts from different creation batches, so only the join rate can trip
+        default += detector.on_join(1, i, joined_at, created + i * 86400)
+        raised += detector.on_join(2, i, joined_at, created + i * 86400, join_threshold=50, window=10)
+    assert any(reason == JOIN_RATE for _, reason in default), "20 joins in 5s should trip the default limit"
+    assert not raised, f"guild with a 50-join limit was flagged: {raised[:3]}"
+
+
+def check_raid_ends():
+    """After a raid, one old account joining every 20s must not keep raid mode on."""
+    detector = RaidDetector()
+    now = 1_800_000_000.0
+    for i in range(10):
+        detector.on_join(1, i, now + i * 0.1, now - 3 * 86400)
+    assert detector.in_raid(1, now + 1), "a batch of 10 same-age accounts should start a raid"
+    rng = random.Random(1)
+    flagged_at = []
+    for i in range(30):
+        joined_at = now + 20 * (i + 1)
+        if detector.on_join(1, 100 + i, joined_at, joined_at - rng.uniform(100, 1000) * 86400):
+            flagged_at.append(joined_at - now)
+    assert not detector.in_raid(1, now + 600), f"raid mode never ended; ordinary joins flagged at {flagged_at}"
+    assert max(flagged_at, default=0) <= detector.raid_cooldown + 1, f"ordinary joins flagged at {flagged_at}"
+
+
+def check_bucket_edge():
+    """Five accounts made within a minute, straddling a bucket edge, are one batch."""
+    detector = RaidDetector()
+    edge = 1_700_000_400.0 // detector.creation_bucket * detector.creation_bucket
+    flagged = []
+    for i, offset in enumerate((-30, -20, -10, 10, 20)):
+        flagged += detector.on_join(1, i, 1_800_000_000.0 + i, edge + offset)
+    assert len({member_id for member_id, _ in flagged}) == 5, f"batch split by a bucket edge: {flagged}"
+
+
+def main():
+    organic = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    raid = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    detector = RaidDetector()
+    rng = random.Random(0)
+    now = 1_800_000_000.0
+    year = 365 * 86400
+
+    events = []
+    # Organic joins: ~50/s spread over 2,000 guilds, accounts of any age
+    for i in range(organic):
+        now += 0.02
+        events.append((rng.randrange(2000), i, now, now - rng.uniform(30 * 86400, 5 * year), False))
+    # Raid: 5,000 joins in one minute, all accounts made within the same few minutes
+    batch_created = now - 3 * 86400
+    raid_start = now
+    for i in range(raid):
+        now += 60 / raid
+        events.append((424242, organic + i, now, batch_created + rng.uniform(0, 240), True))
+
+    flagged = set()
+    first_flag = None
+    started = time.perf_counter()
+    for guild_id, member_id, joined_at, created_at, _ in events:
+        for flagged_id, _ in detector.on_join(guild_id, member_id, joined_at, created_at):
+            flagged.add(flagged_id)
+            if first_flag is None and flagged_id >= organic:
+                first_flag = joined_at - raid_start
+    elapsed = time.perf_counter() - started
+
+    raiders = set(range(organic, organic + raid))
+    false_positives = len(flagged - raiders)
+    print(f"{len(events):,} joins in {elapsed:.2f}s ({elapsed / len(events) * 1e6:.2f} us/join, "
+          f"{len(events) / elapsed * 60:,.0f} joins/min)")
+    print(f"raid accounts flagged: {len(flagged & raiders):,}/{raid:,}, first after {first_flag:.2f}s")
+    print(f"organic accounts flagged: {false_positives:,}")
+    check_guild_threshold()
+    check_raid_ends()
+    check_bucket_edge()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""/server_info latency as the guild grows: full member scans against the maintained counters.
+
+    python -m benchmarks.server_info [calls]
+"""
+import asyncio
+import sys
+import time
+
+import discord
+
+from benchmarks.fakes import FakeBot, FakeInteraction, make_guild
+from cogs.utility import Utility
+
+
+def old_counts(guild):
+    # What server_info did on every call before the counters
+    online = len([m for m in guild.members if m.status != discord.Status.offline])
+    bots = len([m for m in guild.members if m.bot])
+    boosters = len([m for m in guild.members if m.premium_since])
+    return online, bots, boosters
+
+
+async def run(members, calls):
+    bot = FakeBot()
+    guild = make_guild(bot, members=members, channels=1000)
+    bot.guilds.append(guild)
+    utility = Utility(bot)
+    user = guild.get_member(guild.owner_id)
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        old_counts(guild)
+    old = (time.perf_counter() - started) / calls
+
+    # First call counts the guild once; every later call reads the counters
+    await Utility.server_info.callback(utility, FakeInteraction(bot, user, guild=guild))
+    started = time.perf_counter()
+    for _ in range(calls):
+        await Utility.server_info.callback(utility, FakeInteraction(bot, user, guild=guild))
+    new = (time.perf_counter() - started) / calls
+
+    counts = utility.stats.get(guild.id)
+    expected = old_counts(guild)
+    assert (counts.online, counts.bots, counts.boosters) == expected, ((counts.online, counts.bots, counts.boosters), expected)
+    await bot.rest.close()
+    return old, new
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'members':>9}{'scan only':>13}{'server_info':>14}")
+    for members in (1_000, 10_000, 100_000):
+        old, new = asyncio.run(run(members, calls))
+        print(f"{members:>9,}{old * 1000:>10.3f} ms{new * 1000:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
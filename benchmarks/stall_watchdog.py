@@ -0,0 +1,67 @@
+"""The stall watchdog (utils.stall_watchdog) against known blocking code.
+
+Runs, under the watchdog, the cold /server_info on a large guild (the
+first call counts every member synchronously), a few hundred warm calls,
+and two deliberate stalls: time.sleep inside a coroutine and one huge
+json.loads. Prints the report and checks the sleep was attributed to its
+own line.
+
+    python -m benchmarks.stall_watchdog [members] [threshold_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeBot, FakeInteraction, make_guild
+from cogs.utility import Utility
+from utils.stall_watchdog import StallWatchdog
+
+
+async def blocking_sleep():
+    time.sleep(0.3)
+
+
+async def blocking_parse(payload):
+    json.loads(payload)
+
+
+async def run(members, threshold):
+    bot = FakeBot()
+    guild = make_guild(bot, members=members, channels=1000)
+    bot.guilds.append(guild)
+    utility = Utility(bot)
+    user = guild.get_member(guild.owner_id)
+    payload = json.dumps([{"id": i, "wallet": i, "bank": 0, "inventory": []} for i in range(1_000_000)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        watchdog = StallWatchdog(threshold, os.path.join(tmp, "stall_report.txt")).start()
+        await asyncio.sleep(threshold)
+        await Utility.server_info.callback(utility, FakeInteraction(bot, user, guild=guild))
+        for _ in range(300):
+            await Utility.server_info.callback(utility, FakeInteraction(bot, user, guild=guild))
+            await asyncio.sleep(0)
+        await blocking_sleep()
+        await asyncio.sleep(threshold)
+        await blocking_parse(payload)
+        # Let the heartbeat report the last stall before stopping
+        await asyncio.sleep(threshold * 2)
+        watchdog.stop()
+        with open(watchdog.report_path, encoding="utf-8") as f:
+            report = f.read()
+    await bot.rest.close()
+    return watchdog, report
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    threshold = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    watchdog, report = asyncio.run(run(members, threshold))
+    print(report)
+    assert any("in blocking_sleep" in site for site in watchdog.sites), "time.sleep stall was not attributed"
+
+
+if __name__ == "__main__":
+    main()
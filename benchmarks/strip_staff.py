@@ -0,0 +1,61 @@
+"""/strip_staff on a synthetic 200k-member guild: the old scan with serial removals against the current one.
+
+    python -m benchmarks.strip_staff [members] [rest_latency_seconds]
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.fakes import FakeBot, FakeChannel, FakeInteraction, FakeMessage, make_guild
+from cogs.security import Security
+
+
+async def old_strip_staff(guild, owner):
+    # The pre-index implementation: every member's roles, serial removals
+    stripped = 0
+    for member in guild.members:
+        if member == owner:
+            continue
+        admin_roles = [role for role in member.roles if role.permissions.administrator]
+        if admin_roles:
+            await member.remove_roles(*admin_roles)
+            stripped += 1
+    return stripped
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    bot = FakeBot()
+    guild = make_guild(bot, members=members, admins=50, rest_latency=latency)
+    owner = guild.get_member(guild.owner_id)
+    started = time.perf_counter()
+    stripped = asyncio.run(old_strip_staff(guild, owner))
+    old = time.perf_counter() - started
+    print(f"old (scan + serial)      {old:8.2f}s  {stripped} members stripped")
+
+    bot = FakeBot()
+    guild = make_guild(bot, members=members, admins=50, rest_latency=latency)
+    bot.guilds.append(guild)
+    security = Security(bot)
+    owner = guild.get_member(guild.owner_id)
+    channel = FakeChannel(guild, 1)
+    interaction = FakeInteraction(bot, owner, guild=guild, channel=channel)
+
+    async def strip_with_confirmation():
+        command = asyncio.create_task(Security.strip_staff.callback(security, interaction))
+        while not len(bot.router):
+            await asyncio.sleep(0)
+        await bot.router.dispatch(FakeMessage(owner, channel, "CONFIRM STRIP"))
+        await command
+
+    started = time.perf_counter()
+    asyncio.run(strip_with_confirmation())
+    new = time.perf_counter() - started
+    print(f"new (one pass + pool)    {new:8.2f}s  {bot.rest_counter.calls.get('remove_roles', 0)} members stripped")
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
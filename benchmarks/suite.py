@@ -0,0 +1,310 @@
+"""Offline benchmark of the main slash commands, end to end, on one synthetic guild.
+
+Builds a guild from benchmarks.fakes (100k members, 1k channels, 500
+roles by default), loads the Security, Courtroom, Economy and Utility cogs
+against it in a scratch data directory, and runs each command's callback
+the way the command tree would. Per command it reports:
+
+- latency percentiles, from a pass without allocation tracing, after one
+  untimed warm-up call (server_info:cold forgets the guild counts each time)
+- tracemalloc peak and net allocation per call, from a separate pass
+- REST calls issued per call, counted by the fakes
+
+Results are saved to benchmarks/results/<commit>.json; pass --compare=<commit
+or path> to print the change against an earlier run.
+
+    python -m benchmarks.suite [scale] [members] [--only=cmd,cmd] [--compare=REF] [--no-save]
+
+`scale` multiplies every command's iteration count (default 1).
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.fakes import FakeBot, FakeInteraction, FakeMessage, make_guild
+from cogs.courtroom import Courtroom
+from cogs.economy import Economy
+from cogs.security import Security
+from cogs.utility import Utility
+
+CHANNELS = 1_000
+ROLES = 500
+ADMINS = 50
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Calls traced for allocations per command; tracing slows calls down, so it is a separate, shorter pass
+ALLOC_CALLS = 20
+
+
+class Bench:
+    """The bot, guild and cogs every scenario runs against."""
+
+    def __init__(self, members, seed=0):
+        self.rng = random.Random(seed)
+        self.bot = FakeBot()
+        self.guild = make_guild(self.bot, members=members, roles=ROLES, admins=ADMINS, channels=CHANNELS, seed=seed)
+        self.bot.guilds.append(self.guild)
+        self.owner = self.guild.get_member(self.guild.owner_id)
+        self.channel = self.guild.text_channels[0]
+        self.security = Security(self.bot)
+        self.courtroom = Courtroom(self.bot)
+        self.economy = Economy(self.bot)
+        self.utility = Utility(self.bot)
+        self.cogs = (self.security, self.courtroom, self.economy, self.utility)
+        # Admin role grants as generated, so /strip_staff can be undone between runs
+        self.admin_grants = [
+            (member, role.id) for role in self.guild.roles if role.permissions.administrator and not role.is_default()
+            for member in role.members
+        ]
+
+    async def start(self):
+        for cog in self.cogs:
+            await cog.cog_load()
+
+    async def close(self):
+        for cog in self.cogs:
+            await cog.cog_unload()
+        await self.bot.rest.close()
+
+    def member(self):
+        return self.rng.choice(self.guild.members)
+
+    def interaction(self, user=None, message=None):
+        return FakeInteraction(self.bot, user or self.member(), guild=self.guild, channel=self.channel, message=message)
+
+
+# Scenarios: name -> (iterations at scale 1, run(bench, i), reset(bench) or None).
+# run() is timed; reset() puts the guild back between calls and is not.
+
+async def server_info(bench, i):
+    await Utility.server_info.callback(bench.utility, bench.interaction())
+
+
+def forget_stats(bench):
+    bench.utility.stats.forget(bench.guild.id)
+
+
+async def userinfo(bench, i):
+    await Utility.userinfo.callback(bench.utility, bench.interaction(), bench.member())
+
+
+async def lockdown(bench, i):
+    await Security.lockdown.callback(bench.security, bench.interaction(bench.owner))
+
+
+def lift_lockdown(bench):
+    for channel in bench.guild.channels:
+        channel.overwrites.pop(bench.guild.default_role, None)
+    bench.security.lockdowns.clear()
+
+
+async def strip_staff(bench, i):
+    command = asyncio.create_task(Security.strip_staff.callback(bench.security, bench.interaction(bench.owner)))
+    while not len(bench.bot.router) and not command.done():
+        await asyncio.sleep(0)
+    await bench.bot.router.dispatch(FakeMessage(bench.owner, bench.channel, "CONFIRM STRIP"))
+    await command
+
+
+def restore_staff(bench):
+    for member, role_id in bench.admin_grants:
+        member._roles.add(role_id)
+
+
+async def sue(bench, i):
+    plaintiff, defendant = bench.member(), bench.member()
+    await Courtroom.sue.callback(bench.courtroom, bench.interaction(plaintiff), defendant, "Benchmark charges")
+
+
+async def jail(bench, i):
+    await Courtroom.jail.callback(bench.courtroom, bench.interaction(bench.owner), bench.member(), "Benchmark")
+
+
+async def balance(bench, i):
+    await Economy.balance.callback(bench.economy, bench.interaction())
+
+
+async def daily(bench, i):
+    # A different member every call, so every claim pays out
+    await Economy.daily.callback(bench.economy, bench.interaction(bench.guild.members[i % len(bench.guild.members)]))
+
+
+async def blackjack(bench, i):
+    player = bench.guild.members[i % len(bench.guild.members)]
+    command = bench.interaction(player)
+    await Economy.blackjack.callback(bench.economy, command, 100)
+    if bench.economy.table.get(player.id):
+        message = FakeMessage(None, bench.channel, "", bench.guild)
+        message.interaction = command
+        await bench.economy.blackjack_action(bench.interaction(player, message=message), "stand")
+
+
+async def rob(bench, i):
+    robber, target = bench.rng.sample(bench.guild.members, 2)
+    await Economy.rob.callback(bench.economy, bench.interaction(robber), target)
+
+
+SCENARIOS = {
+    "server_info": (200, server_info, None),
+    "server_info:cold": (10, server_info, forget_stats),
+    "userinfo": (500, userinfo, None),
+    "lockdown": (5, lockdown, lift_lockdown),
+    "strip_staff": (5, strip_staff, restore_staff),
+    "sue": (200, sue, None),
+    "jail": (200, jail, None),
+    "balance": (2000, balance, None),
+    "daily": (2000, daily, None),
+    "blackjack": (1000, blackjack, None),
+    "rob": (2000, rob, None),
+}
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(bench, name, iterations):
+    _, run, reset = SCENARIOS[name]
+    counter = bench.bot.rest_counter
+    # One untimed call fills what the command caches (guild counts, the jail channel)
+    await run(bench, -1)
+    if reset:
+        reset(bench)
+    calls_before = dict(counter.calls)
+
+    latencies = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await run(bench, i)
+        latencies.append(time.perf_counter() - started)
+        if reset:
+            reset(bench)
+    routes = {
+        route: round((count - calls_before.get(route, 0)) / iterations, 2)
+        for route, count in counter.calls.items() if count != calls_before.get(route, 0)
+    }
+
+    peaks, nets = [], []
+    tracemalloc.start()
+    for i in range(min(iterations, ALLOC_CALLS)):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await run(bench, iterations + i)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        nets.append(current - before)
+        if reset:
+            reset(bench)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": sum(latencies) / iterations * 1000,
+        "p50_ms": percentile(latencies, .50) * 1000,
+        "p95_ms": percentile(latencies, .95) * 1000,
+        "p99_ms": percentile(latencies, .99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "alloc_peak_kib": sum(peaks) / len(peaks) / 1024,
+        "alloc_net_kib": sum(nets) / len(nets) / 1024,
+        "rest_calls": round(sum(routes.values()), 2),
+        "rest_routes": routes,
+    }
+
+
+async def run(names, scale, members):
+    started = time.perf_counter()
+    bench = Bench(members)
+    await bench.start()
+    print(f"guild: {members:,} members, {CHANNELS:,} channels, {ROLES} roles (built in {time.perf_counter() - started:.1f}s)")
+    results = {}
+    for name in names:
+        results[name] = await measure(bench, name, max(1, int(SCENARIOS[name][0] * scale)))
+        print(format_row(name, results[name]))
+    await bench.close()
+    return results
+
+
+def format_row(name, result):
+    return (
+        f"{name:<18}{result['iterations']:>7,}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        f"{result['alloc_peak_kib']:>12,.1f}{result['alloc_net_kib']:>10,.1f}{result['rest_calls']:>8.2f}"
+    )
+
+
+def commit_label():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.now().strftime("run-%Y%m%d-%H%M%S")
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(ref):
+    path = ref if os.path.exists(ref) else os.path.join(RESULTS_DIR, f"{ref}.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, results):
+    print(f"\nchange against {baseline['commit']} (p50, p99, peak alloc, REST calls)")
+    for name, result in results.items():
+        before = baseline["commands"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for key in ("p50_ms", "p99_ms", "alloc_peak_kib", "rest_calls"):
+            old, new = before[key], result[key]
+            changes.append(f"{(new - old) / old * 100:+7.1f}%" if old else f"{new - old:+8.2f}")
+        print(f"{name:<18}" + "".join(f"{change:>10}" for change in changes))
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) if "=" in arg else (arg[2:], "") for arg in sys.argv[1:] if arg.startswith("--"))
+    scale = float(args[0]) if args else 1.0
+    members = int(args[1]) if len(args) > 1 else 100_000
+    names = options["only"].split(",") if options.get("only") else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown command(s): {', '.join(unknown)}. Choose from: {', '.join(SCENARIOS)}")
+        sys.exit(1)
+
+    print(f"{'command':<18}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>12}{'net KiB':>10}{'REST':>8}")
+    # The cogs keep their databases under data/; run them in a scratch directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            results = asyncio.run(run(names, scale, members))
+        finally:
+            os.chdir(cwd)
+
+    label = commit_label()
+    if "no-save" not in options:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{label}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "commit": label,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "members": members,
+                "scale": scale,
+                "commands": results
+            }, f, indent=2)
+        print(f"\nsaved {os.path.relpath(path, cwd)}")
+    if options.get("compare"):
+        compare(load_results(options["compare"]), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Per-message cost of the blacklist filter from 10 to 10,000 terms, against a per-word scan.
+
+Also checks whole-word matching: "ass" must not match "class" or "pass",
+but must still match through leetspeak, and a "*" entry matches anywhere.
+
+    python -m benchmarks.word_filter [messages]
+"""
+import random
+import string
+import sys
+import time
+
+from utils.word_filter import WordFilter, normalize
+
+
+def check_word_boundaries():
+    word_filter = WordFilter(["ass"])
+    for clean in ("first class", "pass the ball", "cl@ss", "assassin's creed"):
+        assert word_filter.find(clean) is None, f"'ass' matched inside {clean!r}"
+    for dirty in ("you ass", "ASS!", "@ss", "what an a$$.", "a\u200bss"):
+        assert word_filter.find(dirty) == "ass", f"'ass' missed in {dirty!r}"
+    word_filter.add("*ass")
+    assert word_filter.find("first class") == "*ass", "a * entry should match inside words"
+
+
+def main():
+    check_word_boundaries()
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    rng = random.Random(0)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(10_000)]
+    chat = [
+        " ".join(rng.choice(["hello", "gg", "anyone", "raid", "tonight", "lol", "server", "nice"]) for _ in range(12))
+        for _ in range(messages)
+    ]
+
+    print(f"{'terms':>7} {'automaton us/msg':>18} {'per-word scan us/msg':>22}")
+    for terms in (10, 100, 1_000, 10_000):
+        words = vocabulary[:terms]
+        word_filter = WordFilter(words)
+        word_filter.find("warm up")
+
+        started = time.perf_counter()
+        for message in chat:
+            word_filter.find(message)
+        automaton = (time.perf_counter() - started) / messages
+
+        started = time.perf_counter()
+        for message in chat:
+            text = normalize(message)
+            any(word in text for word in words)
+        naive = (time.perf_counter() - started) / messages
+        print(f"{terms:>7,} {automaton * 1e6:>18.1f} {naive * 1e6:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
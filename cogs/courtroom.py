@@ -2,48 +2,145 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import sys
+
+from utils.case_registry import ACTIVE, CLOSED, FAILED, CaseRegistry
+from utils.punishments import PunishmentScheduler
+from utils.responses import respond, send
+from utils.rest_scheduler import MODERATION
+
+JAIL_HOURS = 24
+SERVICE_REPETITIONS = 100
+SERVICE_MINUTES = 10
 
 class Courtroom(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.active_cases = {}
-        self.jailed_users = {}
+        self.cases = CaseRegistry("data/cases.db")
+        # Pending jail sentences; one timer for all of them
+        self.sentences = PunishmentScheduler("data/sentences.db", self.release)
+        # guild ID -> jail channel ID, resolved once per guild
+        self.jail_channels = {}
+        self.jail_locks = {}
+        # (guild ID, user ID) -> running community service task
+        self.services = {}
         
+    async def cog_load(self):
+        self.release_task = asyncio.create_task(self.start_sentences())
+    
+    async def cog_unload(self):
+        self.release_task.cancel()
+        for task in self.services.values():
+            task.cancel()
+        await self.sentences.close()
+        await asyncio.to_thread(self.cases.close)
+    
+    async def start_sentences(self):
+        # Releases need the guild cache; other cluster workers release their own guilds' sentences
+        await self.bot.wait_until_ready()
+        self.sentences.start(self.bot.owns_guild)
+    
+    async def jail_channel(self, guild, prisoner):
+        """The guild's #jail channel: cached ID, else found by name once, else created."""
+        channel = guild.get_channel(self.jail_channels.get(guild.id, 0))
+        if channel is not None:
+            return channel
+        # Two jails at once must not create two channels
+        async with self.jail_locks.setdefault(guild.id, asyncio.Lock()):
+            channel = guild.get_channel(self.jail_channels.get(guild.id, 0)) or discord.utils.get(guild.text_channels, name="jail")
+            if channel is None:
+                channel = await self.bot.rest.run(
+                    lambda: guild.create_text_channel(
+                        "jail",
+                        overwrites={
+                            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                            prisoner: discord.PermissionOverwrite(read_messages=True, send_messages=False)
+                        }
+                    ),
+                    lane=MODERATION, route="channel_create"
+                )
+            self.jail_channels[guild.id] = channel.id
+            return channel
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if self.jail_channels.get(channel.guild.id) == channel.id:
+            del self.jail_channels[channel.guild.id]
+    
+    async def release(self, sentence):
+        """Called by the scheduler when a sentence is served."""
+        guild = self.bot.get_guild(sentence.guild_id)
+        if guild is None:
+            return
+        member = guild.get_member(sentence.user_id)
+        if member is None:
+            try:
+                member = await self.bot.rest.run(
+                    lambda: guild.fetch_member(sentence.user_id), lane=MODERATION, route="member_fetch"
+                )
+            except discord.NotFound:
+                # Left the server; the timeout has lapsed on Discord's side anyway
+                return
+        channel = guild.get_channel(sentence.data.get("channel_id", 0))
+        if channel is None:
+            return
+        await self.bot.rest.run(
+            lambda: channel.set_permissions(member, overwrite=None, reason="Sentence served"),
+            lane=MODERATION, route="channel_permissions"
+        )
+        await self.bot.rest.run(
+            lambda: channel.send(f"{member.mention} has served their sentence and is free to go."),
+            lane=MODERATION, route="send_message"
+        )
+    
     @app_commands.command(name="sue", description="Open a formal trial against a user")
     @app_commands.describe(user="User to sue", reason="Reason for the lawsuit")
     async def sue(self, interaction: discord.Interaction, user: discord.Member, reason: str):
-        case_id = f"CASE-{interaction.guild.id}-{len(self.active_cases)+1:04d}"
+        async def open_case(responder):
+            case = self.cases.open_case(interaction.guild.id, interaction.user.id, user.id, reason)
+            case_id = case.case_id
         
-        # Create trial thread
-        overwrites = {
-            interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-        }
+            # Create trial thread
+            overwrites = {
+                interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            }
         
-        try:
-            thread = await interaction.channel.create_thread(
-                name=f"Trial: {user.name} vs {interaction.user.name}",
-                type=discord.ChannelType.public_thread,
-                reason=f"Court case #{case_id}"
-            )
+            try:
+                thread = await self.bot.rest.run(
+                    lambda: interaction.channel.create_thread(
+                        name=f"Trial: {user.name} vs {interaction.user.name}",
+                        type=discord.ChannelType.public_thread,
+                        reason=f"Court case #{case_id}"
+                    ),
+                    lane=MODERATION, route="thread_create"
+                )
             
-            # Set permissions
-            for target, overwrite in overwrites.items():
-                await thread.set_permissions(target, overwrite=overwrite)
+                # Set permissions
+                await asyncio.gather(*(
+                    self.bot.rest.run(
+                        lambda target=target, overwrite=overwrite: thread.set_permissions(target, overwrite=overwrite),
+                        lane=MODERATION, route="channel_permissions"
+                    )
+                    for target, overwrite in overwrites.items()
+                ))
             
-            # Add case to active cases
-            self.active_cases[case_id] = {
-                "plaintiff": interaction.user.id,
-                "defendant": user.id,
-                "reason": reason,
-                "thread_id": thread.id,
-                "status": "active",
-                "opened": datetime.now().isoformat()
-            }
+                self.cases.update(case, thread_id=thread.id)
             
+            except Exception as e:
+                # The number stays taken so case numbers never repeat
+                self.cases.update(case, status=FAILED)
+                embed = discord.Embed(
+                    title="❌ Court Error",
+                    description=f"Failed to create trial: {str(e)}",
+                    color=0xff0000
+                )
+                await responder.finish(embed)
+                return
+        
             embed = discord.Embed(
                 title=f"<:mod:{self.bot.emoji_ids['mod']}> Court Case Opened",
                 description=f"**Case ID:** {case_id}\n"
@@ -54,8 +151,8 @@ class Courtroom(commands.Cog):
                 color=0xff0000
             )
             embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Court is now in session")
-            await interaction.response.send_message(embed=embed)
-            
+            await responder.finish(embed)
+        
             # Send initial message in thread
             thread_embed = discord.Embed(
                 title="⚖️ THE HIGH COURTROOM",
@@ -67,74 +164,106 @@ class Courtroom(commands.Cog):
                           f"Use `/verdict` when ready to deliver judgment",
                 color=0xff0000
             )
-            await thread.send(embed=thread_embed)
-            
-        except Exception as e:
-            embed = discord.Embed(
-                title="❌ Court Error",
-                description=f"Failed to create trial: {str(e)}",
-                color=0xff0000
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            try:
+                await thread.send(embed=thread_embed)
+            except Exception as e:
+                # The case and its thread exist and the plaintiff has been told; only the welcome is missing
+                print(f"Could not post the opening message for case {case_id} in thread {thread.id}: {e}", file=sys.stderr)
+        
+        await respond(interaction, open_case)
+    
+    @app_commands.command(name="cases", description="List court cases a user is party to")
+    @app_commands.describe(user="User to look up (defaults to you)", status="Only cases with this status")
+    @app_commands.choices(status=[
+        app_commands.Choice(name="Active", value=ACTIVE),
+        app_commands.Choice(name="Closed", value=CLOSED),
+        app_commands.Choice(name="Failed", value=FAILED)
+    ])
+    async def cases_command(self, interaction: discord.Interaction, user: discord.Member = None, status: str = None):
+        user = user or interaction.user
+        cases = self.cases.for_user(interaction.guild.id, user.id, status=status, limit=10)
+        total = self.cases.count_for_user(interaction.guild.id, user.id)
+        
+        lines = []
+        for case in cases:
+            role = "Plaintiff" if case.plaintiff == user.id else "Defendant"
+            thread = f" • <#{case.thread_id}>" if case.thread_id else ""
+            lines.append(f"**#{case.number:04d}** {role} • {case.status.title()} • <t:{int(datetime.fromisoformat(case.opened).timestamp())}:R>{thread}\n"
+                         f"↳ {case.reason[:80]}")
+        
+        embed = discord.Embed(
+            title=f"<:mod:{self.bot.emoji_ids['mod']}> Court Record",
+            description=f"Cases involving {user.mention}\n\n" + ("\n".join(lines) or "*No cases on record.*"),
+            color=0xff0000
+        )
+        if total > len(cases):
+            embed.set_footer(text=f"Showing {len(cases)} of {total} cases")
+        else:
+            embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+        await send(interaction, embed=embed)
     
     @app_commands.command(name="jail", description="Send a user to the jail channel")
     @app_commands.describe(user="User to jail", reason="Reason for jailing")
     async def jail(self, interaction: discord.Interaction, user: discord.Member, reason: str = "Contempt of court"):
-        # Check if jail channel exists
-        jail_channel = discord.utils.get(interaction.guild.channels, name="jail")
-        if not jail_channel:
+        async def lock_up(responder):
             try:
-                jail_channel = await interaction.guild.create_text_channel(
-                    "jail",
-                    overwrites={
-                        interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                        user: discord.PermissionOverwrite(read_messages=True, send_messages=False)
-                    }
+                jail_channel = await self.jail_channel(interaction.guild, user)
+                await self.bot.rest.run(
+                    lambda: jail_channel.set_permissions(user, read_messages=True, send_messages=False),
+                    lane=MODERATION, route="channel_permissions"
                 )
-            except:
+            except discord.HTTPException:
                 embed = discord.Embed(
                     title="❌ Jail Error",
                     description="Could not create jail channel. Check bot permissions.",
                     color=0xff0000
                 )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+                return embed
         
-        # Timeout the user
-        try:
-            await user.edit(timed_out_until=discord.utils.utcnow() + timedelta(hours=24))
-        except:
-            pass
+            # Timeout the user
+            try:
+                await self.bot.rest.run(
+                    lambda: user.edit(timed_out_until=discord.utils.utcnow() + timedelta(hours=JAIL_HOURS)),
+                    lane=MODERATION, route="member_edit"
+                )
+            except:
+                pass
         
-        self.jailed_users[user.id] = {
-            "jailed_by": interaction.user.id,
-            "reason": reason,
-            "time": datetime.now().isoformat()
-        }
+            await self.sentences.schedule(interaction.guild.id, user.id, "jail", JAIL_HOURS * 3600, {
+                "jailed_by": interaction.user.id,
+                "reason": reason,
+                "time": datetime.now().isoformat(),
+                "channel_id": jail_channel.id
+            })
         
-        embed = discord.Embed(
-            title=f"<:locked:{self.bot.emoji_ids['locked']}> User Jailed",
-            description=f"**Prisoner:** {user.mention}\n"
-                      f"**Cell:** {jail_channel.mention}\n"
-                      f"**Sentence:** 24 hours\n"
-                      f"**Reason:** {reason}\n\n"
-                      f"*They can view but not speak in the jail channel.*",
-            color=0xff0000
-        )
-        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Justice served")
-        await interaction.response.send_message(embed=embed)
-        
-        # Send jail message
-        jail_embed = discord.Embed(
-            title="🔒 YOU HAVE BEEN JAILED",
-            description=f"**Reason:** {reason}\n"
-                      f"**Sentence:** 24 hours\n"
-                      f"**Judge:** {interaction.user.mention}\n\n"
-                      f"You can view this channel but cannot speak.\n"
-                      f"Use `/bail` to pay for early release.",
-            color=0xff0000
-        )
-        await jail_channel.send(content=user.mention, embed=jail_embed)
+            embed = discord.Embed(
+                title=f"<:locked:{self.bot.emoji_ids['locked']}> User Jailed",
+                description=f"**Prisoner:** {user.mention}\n"
+                          f"**Cell:** {jail_channel.mention}\n"
+                          f"**Sentence:** {JAIL_HOURS} hours\n"
+                          f"**Reason:** {reason}\n\n"
+                          f"*They can view but not speak in the jail channel.*",
+                color=0xff0000
+            )
+            embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Justice served")
+            await responder.finish(embed)
+        
+            # Send jail message
+            jail_embed = discord.Embed(
+                title="🔒 YOU HAVE BEEN JAILED",
+                description=f"**Reason:** {reason}\n"
+                          f"**Sentence:** {JAIL_HOURS} hours\n"
+                          f"**Judge:** {interaction.user.mention}\n\n"
+                          f"You can view this channel but cannot speak.\n"
+                          f"Use `/bail` to pay for early release.",
+                color=0xff0000
+            )
+            await self.bot.rest.run(
+                lambda: jail_channel.send(content=user.mention, embed=jail_embed),
+                lane=MODERATION, route="send_message"
+            )
+        
+        await respond(interaction, lock_up)
     
     @app_commands.command(name="objection", description="Dramatic trial interruption")
     async def objection(self, interaction: discord.Interaction):
@@ -152,35 +281,98 @@ class Courtroom(commands.Cog):
             description=f"{interaction.user.mention} dramatically interrupts the proceedings!",
             color=0xff0000
         )
+        case = self.cases.by_thread(interaction.channel_id)
+        if case:
+            embed.set_footer(text=f"{case.case_id} • {case.reason[:80]}")
         embed.set_image(url=gif)
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
     
     @app_commands.command(name="community_service", description="Force a user to type a sentence")
     @app_commands.describe(user="User to punish", sentence="Sentence to repeat")
     async def community_service(self, interaction: discord.Interaction, user: discord.Member, sentence: str):
+        # The order deletes the user's messages and ends in a timeout, so it takes both permissions
+        permissions = interaction.user.guild_permissions
+        if not (permissions.moderate_members and permissions.manage_messages):
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need the Timeout Members and Manage Messages permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        key = (interaction.guild.id, user.id)
+        if key in self.services:
+            embed = discord.Embed(
+                title="❌ Already Serving",
+                description=f"{user.mention} is already doing community service.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
         embed = discord.Embed(
             title="⚖️ Community Service Order",
-            description=f"{user.mention} must type the following sentence **100 times** to speak again:\n\n"
+            description=f"{user.mention} must type the following sentence **{SERVICE_REPETITIONS} times** to speak again:\n\n"
                       f"*\"{sentence}\"*\n\n"
-                      f"They have 10 minutes to complete this task.",
+                      f"They have {SERVICE_MINUTES} minutes to complete this task.",
             color=0xff0000
         )
-        await interaction.response.send_message(embed=embed)
-        
-        # Store the task
-        await self.bot.get_cog('Moderation').mute(interaction, user, 600)  # 10 minute mute
+        await send(interaction, embed=embed)
+        self.services[key] = asyncio.create_task(self.serve(interaction.guild, interaction.channel, user, sentence))
         
         # Create a DM task
         try:
             dm = await user.create_dm()
             await dm.send(
                 f"**COMMUNITY SERVICE NOTICE**\n\n"
-                f"You have been ordered to type the following sentence 100 times:\n"
+                f"You have been ordered to type the following sentence {SERVICE_REPETITIONS} times:\n"
                 f"```{sentence}```\n"
-                f"You have 10 minutes. Each message must be exactly as shown above."
+                f"You have {SERVICE_MINUTES} minutes. Each message must be exactly as shown above."
             )
         except:
             pass
+    
+    async def serve(self, guild, channel, user, sentence):
+        """Count the user's repetitions; anything else they say is deleted until they are done."""
+        target = sentence.strip()
+        finished = asyncio.get_running_loop().create_future()
+        done = 0
+        
+        def on_message(message):
+            nonlocal done
+            if message.content.strip() == target:
+                done += 1
+                if done >= SERVICE_REPETITIONS and not finished.done():
+                    finished.set_result(True)
+            else:
+                deletion = self.bot.rest.submit(lambda: message.delete(), lane=MODERATION, route="message_delete")
+                deletion.add_done_callback(lambda future: future.cancelled() or future.exception())
+        
+        subscription = self.bot.router.subscribe(on_message, guild_id=guild.id, author_id=user.id)
+        try:
+            await asyncio.wait_for(finished, SERVICE_MINUTES * 60)
+            await self.bot.rest.run(
+                lambda: channel.send(f"{user.mention} has completed their community service. They may speak freely."),
+                lane=MODERATION, route="send_message"
+            )
+        except asyncio.TimeoutError:
+            # Out of time: the mute the order threatened
+            try:
+                await self.bot.rest.run(
+                    lambda: user.edit(timed_out_until=discord.utils.utcnow() + timedelta(minutes=SERVICE_MINUTES)),
+                    lane=MODERATION, route="member_edit"
+                )
+            except discord.HTTPException:
+                pass
+            await self.bot.rest.run(
+                lambda: channel.send(f"{user.mention} failed their community service ({done}/{SERVICE_REPETITIONS}) "
+                                     f"and has been muted for {SERVICE_MINUTES} minutes."),
+                lane=MODERATION, route="send_message"
+            )
+        finally:
+            subscription.cancel()
+            self.services.pop((guild.id, user.id), None)
 
 async def setup(bot):
     await bot.add_cog(Courtroom(bot))
@@ -1,176 +1,262 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import asyncio
-import json
-import random
-from datetime import datetime
 import os
 
+from utils.economy_service import ROBBED, TOO_POOR, EconomyService
+from utils.cluster_store import RemoteEconomy
+from utils.responses import send
+from utils.blackjack import BLACKJACK, BUST, DEALER_BUST, LOSE, PUSH, WIN, BlackjackTable, card_name, hand_value
+from utils.rest_scheduler import COSMETIC
+
+# Seconds a blackjack hand may sit without a move before it stands on its own
+BLACKJACK_TIMEOUT = 60
+
+BLACKJACK_RESULTS = {
+    BLACKJACK: "BLACKJACK! You win 3:2!",
+    WIN: "You win!",
+    DEALER_BUST: "Dealer busts! You win!",
+    PUSH: "Push! It's a tie.",
+    LOSE: "You lose.",
+    BUST: "BUST! You lose.",
+}
+
+class BlackjackControls(discord.ui.View):
+    """Hit / Stand / Double buttons.
+
+    One instance is registered as a persistent view in cog_load and handles
+    every game's clicks; the copies sent with each hand only carry the layout
+    and are stopped so the view store does not track every message.
+    """
+    
+    def __init__(self, cog, session=None):
+        super().__init__(timeout=None)
+        self.cog = cog
+        if session is not None:
+            self.double.disabled = not session.can_double(cog.table.rules)
+            self.stop()
+    
+    @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary, custom_id="blackjack:hit")
+    async def hit(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.blackjack_action(interaction, "hit")
+    
+    @discord.ui.button(label="Stand", style=discord.ButtonStyle.secondary, custom_id="blackjack:stand")
+    async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.blackjack_action(interaction, "stand")
+    
+    @discord.ui.button(label="Double", style=discord.ButtonStyle.success, custom_id="blackjack:double")
+    async def double(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.blackjack_action(interaction, "double")
+
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data_file = "data/economy.json"
-        self.user_data = self.load_data()
-        
-    def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        return {}
+        # In cluster mode the supervisor serves the economy to every worker; see utils.cluster
+        address = os.getenv("CLUSTER_STORE")
+        if address:
+            self.economy = RemoteEconomy(address)
+        else:
+            self.economy = EconomyService(os.getenv("ECONOMY_BACKEND", "sqlite"))
+        self.table = BlackjackTable(timeout=BLACKJACK_TIMEOUT)
+        # Users whose bet is being taken; their hand is not dealt yet
+        self.dealing = set()
     
-    def save_data(self):
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        with open(self.data_file, 'w') as f:
-            json.dump(self.user_data, f, indent=4)
+    async def cog_load(self):
+        await self.economy.start()
+        self.expire_blackjack.start()
+        self.bot.add_view(BlackjackControls(self))
     
-    def get_user_data(self, user_id):
-        if str(user_id) not in self.user_data:
-            self.user_data[str(user_id)] = {
-                "wallet": 1000,
-                "bank": 0,
-                "daily_streak": 0,
-                "last_daily": None,
-                "inventory": []
-            }
-        return self.user_data[str(user_id)]
+    async def cog_unload(self):
+        self.expire_blackjack.cancel()
+        # Open hands only live in memory; give their stakes back rather than lose them
+        for session in list(self.table.sessions.values()):
+            await self.economy.transfer({session.user_id: session.stake}, "blackjack")
+        self.table.sessions.clear()
+        await self.economy.close()
     
     @app_commands.command(name="balance", description="Check your wallet and bank balance")
     async def balance(self, interaction: discord.Interaction):
-        data = self.get_user_data(interaction.user.id)
+        data = await self.economy.account(interaction.user.id)
         
         embed = discord.Embed(
             title=f"<:success:{self.bot.emoji_ids['success']}> Financial Report",
             description=f"**Account Holder:** {interaction.user.mention}\n\n"
-                      f"💰 **Wallet:** ${data['wallet']:,}\n"
-                      f"🏦 **Bank:** ${data['bank']:,}\n"
-                      f"📈 **Total:** ${data['wallet'] + data['bank']:,}\n\n"
-                      f"*Daily streak: {data['daily_streak']} days*",
+                      f"💰 **Wallet:** ${data.wallet:,}\n"
+                      f"🏦 **Bank:** ${data.bank:,}\n"
+                      f"📈 **Total:** ${data.total:,}\n\n"
+                      f"*Daily streak: {data.daily_streak} days*",
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
     
     @app_commands.command(name="daily", description="Claim your daily credits")
     async def daily(self, interaction: discord.Interaction):
-        data = self.get_user_data(interaction.user.id)
-        now = datetime.now().isoformat()
-        
-        # Check if daily was already claimed today
-        if data['last_daily']:
-            last_date = datetime.fromisoformat(data['last_daily']).date()
-            if last_date == datetime.now().date():
-                embed = discord.Embed(
-                    title="⏰ Already Claimed",
-                    description="You've already claimed your daily credits today!\n"
-                              f"Come back tomorrow for more.",
-                    color=0xff0000
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
-        
-        # Calculate reward
-        base_reward = 1000
-        streak_bonus = data['daily_streak'] * 50
-        total = base_reward + streak_bonus
+        claimed = await self.economy.claim_daily(interaction.user.id)
         
-        # Update data
-        data['wallet'] += total
-        data['daily_streak'] += 1
-        data['last_daily'] = now
-        self.save_data()
+        if claimed is None:
+            embed = discord.Embed(
+                title="⏰ Already Claimed",
+                description="You've already claimed your daily credits today!\n"
+                          f"Come back tomorrow for more.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
         
+        base_reward, streak_bonus, data = claimed
+        total = base_reward + streak_bonus
         embed = discord.Embed(
             title=f"<:success:{self.bot.emoji_ids['success']}> Daily Reward Claimed!",
             description=f"**Amount:** ${total:,}\n"
                       f"**Breakdown:**\n"
                       f"• Base: ${base_reward:,}\n"
                       f"• Streak Bonus: ${streak_bonus:,}\n\n"
-                      f"**New Balance:** ${data['wallet']:,}\n"
-                      f"**Streak:** {data['daily_streak']} days 🔥",
+                      f"**New Balance:** ${data.wallet:,}\n"
+                      f"**Streak:** {data.daily_streak} days 🔥",
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Come back tomorrow!")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
     
     @app_commands.command(name="blackjack", description="Play 21 against the bot")
     @app_commands.describe(bet="Amount to bet")
     async def blackjack(self, interaction: discord.Interaction, bet: int):
-        data = self.get_user_data(interaction.user.id)
-        
         if bet <= 0:
             embed = discord.Embed(
                 title="❌ Invalid Bet",
                 description="Bet must be greater than 0.",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send(interaction, embed=embed, ephemeral=True)
             return
-            
-        if data['wallet'] < bet:
+        
+        user_id = interaction.user.id
+        if self.table.get(user_id) or user_id in self.dealing:
+            embed = discord.Embed(
+                title="❌ Game In Progress",
+                description="Finish your current hand first.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        # Hold the user's seat while the bet is taken, so a second /blackjack cannot
+        # deal over this hand and lose its stake
+        self.dealing.add(user_id)
+        try:
+            # Take the bet up front so concurrent games cannot spend the same money twice
+            paid = await self.economy.transfer({user_id: -bet}, "blackjack")
+            if paid:
+                guild_id = interaction.guild_id or 0
+                session = self.table.deal(guild_id, user_id, bet, interaction)
+        finally:
+            self.dealing.discard(user_id)
+        
+        if not paid:
+            data = await self.economy.account(user_id)
             embed = discord.Embed(
                 title="❌ Insufficient Funds",
-                description=f"You only have ${data['wallet']:,} in your wallet.",
+                description=f"You only have ${data.wallet:,} in your wallet.",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send(interaction, embed=embed, ephemeral=True)
             return
         
-        # Loading message
-        embed = discord.Embed(
-            title=f"<:loading:{self.bot.emoji_ids['loading']}> Dealing Cards...",
-            color=0xff0000
-        )
-        await interaction.response.send_message(embed=embed)
-        await asyncio.sleep(1.5)
-        
-        # Simple blackjack logic
-        player_cards = [random.randint(1, 11) for _ in range(2)]
-        dealer_cards = [random.randint(1, 11) for _ in range(2)]
-        
-        player_total = sum(player_cards)
-        dealer_total = sum(dealer_cards)
-        
-        # Determine winner
-        if player_total == 21:
-            result = "BLACKJACK! You win 3:2!"
-            multiplier = 2.5
-        elif player_total > 21:
-            result = "BUST! You lose."
-            multiplier = 0
-        elif dealer_total > 21:
-            result = "Dealer busts! You win!"
-            multiplier = 2
-        elif player_total > dealer_total:
-            result = "You win!"
-            multiplier = 2
-        elif player_total < dealer_total:
-            result = "You lose."
-            multiplier = 0
+        if self.table.natural(session) is not None:
+            embed = await self.settle_blackjack(guild_id, session)
+            await send(interaction, embed=embed)
+            return
+        await send(interaction, embed=self.blackjack_embed(session), view=BlackjackControls(self, session))
+    
+    async def blackjack_action(self, interaction, action):
+        session = self.table.get(interaction.user.id)
+        origin = interaction.message.interaction if interaction.message else None
+        if session is None or origin is None or origin.user.id != interaction.user.id:
+            await interaction.response.send_message("This isn't your hand.", ephemeral=True)
+            return
+        
+        guild_id = interaction.guild_id or 0
+        self.table.touch(session, interaction)
+        if action == "double":
+            if not session.can_double(self.table.rules):
+                await interaction.response.send_message("You can only double on your first two cards.", ephemeral=True)
+                return
+            if not await self.economy.transfer({session.user_id: -session.bet}, "blackjack"):
+                await interaction.response.send_message("You can't cover the extra bet.", ephemeral=True)
+                return
+            # Another click may have finished the hand while the bet was taken
+            if self.table.get(session.user_id) is not session or not session.can_double(self.table.rules):
+                await self.economy.transfer({session.user_id: session.bet}, "blackjack")
+                await interaction.response.defer()
+                return
+            self.table.double(guild_id, session)
+        elif action == "hit" and self.table.hit(guild_id, session):
+            await interaction.response.edit_message(embed=self.blackjack_embed(session), view=BlackjackControls(self, session))
+            return
+        
+        # Stand, double, bust or 21: the dealer plays and the hand is over
+        embed = await self.settle_blackjack(guild_id, session)
+        if embed is None:
+            # The expiry sweep settled the hand while this click was handled
+            await interaction.response.defer()
+            return
+        await interaction.response.edit_message(embed=embed, view=None)
+    
+    @tasks.loop(seconds=5)
+    async def expire_blackjack(self):
+        # Abandoned hands stand as they are
+        for session in self.table.expired():
+            origin = session.interaction
+            embed = await self.settle_blackjack(origin.guild_id or 0, session, timed_out=True)
+            if embed is None:
+                # A click settled it while an earlier hand was being paid
+                continue
+            edit = self.bot.rest.submit(
+                lambda origin=origin, embed=embed: origin.edit_original_response(embed=embed, view=None),
+                lane=COSMETIC, route="interaction_edit"
+            )
+            edit.add_done_callback(lambda future: future.cancelled() or future.exception())
+    
+    async def settle_blackjack(self, guild_id, session, timed_out=False):
+        outcome = self.table.settle(guild_id, session)
+        if outcome is None:
+            return None
+        winnings = int(session.bet * self.table.rules.payout(outcome, session.doubled))
+        if winnings:
+            await self.economy.transfer({session.user_id: winnings}, "blackjack")
+        data = await self.economy.account(session.user_id)
+        return self.blackjack_embed(session, outcome, winnings, timed_out, data.wallet)
+    
+    def blackjack_embed(self, session, outcome=None, winnings=0, timed_out=False, wallet=0):
+        player, _ = hand_value(session.player)
+        if outcome is None:
+            dealer = f"{card_name(session.dealer[0])} ?? = {hand_value(session.dealer[:1])[0]}+"
         else:
-            result = "Push! It's a tie."
-            multiplier = 1
+            dealer = f"{' '.join(card_name(c) for c in session.dealer)} = {hand_value(session.dealer)[0]}"
         
-        winnings = int(bet * multiplier)
-        data['wallet'] += winnings - bet  # Adjust for bet
-        self.save_data()
+        description = (
+            f"**Bet:** ${session.stake:,}{' (doubled)' if session.doubled else ''}\n\n"
+            f"**Your Hand:** {' '.join(card_name(c) for c in session.player)} = {player}\n"
+            f"**Dealer's Hand:** {dealer}"
+        )
+        if outcome is None:
+            embed = discord.Embed(title="♠️♥️♣️♦️ BLACKJACK ♠️♥️♣️♦️", description=description, color=0xff0000)
+            embed.set_footer(text="Hit, stand or double down")
+            return embed
         
-        # Create result embed
+        if timed_out:
+            description += "\n\n*No move in time, so you stood.*"
+        description += f"\n\n**Result:** {BLACKJACK_RESULTS[outcome]}\n**Payout:** ${winnings:,}"
         embed = discord.Embed(
             title="♠️♥️♣️♦️ BLACKJACK ♠️♥️♣️♦️",
-            description=f"**Bet:** ${bet:,}\n\n"
-                      f"**Your Hand:** {player_cards} = {player_total}\n"
-                      f"**Dealer's Hand:** {dealer_cards[0]} + ? = ?+\n\n"
-                      f"**Result:** {result}\n"
-                      f"**Payout:** ${winnings:,}",
-            color=0x00ff00 if multiplier > 1 else 0xff0000 if multiplier == 0 else 0xffff00
+            description=description,
+            color=0x00ff00 if winnings > session.stake else 0xff0000 if winnings == 0 else 0xffff00
         )
-        
-        if player_total == 21:
+        if outcome == BLACKJACK:
             embed.add_field(name="🎰", value="**BLACKJACK!** Natural 21!")
-        
-        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> New balance: ${data['wallet']:,}")
-        await interaction.edit_original_response(embed=embed)
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> New balance: ${wallet:,}")
+        return embed
     
     @app_commands.command(name="rob", description="Attempt to steal from another user")
     @app_commands.describe(user="User to rob")
@@ -181,53 +267,120 @@ class Economy(commands.Cog):
                 description="You can't rob yourself!",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send(interaction, embed=embed, ephemeral=True)
             return
         
-        robber_data = self.get_user_data(interaction.user.id)
-        target_data = self.get_user_data(user.id)
+        outcome, amount, robber_data, target_data = await self.economy.rob(interaction.user.id, user.id)
         
-        if target_data['wallet'] < 100:
+        if outcome == TOO_POOR:
             embed = discord.Embed(
                 title="💸 Too Poor",
                 description=f"{user.mention} doesn't have enough cash to rob (minimum $100).",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed)
+            await send(interaction, embed=embed)
             return
         
-        success_chance = 0.4  # 40% success rate
-        if random.random() < success_chance:
+        if outcome == ROBBED:
             # Successful robbery
-            amount = random.randint(50, min(500, target_data['wallet']))
-            robber_data['wallet'] += amount
-            target_data['wallet'] -= amount
-            self.save_data()
-            
             embed = discord.Embed(
                 title="🎭 Successful Robbery!",
                 description=f"You stole **${amount:,}** from {user.mention}!\n\n"
-                          f"**Your new balance:** ${robber_data['wallet']:,}\n"
-                          f"**Their remaining:** ${target_data['wallet']:,}",
+                          f"**Your new balance:** ${robber_data.wallet:,}\n"
+                          f"**Their remaining:** ${target_data.wallet:,}",
                 color=0x00ff00
             )
         else:
             # Failed robbery - fine
-            fine = random.randint(100, 500)
-            robber_data['wallet'] -= fine
-            robber_data['wallet'] = max(0, robber_data['wallet'])
-            self.save_data()
-            
             embed = discord.Embed(
                 title="🚓 Caught Red-Handed!",
                 description=f"You were caught trying to rob {user.mention}!\n"
-                          f"**Fine:** ${fine:,}\n\n"
-                          f"**Your new balance:** ${robber_data['wallet']:,}",
+                          f"**Fine:** ${amount:,}\n\n"
+                          f"**Your new balance:** ${robber_data.wallet:,}",
                 color=0xff0000
             )
         
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Crime doesn't pay... usually")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
+
+    @app_commands.command(name="transactions", description="Show recent wallet transactions")
+    @app_commands.describe(user="User to look up (defaults to you)", limit="Number of entries to show")
+    async def transactions(self, interaction: discord.Interaction, user: discord.Member = None, limit: app_commands.Range[int, 1, 25] = 10):
+        user = user or interaction.user
+        lines = []
+        for entry in await self.economy.history(user.id, limit=limit):
+            sign = "+" if entry.delta > 0 else "-"
+            line = f"<t:{int(entry.timestamp)}:R> **{entry.kind.replace('_', ' ').title()}** {sign}${abs(entry.delta):,} → ${entry.balance:,}"
+            if entry.counterparty:
+                line += f" (<@{entry.counterparty}>)"
+            lines.append(line)
+        
+        embed = discord.Embed(
+            title=f"<:success:{self.bot.emoji_ids['success']}> Transaction History",
+            description=f"**Account Holder:** {user.mention}\n\n" + ("\n".join(lines) or "*No transactions yet.*"),
+            color=0xff0000
+        )
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Showing up to {limit} recent entries")
+        await send(interaction, embed=embed)
+
+    @app_commands.command(name="leaderboard", description="Show the richest users")
+    @app_commands.describe(page="Page number")
+    async def leaderboard_command(self, interaction: discord.Interaction, page: app_commands.Range[int, 1, 1000] = 1):
+        if not await self.economy.leaderboard_loaded():
+            embed = discord.Embed(
+                title="⏳ Leaderboard Loading",
+                description="The leaderboard is still being built. Try again in a moment.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        entries, ranked = await self.economy.leaderboard_page(10, (page - 1) * 10)
+        lines = [f"**#{rank}** <@{user_id}> — ${score:,}" for rank, user_id, score in entries]
+        
+        embed = discord.Embed(
+            title=f"<:success:{self.bot.emoji_ids['success']}> Wealth Leaderboard",
+            description="\n".join(lines) or "*No one on this page yet.*",
+            color=0xff0000
+        )
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Page {page} • {ranked:,} ranked accounts")
+        await send(interaction, embed=embed)
+    
+    @app_commands.command(name="rank", description="Show your position on the wealth leaderboard")
+    @app_commands.describe(user="User to look up (defaults to you)")
+    async def rank(self, interaction: discord.Interaction, user: discord.Member = None):
+        user = user or interaction.user
+        if not await self.economy.leaderboard_loaded():
+            embed = discord.Embed(
+                title="⏳ Leaderboard Loading",
+                description="The leaderboard is still being built. Try again in a moment.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        standing = await self.economy.standing(user.id)
+        if standing is None:
+            embed = discord.Embed(
+                title="📉 Unranked",
+                description=f"{user.mention} hasn't made any transactions yet.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        rank, ranked, around = standing
+        lines = [
+            f"{'➡️ ' if user_id == user.id else ''}**#{position}** <@{user_id}> — ${score:,}"
+            for position, user_id, score in around
+        ]
+        embed = discord.Embed(
+            title=f"<:success:{self.bot.emoji_ids['success']}> Leaderboard Rank",
+            description=f"{user.mention} is ranked **#{rank:,}** of {ranked:,}\n\n" + "\n".join(lines),
+            color=0xff0000
+        )
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+        await send(interaction, embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Economy(bot))
@@ -5,13 +5,199 @@ import asyncio
 from datetime import datetime, timedelta
 import json
 import os
+import time
+
+from utils.raid_detector import RaidDetector, YOUNG_ACCOUNT
+from utils.responses import respond, send
+from utils.rest_scheduler import COSMETIC, MODERATION, SECURITY
+from utils.guild_config import GuildConfigStore
+
+PROGRESS_INTERVAL = 1.0
+# Flagged joins are collected for this long and then actioned together
+RAID_BATCH_DELAY = 1.0
+RAID_ACTION = "kick"
 
 class Security(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.antinuke_enabled = False
-        self.blacklisted_words = []
-        self.whitelist = []
+        # Per-guild antinuke flag, anti-alt threshold, whitelist and word filter
+        self.config = GuildConfigStore("data/guild_config.db")
+        self.raid_detector = RaidDetector()
+        # guild_id -> {member_id: reason} waiting for the next batch
+        self.pending_actions = {}
+        # Running flush_raid_actions tasks, kept so they are not garbage collected mid-batch
+        self.raid_tasks = set()
+        # guild_id -> {"status", "channel_id", "overwrites": {channel_id: [allow, deny] | None}, "done": [channel_id]}
+        # One file per guild, so cluster workers never rewrite each other's lockdowns
+        self.lockdown_dir = "data/lockdowns"
+        self.lockdowns = self.load_lockdowns()
+        
+    def load_lockdowns(self):
+        """Lockdown state for the guilds this process owns."""
+        self.migrate_lockdowns("data/lockdowns.json")
+        lockdowns = {}
+        if not os.path.isdir(self.lockdown_dir):
+            return lockdowns
+        for name in os.listdir(self.lockdown_dir):
+            guild_id, ext = os.path.splitext(name)
+            if ext != ".json" or not guild_id.isdigit() or not self.bot.owns_guild(int(guild_id)):
+                continue
+            with open(os.path.join(self.lockdown_dir, name), 'r') as f:
+                lockdowns[guild_id] = json.load(f)
+        return lockdowns
+    
+    def migrate_lockdowns(self, legacy_file):
+        """Split the old all-guilds lockdowns.json into per-guild files, then retire it."""
+        try:
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except FileNotFoundError:
+            # Never written, or another worker already migrated it
+            return
+        os.makedirs(self.lockdown_dir, exist_ok=True)
+        for guild_id, state in legacy.items():
+            if not os.path.exists(self.lockdown_path(guild_id)):
+                self.write_lockdown(guild_id, state)
+        try:
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except FileNotFoundError:
+            pass
+    
+    def lockdown_path(self, guild_id):
+        return os.path.join(self.lockdown_dir, f"{guild_id}.json")
+    
+    def write_lockdown(self, guild_id, state):
+        path = self.lockdown_path(guild_id)
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, path)
+    
+    def save_lockdown(self, guild_id):
+        """Persist one guild's lockdown state, or remove its file once the lockdown is gone."""
+        guild_id = str(guild_id)
+        state = self.lockdowns.get(guild_id)
+        if state is None:
+            try:
+                os.remove(self.lockdown_path(guild_id))
+            except FileNotFoundError:
+                pass
+            return
+        os.makedirs(self.lockdown_dir, exist_ok=True)
+        self.write_lockdown(guild_id, state)
+    
+    async def cog_load(self):
+        self.resume_task = asyncio.create_task(self.resume_lockdowns())
+    
+    async def cog_unload(self):
+        self.resume_task.cancel()
+        for task in self.raid_tasks:
+            task.cancel()
+        self.config.close()
+    
+    async def resume_lockdowns(self):
+        """Finish lockdowns/unlocks that were interrupted by a restart."""
+        await self.bot.wait_until_ready()
+        for guild_id, state in list(self.lockdowns.items()):
+            guild = self.bot.get_guild(int(guild_id))
+            if guild is None or state["status"] == "locked":
+                continue
+            
+            if state["status"] == "locking":
+                done, failed = await self.apply_lockdown(guild, state)
+                title = f"<:locked:{self.bot.emoji_ids['locked']}> LOCKDOWN RESUMED"
+            else:
+                done, failed = await self.apply_unlock(guild, state)
+                title = "🔓 UNLOCK RESUMED"
+            
+            channel = guild.get_channel(state["channel_id"])
+            if channel:
+                try:
+                    await channel.send(embed=self.progress_embed(title, done, len(state["overwrites"]), failed))
+                except discord.HTTPException:
+                    pass
+    
+    def progress_embed(self, title, done, total, failed):
+        description = f"**{done}/{total} channels** processed."
+        if failed:
+            description += f"\n**Failed ({len(failed)}):** " + ", ".join(f"<#{channel_id}>" for channel_id in failed[:20])
+            if len(failed) > 20:
+                description += f" (+{len(failed) - 20} more)"
+        return discord.Embed(title=title, description=description, color=0xff0000)
+    
+    async def edit_channels(self, guild, state, edit, on_progress=None):
+        """Run edit(channel, previous) for every channel not yet done, concurrently.
+        
+        Edits go through the bot's REST scheduler in the security lane.
+        Progress is checkpointed to disk so a restart picks up where it stopped.
+        Returns (done count, failed channel ids).
+        """
+        done = set(state["done"])
+        failed = []
+        last_report = time.monotonic()
+        
+        async def run(channel_id, previous):
+            nonlocal last_report
+            channel = guild.get_channel(int(channel_id))
+            try:
+                if channel is not None:
+                    await self.bot.rest.run(
+                        lambda: edit(channel, previous),
+                        lane=SECURITY, route="channel_permissions", key=f"lockdown:{guild.id}"
+                    )
+                done.add(channel_id)
+            except discord.HTTPException:
+                failed.append(channel_id)
+            
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                state["done"] = list(done)
+                self.save_lockdown(guild.id)
+                if on_progress:
+                    try:
+                        await on_progress(len(done), failed)
+                    except discord.HTTPException:
+                        pass
+        
+        await asyncio.gather(*(
+            run(channel_id, previous)
+            for channel_id, previous in state["overwrites"].items()
+            if channel_id not in done
+        ))
+        state["done"] = list(done)
+        return len(done), failed
+    
+    async def apply_lockdown(self, guild, state, on_progress=None):
+        async def lock(channel, previous):
+            overwrite = channel.overwrites_for(guild.default_role)
+            overwrite.send_messages = False
+            await channel.set_permissions(guild.default_role, overwrite=overwrite, reason="Lockdown")
+        
+        done, failed = await self.edit_channels(guild, state, lock, on_progress)
+        state["status"] = "locked"
+        state["done"] = []
+        self.save_lockdown(guild.id)
+        return done, failed
+    
+    async def apply_unlock(self, guild, state, on_progress=None):
+        async def unlock(channel, previous):
+            if previous is None:
+                await channel.set_permissions(guild.default_role, overwrite=None, reason="Lockdown lifted")
+            else:
+                allow, deny = previous
+                overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+                await channel.set_permissions(guild.default_role, overwrite=overwrite, reason="Lockdown lifted")
+        
+        done, failed = await self.edit_channels(guild, state, unlock, on_progress)
+        if failed:
+            # Keep the snapshot for the channels we could not restore
+            state["overwrites"] = {channel_id: state["overwrites"][channel_id] for channel_id in failed}
+            state["status"] = "locked"
+            state["done"] = []
+        else:
+            self.lockdowns.pop(str(guild.id), None)
+        self.save_lockdown(guild.id)
+        return done, failed
         
     @app_commands.command(name="antinuke", description="Enable high-security mode")
     @app_commands.describe(action="Turn antinuke on or off")
@@ -26,23 +212,168 @@ class Security(commands.Cog):
                 description="You need administrator permissions to use this command.",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send(interaction, embed=embed, ephemeral=True)
             return
         
-        self.antinuke_enabled = (action == "on")
+        enabled = (action == "on")
+        await self.config.update(interaction.guild.id, lambda settings: setattr(settings, "antinuke", enabled))
+        if not enabled:
+            self.raid_detector.reset(interaction.guild.id)
         
         embed = discord.Embed(
             title=f"<:raid:{self.bot.emoji_ids['raid']}> Anti-Nuke System",
-            description=f"**Status:** {'🟢 **ENABLED**' if self.antinuke_enabled else '🔴 **DISABLED**'}\n"
-                       f"High-security mode has been {'activated' if self.antinuke_enabled else 'deactivated'}.",
-            color=0xff0000 if self.antinuke_enabled else 0x555555
+            description=f"**Status:** {'🟢 **ENABLED**' if enabled else '🔴 **DISABLED**'}\n"
+                       f"High-security mode has been {'activated' if enabled else 'deactivated'} for this server.",
+            color=0xff0000 if enabled else 0x555555
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is None or message.author.bot or not message.content:
+            return
+        settings = self.config.get(message.guild.id)
+        word_filter = settings.word_filter
+        if not word_filter or message.author.id in settings.whitelist:
+            return
+        if word_filter.find(message.content) is None:
+            return
+        if getattr(message.author, "guild_permissions", None) and message.author.guild_permissions.manage_messages:
+            return
+        
+        try:
+            await self.bot.rest.run(
+                lambda: message.delete(),
+                lane=MODERATION, route="message_delete"
+            )
+            await self.bot.rest.run(
+                lambda: message.channel.send(f"{message.author.mention}, that word is not allowed here.", delete_after=5),
+                lane=COSMETIC, route="send_message"
+            )
+        except discord.HTTPException:
+            pass
+    
+    @app_commands.command(name="blacklist", description="Manage blacklisted words for this server")
+    @app_commands.describe(action="Add, remove or list words", word="Word to add or remove; prefix with * to also match inside longer words")
+    @app_commands.choices(action=[
+        app_commands.Choice(name="add", value="add"),
+        app_commands.Choice(name="remove", value="remove"),
+        app_commands.Choice(name="list", value="list")
+    ])
+    async def blacklist(self, interaction: discord.Interaction, action: str, word: str = None):
+        if not interaction.user.guild_permissions.manage_messages:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need the Manage Messages permission to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        guild_id = interaction.guild.id
+        if action == "list":
+            words = sorted(self.config.get(guild_id).blacklisted_words)
+            description = ", ".join(f"`{w}`" for w in words[:100]) or "*No blacklisted words.*"
+            if len(words) > 100:
+                description += f" (+{len(words) - 100} more)"
+        elif not word:
+            description = "Please provide a word."
+        elif action == "add":
+            added = await self.config.update(guild_id, lambda settings: settings.word_filter.add(word))
+            description = f"Added `{word}` to the blacklist." if added else f"`{word}` is already blacklisted."
+        else:
+            removed = await self.config.update(guild_id, lambda settings: settings.word_filter.remove(word))
+            description = f"Removed `{word}` from the blacklist." if removed else f"`{word}` is not blacklisted."
+        word_filter = self.config.get(guild_id).word_filter
+        
+        embed = discord.Embed(
+            title=f"<:raid:{self.bot.emoji_ids['raid']}> Word Blacklist",
+            description=description,
+            color=0xff0000
+        )
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> {len(word_filter)} blacklisted words")
+        await send(interaction, embed=embed, ephemeral=True)
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        guild = member.guild
+        settings = self.config.get(guild.id)
+        if member.bot or member.id in settings.whitelist:
+            return
+        days = settings.anti_alt_days
+        if not settings.antinuke and not days:
+            return
+        
+        flagged = self.raid_detector.on_join(
+            guild.id, member.id, time.time(), member.created_at.timestamp(), min_account_age=days * 86400,
+            join_threshold=settings.raid_joins, window=settings.raid_window
+        )
+        if not settings.antinuke:
+            # Without antinuke only the account-age rule applies
+            flagged = [(member_id, reason) for member_id, reason in flagged if reason == YOUNG_ACCOUNT]
+        if not flagged:
+            return
+        
+        pending = self.pending_actions.get(guild.id)
+        if pending is None:
+            pending = self.pending_actions[guild.id] = {}
+            task = asyncio.create_task(self.flush_raid_actions(guild))
+            self.raid_tasks.add(task)
+            task.add_done_callback(self.raid_tasks.discard)
+        for member_id, reason in flagged:
+            pending.setdefault(member_id, reason)
+    
+    async def flush_raid_actions(self, guild):
+        await asyncio.sleep(RAID_BATCH_DELAY)
+        pending = self.pending_actions.pop(guild.id, {})
+        
+        async def act(member_id, reason):
+            target = discord.Object(id=member_id)
+            if reason == YOUNG_ACCOUNT:
+                days = self.config.get(guild.id).anti_alt_days
+                action = lambda: guild.kick(target, reason=f"Anti-alt: account younger than {days} days")
+                route = "member_kick"
+            elif RAID_ACTION == "ban":
+                action = lambda: guild.ban(target, reason=f"Anti-raid: {reason.replace('_', ' ')}", delete_message_days=1)
+                route = "member_ban"
+            else:
+                action = lambda: guild.kick(target, reason=f"Anti-raid: {reason.replace('_', ' ')}")
+                route = "member_kick"
+            try:
+                await self.bot.rest.run(action, lane=SECURITY, route=route, key=f"raid:{guild.id}")
+                return True
+            except discord.HTTPException:
+                return False
+        
+        results = await asyncio.gather(*(act(member_id, reason) for member_id, reason in pending.items()))
+        raiders = sum(1 for reason in pending.values() if reason != YOUNG_ACCOUNT)
+        if raiders and guild.system_channel:
+            embed = discord.Embed(
+                title=f"<:raid:{self.bot.emoji_ids['raid']}> Raid Detected",
+                description=f"Removed **{sum(results)}/{len(pending)}** suspicious accounts "
+                           f"({raiders} flagged by join rate or creation batch).",
+                color=0xff0000
+            )
+            try:
+                await self.bot.rest.run(lambda: guild.system_channel.send(embed=embed), lane=COSMETIC, route="send_message")
+            except discord.HTTPException:
+                pass
     
     @app_commands.command(name="anti_alt", description="Auto-kick accounts younger than X days")
     @app_commands.describe(days="Minimum account age in days")
     async def anti_alt(self, interaction: discord.Interaction, days: int):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        days = max(0, days)
+        await self.config.update(interaction.guild.id, lambda settings: setattr(settings, "anti_alt_days", days))
         embed = discord.Embed(
             title=f"<:raid:{self.bot.emoji_ids['raid']}> Anti-Alt System",
             description=f"Accounts younger than **{days} days** will be automatically kicked.\n"
@@ -50,38 +381,168 @@ class Security(commands.Cog):
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
     
-    @app_commands.command(name="lockdown", description="Seal all channels instantly")
-    async def lockdown(self, interaction: discord.Interaction):
-        loading_embed = discord.Embed(
-            title=f"<:loading:{self.bot.emoji_ids['loading']}> Initiating Lockdown Protocol...",
-            color=0xff0000
-        )
-        await interaction.response.send_message(embed=loading_embed)
+    @app_commands.command(name="raid_threshold", description="Set how many joins in how many seconds count as a raid")
+    @app_commands.describe(joins="Joins that trigger raid mode", seconds="Window the joins are counted over")
+    async def raid_threshold(self, interaction: discord.Interaction, joins: int, seconds: int = 10):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
         
-        await asyncio.sleep(1.5)
+        joins = max(2, joins)
+        seconds = max(1, seconds)
         
-        guild = interaction.guild
-        locked = 0
+        def change(settings):
+            settings.raid_joins = joins
+            settings.raid_window = seconds
+        await self.config.update(interaction.guild.id, change)
+        embed = discord.Embed(
+            title=f"<:raid:{self.bot.emoji_ids['raid']}> Anti-Raid Threshold",
+            description=f"Raid mode starts after **{joins} joins** within **{seconds} seconds**.\n"
+                       f"*Applies while antinuke is enabled.*",
+            color=0xff0000
+        )
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+        await send(interaction, embed=embed)
+    
+    @app_commands.command(name="whitelist", description="Exempt trusted users from anti-raid and word filtering")
+    @app_commands.describe(action="Add, remove or list users", user="User to add or remove")
+    @app_commands.choices(action=[
+        app_commands.Choice(name="add", value="add"),
+        app_commands.Choice(name="remove", value="remove"),
+        app_commands.Choice(name="list", value="list")
+    ])
+    async def whitelist(self, interaction: discord.Interaction, action: str, user: discord.Member = None):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
         
-        for channel in guild.channels:
-            try:
-                overwrite = channel.overwrites_for(guild.default_role)
-                overwrite.send_messages = False
-                await channel.set_permissions(guild.default_role, overwrite=overwrite)
-                locked += 1
-            except:
-                pass
+        guild_id = interaction.guild.id
+        if action == "list":
+            user_ids = sorted(self.config.get(guild_id).whitelist)
+            description = ", ".join(f"<@{user_id}>" for user_id in user_ids[:50]) or "*No whitelisted users.*"
+        elif user is None:
+            description = "Please provide a user."
+        elif action == "add":
+            await self.config.update(guild_id, lambda settings: settings.whitelist.add(user.id))
+            description = f"{user.mention} is now whitelisted."
+        else:
+            await self.config.update(guild_id, lambda settings: settings.whitelist.discard(user.id))
+            description = f"{user.mention} is no longer whitelisted."
         
         embed = discord.Embed(
-            title=f"<:locked:{self.bot.emoji_ids['locked']}> LOCKDOWN ACTIVATED",
-            description=f"**{locked} channels** have been sealed.\n"
-                       f"Only staff can send messages until lockdown is lifted.",
+            title=f"<:raid:{self.bot.emoji_ids['raid']}> Security Whitelist",
+            description=description,
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
-        await interaction.edit_original_response(embed=embed)
+        await send(interaction, embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="lockdown", description="Seal all channels instantly")
+    async def lockdown(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        guild = interaction.guild
+        if str(guild.id) in self.lockdowns:
+            embed = discord.Embed(
+                title=f"<:locked:{self.bot.emoji_ids['locked']}> Already Locked",
+                description="A lockdown is already active. Use `/unlock` to lift it.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        # Snapshot the current @everyone overwrites before touching anything
+        overwrites = {}
+        for channel in guild.channels:
+            previous = channel.overwrites.get(guild.default_role)
+            overwrites[str(channel.id)] = [pair.value for pair in previous.pair()] if previous else None
+        state = self.lockdowns[str(guild.id)] = {
+            "status": "locking",
+            "channel_id": interaction.channel_id,
+            "overwrites": overwrites,
+            "done": []
+        }
+        self.save_lockdown(guild.id)
+        
+        title = f"<:loading:{self.bot.emoji_ids['loading']}> Initiating Lockdown Protocol..."
+        
+        async def lock(responder):
+            async def on_progress(done, failed):
+                await responder.update(embed=self.progress_embed(title, done, len(overwrites), failed))
+            
+            locked, failed = await self.apply_lockdown(guild, state, on_progress)
+            
+            embed = self.progress_embed(f"<:locked:{self.bot.emoji_ids['locked']}> LOCKDOWN ACTIVATED", locked, len(overwrites), failed)
+            embed.description += f"\n**{locked} channels** have been sealed.\n" \
+                                 f"Only staff can send messages until lockdown is lifted with `/unlock`."
+            embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+            return embed
+        
+        await respond(interaction, lock)
+    
+    @app_commands.command(name="unlock", description="Lift the lockdown and restore channel permissions")
+    async def unlock(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        guild = interaction.guild
+        state = self.lockdowns.get(str(guild.id))
+        # Only a completed lockdown can be lifted, and only by one /unlock at a time
+        if state is None or state["status"] != "locked":
+            embed = discord.Embed(
+                title="🔓 Nothing to Unlock",
+                description="There is no completed lockdown to lift in this server.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        state["status"] = "unlocking"
+        state["channel_id"] = interaction.channel_id
+        self.save_lockdown(guild.id)
+        total = len(state["overwrites"])
+        
+        title = f"<:loading:{self.bot.emoji_ids['loading']}> Lifting Lockdown..."
+        
+        async def lift(responder):
+            async def on_progress(done, failed):
+                await responder.update(embed=self.progress_embed(title, done, total, failed))
+            
+            restored, failed = await self.apply_unlock(guild, state, on_progress)
+            
+            embed = self.progress_embed("🔓 LOCKDOWN LIFTED", restored, total, failed)
+            embed.description += "\nPrevious channel permissions have been restored."
+            if failed:
+                embed.description += "\nRun `/unlock` again to retry the failed channels."
+            embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+            return embed
+        
+        await respond(interaction, lift)
     
     @app_commands.command(name="strip_staff", description="Remove all admin roles in emergency")
     async def strip_staff(self, interaction: discord.Interaction):
@@ -91,7 +552,7 @@ class Security(commands.Cog):
                 description="Only the server owner can use this command.",
                 color=0xff0000
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send(interaction, embed=embed, ephemeral=True)
             return
         
         confirm_embed = discord.Embed(
@@ -100,34 +561,63 @@ class Security(commands.Cog):
                        "**Type `CONFIRM STRIP` to proceed.**",
             color=0xff0000
         )
-        await interaction.response.send_message(embed=confirm_embed)
-        
-        def check(m):
-            return m.author == interaction.user and m.content == "CONFIRM STRIP"
+        await send(interaction, embed=confirm_embed)
         
         try:
-            await self.bot.wait_for('message', timeout=30, check=check)
+            await self.bot.router.wait_for(
+                guild_id=interaction.guild.id, author_id=interaction.user.id,
+                check=lambda m: m.content == "CONFIRM STRIP", timeout=30
+            )
         except asyncio.TimeoutError:
             return
         
-        stripped = 0
-        for member in interaction.guild.members:
-            if member == interaction.user:
+        guild = interaction.guild
+        admin_roles = [role for role in guild.roles if role.permissions.administrator and not role.is_default()]
+        removable = [role for role in admin_roles if role.is_assignable()]
+        unremovable = [role for role in admin_roles if not role.is_assignable()]
+        
+        # One pass over the members, checking each against the admin roles (Role.members
+        # would rescan the whole member cache for every role). Lean cache profiles do not
+        # keep members around; fetch them for this run only.
+        members = guild.members if guild.chunked else await guild.chunk(cache=False)
+        targets = {}
+        for member in members:
+            if member.id == interaction.user.id:
                 continue
-                
-            # Remove admin roles
-            admin_roles = [role for role in member.roles if role.permissions.administrator]
-            if admin_roles:
-                try:
-                    await member.remove_roles(*admin_roles)
-                    stripped += 1
-                except:
-                    pass
+            roles = [role for role in removable if member.get_role(role.id)]
+            if roles:
+                targets[member.id] = (member, roles)
+        
+        failures = []
+        
+        async def strip(member, roles):
+            try:
+                await self.bot.rest.run(
+                    lambda: member.remove_roles(*roles, reason="Emergency staff strip"),
+                    lane=SECURITY, route="member_roles", key=f"strip_staff:{guild.id}"
+                )
+                return True
+            except discord.HTTPException as e:
+                failures.append((member, e))
+                return False
+        
+        results = await asyncio.gather(*(strip(member, roles) for member, roles in targets.values()))
+        stripped = sum(results)
+        
+        description = f"Removed admin permissions from **{stripped} members**.\n" \
+                      f"Only you retain full control."
+        if failures:
+            description += f"\n\n**Failed ({len(failures)}):**\n" + "\n".join(
+                f"• {member.mention}: {getattr(e, 'text', '') or type(e).__name__}" for member, e in failures[:15]
+            )
+            if len(failures) > 15:
+                description += f"\n(+{len(failures) - 15} more)"
+        if unremovable:
+            description += "\n\n**Roles above the bot (not removed):** " + ", ".join(role.mention for role in unremovable)
         
         embed = discord.Embed(
             title="🛡️ Staff Stripped",
-            description=f"Removed admin permissions from **{stripped} members**.\n"
-                       f"Only you retain full control.",
+            description=description,
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Emergency protocol executed")
@@ -1,17 +1,110 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
 from datetime import datetime
 
+from utils.guild_stats import GuildStats
+from utils.metrics import (
+    COMMAND_ERRORS, COMMAND_SECONDS, EVENT_SECONDS, LOOP_LAG, LOOP_LAG_SECONDS, REST_RATE_LIMITED,
+    REST_REQUESTS, STORE_WRITE_SECONDS
+)
+from utils.responses import respond, send
+from utils.rest_scheduler import COSMETIC
+
+# Rows per section in /stats
+STATS_ROWS = 5
+
+# Full recount of the tracked guilds' stats that were viewed since the last one, to correct drift from missed events
+STATS_RECOUNT_MINUTES = 30
+
 class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.stats = GuildStats()
+        # Guilds whose /server_info was used since the last recount
+        self.stats_viewed = set()
         
+    async def cog_load(self):
+        self.recount_stats.start()
+    
+    async def cog_unload(self):
+        self.recount_stats.cancel()
+    
+    def is_online(self, member):
+        return self.bot.intents.presences and member.status != discord.Status.offline
+    
+    async def count_guild(self, guild):
+        if guild.chunked:
+            members = guild.members
+        else:
+            # Members are not cached in this cache profile; fetch them for the count only
+            members = await guild.chunk(cache=False)
+        online = None
+        if not (guild.chunked and self.bot.intents.presences):
+            counts = await self.bot.rest.run(
+                lambda: self.bot.fetch_guild(guild.id, with_counts=True), lane=COSMETIC, route="guild_fetch"
+            )
+            online = counts.approximate_presence_count
+        return self.stats.recount(guild.id, members, self.is_online, online)
+    
+    @tasks.loop(minutes=STATS_RECOUNT_MINUTES)
+    async def recount_stats(self):
+        viewed, self.stats_viewed = self.stats_viewed, set()
+        for guild_id in self.stats.tracked():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                self.stats.forget(guild_id)
+                continue
+            if guild_id not in viewed:
+                # Nobody looked: keep event-maintained counters where members are cached, but never
+                # download a whole member list for an idle guild; its next /server_info counts afresh
+                if not guild.chunked:
+                    self.stats.forget(guild_id)
+                continue
+            try:
+                await self.count_guild(guild)
+            except (discord.HTTPException, discord.ClientException):
+                pass
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.stats.member_joined(member.guild.id, member.bot, self.is_online(member))
+    
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        user = payload.user
+        # user is the cached Member when there was one, otherwise a plain User
+        cached = isinstance(user, discord.Member)
+        self.stats.member_left(
+            payload.guild_id, user.bot,
+            cached and self.is_online(user),
+            cached and user.premium_since is not None
+        )
+    
+    @commands.Cog.listener()
+    async def on_presence_update(self, before, after):
+        self.stats.presence_changed(after.guild.id, self.is_online(before), self.is_online(after))
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        self.stats.boost_changed(after.guild.id, before.premium_since is not None, after.premium_since is not None)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.stats.forget(guild.id)
+    
     @app_commands.command(name="server_info", description="Get detailed server statistics")
     async def server_info(self, interaction: discord.Interaction):
-        guild = interaction.guild
+        self.stats_viewed.add(interaction.guild.id)
+        
+        async def describe(responder):
+            counts = self.stats.get(interaction.guild.id) or await self.count_guild(interaction.guild)
+            return self.server_info_embed(interaction.guild, counts)
         
+        await respond(interaction, describe)
+    
+    def server_info_embed(self, guild, counts):
         # Get server boost level emoji
         boost_level = guild.premium_tier
         boost_emoji = ["⚪", "🟢", "🟡", "🔴"][boost_level] if boost_level < 4 else "🟣"
@@ -23,8 +116,7 @@ class Utility(commands.Cog):
         
         # Calculate member stats
         total_members = guild.member_count
-        online_members = len([m for m in guild.members if m.status != discord.Status.offline])
-        bot_count = len([m for m in guild.members if m.bot])
+        online_members = f"{counts.online:,}" if counts.online_exact else f"~{counts.online:,}"
         
         embed = discord.Embed(
             title=f"<:mod:{self.bot.emoji_ids['mod']}> Server Information",
@@ -33,14 +125,14 @@ class Utility(commands.Cog):
             timestamp=datetime.now()
         )
         
-        embed.add_field(name="👑 Owner", value=f"{guild.owner.mention}", inline=True)
+        embed.add_field(name="👑 Owner", value=f"<@{guild.owner_id}>", inline=True)
         embed.add_field(name="🆔 Server ID", value=f"`{guild.id}`", inline=True)
         embed.add_field(name="📅 Created", value=f"<t:{int(guild.created_at.timestamp())}:R>", inline=True)
         
         embed.add_field(name="👥 Members", 
                        value=f"**Total:** {total_members:,}\n"
-                             f"**Online:** {online_members:,}\n"
-                             f"**Bots:** {bot_count:,}", 
+                             f"**Online:** {online_members}\n"
+                             f"**Bots:** {counts.bots:,}", 
                        inline=True)
         
         embed.add_field(name="📊 Channels", 
@@ -52,7 +144,7 @@ class Utility(commands.Cog):
         embed.add_field(name="🚀 Boosts", 
                        value=f"**Level:** {boost_level}\n"
                              f"**Boosts:** {guild.premium_subscription_count}\n"
-                             f"**Boosters:** {len(guild.premium_subscribers)}", 
+                             f"**Boosters:** {counts.boosters:,}", 
                        inline=True)
         
         embed.add_field(name="🔐 Security", 
@@ -69,12 +161,23 @@ class Utility(commands.Cog):
             embed.set_thumbnail(url=guild.icon.url)
         
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
-        await interaction.response.send_message(embed=embed)
+        return embed
     
     @app_commands.command(name="userinfo", description="Deep dive into a user's account")
     async def userinfo(self, interaction: discord.Interaction, user: discord.Member = None):
-        if not user:
-            user = interaction.user
+        async def investigate(responder):
+            return await self.userinfo_embed(interaction.guild, user or interaction.user)
+        
+        await respond(interaction, investigate)
+    
+    async def userinfo_embed(self, guild, user):
+        # Fetch on demand what the cache profile may not keep: the member
+        # itself and the profile banner, which only comes with a user fetch
+        if not isinstance(user, discord.Member):
+            user = guild.get_member(user.id) or await self.bot.rest.run(
+                lambda user_id=user.id: guild.fetch_member(user_id), lane=COSMETIC, route="member_fetch"
+            )
+        profile = await self.bot.rest.run(lambda: self.bot.fetch_user(user.id), lane=COSMETIC, route="user_fetch")
         
         # Get user roles (excluding @everyone)
         roles = [role.mention for role in user.roles[1:]]  # Skip @everyone
@@ -120,7 +223,7 @@ class Utility(commands.Cog):
         embed.add_field(name="🎨 Appearance", 
                        value=f"**Color:** `{str(user.color)}`\n"
                              f"**Avatar:** [Link]({user.avatar.url if user.avatar else 'None'})\n"
-                             f"**Banner:** {'✅' if user.banner else '❌'}", 
+                             f"**Banner:** {'✅' if profile.banner else '❌'}", 
                        inline=True)
         
         embed.add_field(name="👑 Top Role", 
@@ -132,10 +235,12 @@ class Utility(commands.Cog):
                        value=", ".join(key_permissions[:5]) or "None", 
                        inline=True)
         
-        embed.add_field(name="📊 Status", 
-                       value=f"**Current:** {str(user.status).title()}\n"
-                             f"**Activity:** {user.activity.name if user.activity else 'None'}", 
-                       inline=True)
+        if self.bot.intents.presences:
+            status = f"**Current:** {str(user.status).title()}\n" \
+                     f"**Activity:** {user.activity.name if user.activity else 'None'}"
+        else:
+            status = "**Current:** Unknown\n*Presences are not tracked in this cache profile*"
+        embed.add_field(name="📊 Status", value=status, inline=True)
         
         embed.add_field(name="🏷️ Roles", 
                        value=f"**Count:** {len(roles)}\n"
@@ -146,7 +251,7 @@ class Utility(commands.Cog):
             embed.set_thumbnail(url=user.avatar.url)
         
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Investigation complete")
-        await interaction.response.send_message(embed=embed)
+        return embed
     
     @app_commands.command(name="uptime", description="Check how long the bot has been online")
     async def uptime(self, interaction: discord.Interaction):
@@ -163,7 +268,78 @@ class Utility(commands.Cog):
             color=0xff0000
         )
         embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> System operational")
-        await interaction.response.send_message(embed=embed)
+        await send(interaction, embed=embed)
+
+    @app_commands.command(name="stats", description="Command, event, REST and loop metrics (Admin only)")
+    async def stats(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            embed = discord.Embed(
+                title="❌ Permission Denied",
+                description="You need administrator permissions to use this command.",
+                color=0xff0000
+            )
+            await send(interaction, embed=embed, ephemeral=True)
+            return
+        
+        embed = discord.Embed(title="📈 Bot Metrics", color=0xff0000)
+        
+        errors = {}
+        for (command, _), counter in COMMAND_ERRORS.children.items():
+            errors[command] = errors.get(command, 0) + counter.value
+        busiest = sorted(COMMAND_SECONDS.children.items(), key=lambda item: -item[1].count)[:STATS_ROWS]
+        embed.add_field(
+            name="⌨️ Commands (calls, p50 / p99, errors)",
+            value="\n".join(
+                f"`/{name}` {h.count:,} · {_ms(h.quantile(.5))} / {_ms(h.quantile(.99))} · {errors.get(name, 0)}"
+                for (name,), h in busiest
+            ) or "No commands yet",
+            inline=False
+        )
+        
+        slowest = sorted(EVENT_SECONDS.children.items(), key=lambda item: -item[1].quantile(.99))[:STATS_ROWS]
+        embed.add_field(
+            name="📡 Slowest events (p99, calls)",
+            value="\n".join(f"`{name}` {_ms(h.quantile(.99))} · {h.count:,}" for (name,), h in slowest) or "No events yet",
+            inline=False
+        )
+        
+        routes = {}
+        for (route, _), counter in REST_REQUESTS.children.items():
+            routes[route] = routes.get(route, 0) + counter.value
+        limited = {route: counter.value for (route,), counter in REST_RATE_LIMITED.children.items()}
+        top_routes = sorted(routes.items(), key=lambda item: -item[1])[:STATS_ROWS]
+        embed.add_field(
+            name=f"🌐 REST ({sum(routes.values()):,} requests, {sum(limited.values()):,} rate limited)",
+            value="\n".join(f"`{route}` {count:,} · {limited.get(route, 0)} × 429" for route, count in top_routes) or "No requests yet",
+            inline=False
+        )
+        
+        writes = STORE_WRITE_SECONDS.children
+        embed.add_field(
+            name="💾 Store writes (p50 / p99)",
+            value="\n".join(f"`{store}` {_ms(h.quantile(.5))} / {_ms(h.quantile(.99))} · {h.count:,} batches" for (store,), h in writes.items())
+            or "Not in this process",
+            inline=True
+        )
+        lag = LOOP_LAG.labels()
+        embed.add_field(
+            name="⏱️ Event loop lag",
+            value=f"Now {_ms(lag.value)} · p99 {_ms(LOOP_LAG_SECONDS.labels().quantile(.99))}",
+            inline=True
+        )
+        lanes = self.bot.rest.metrics()
+        embed.add_field(
+            name="🚦 REST lanes (queued / running)",
+            value="\n".join(f"`{lane}` {stats['depth']} / {stats['running']}" for lane, stats in lanes.items()),
+            inline=False
+        )
+        
+        embed.set_footer(text=f"<:success:{self.bot.emoji_ids['success']}> Task completed successfully")
+        await send(interaction, embed=embed, ephemeral=True)
+
+def _ms(seconds):
+    # Histogram quantiles are bucket bounds, so one decimal below 10ms is all they carry
+    return f"{seconds * 1000:.1f}ms" if seconds < .01 else f"{seconds * 1000:.0f}ms"
 
 async def setup(bot):
     cog = Utility(bot)
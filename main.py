@@ -3,14 +3,56 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import asyncio
+import time
+
+from utils.cache_profiles import cache_profile
+from utils.cluster import shard_for, watch_supervisor
+from utils.command_sync import CommandSync
+from utils.extensions import ExtensionLoader
+from utils.message_router import MessageRouter
+from utils.metrics import (
+    EVENT_SECONDS, InstrumentedTree, MetricsServer, collect_rest_scheduler, instrument_http,
+    metrics_port, record_command, watch_loop_lag
+)
+from utils.responses import DEFER_THRESHOLD, send
+from utils.rest_scheduler import RestScheduler
+from utils.stall_watchdog import StallWatchdog
+
+LAUNCHED_AT = time.perf_counter()
 
 load_dotenv()
 
+# Extension -> extensions that must be loaded before it. Independent ones load concurrently.
+EXTENSIONS = {
+    'cogs.security': (),
+    'cogs.courtroom': (),
+    'cogs.moderation': (),
+    'cogs.economy': (),
+    'cogs.social': (),
+    'cogs.utility': ()
+}
+# Rarely used extensions with heavy imports (Pillow, roblox.py) load once the gateway is up
+DEFERRED_EXTENSIONS = {
+    'cogs.roblox': (),
+    'cogs.images': ()
+}
+
 # Bot Configuration
-class EliteRedBot(commands.Bot):
+class EliteRedBot(commands.AutoShardedBot):
     def __init__(self):
-        intents = discord.Intents.all()
-        super().__init__(command_prefix='?', intents=intents, help_command=None)
+        # Intents and member/message caching; see utils.cache_profiles
+        self.cache_profile = cache_profile(os.getenv("CACHE_PROFILE", "balanced"))
+        # Under the cluster supervisor (python -m utils.cluster) this process runs a range of
+        # shards; on its own it runs every shard Discord recommends
+        self.cluster_id = int(os.getenv("CLUSTER_ID", "0"))
+        shard_ids = os.getenv("SHARD_IDS")
+        super().__init__(
+            command_prefix='?', help_command=None,
+            shard_ids=[int(shard_id) for shard_id in shard_ids.split(",")] if shard_ids else None,
+            shard_count=int(os.environ["SHARD_COUNT"]) if shard_ids else None,
+            tree_cls=InstrumentedTree,
+            **self.cache_profile.client_options()
+        )
         self.emoji_ids = {
             'raid': 1470413892542005373,
             'mod': 1470413851349745808,
@@ -21,34 +63,86 @@ class EliteRedBot(commands.Bot):
             'loading': 1470413862649073810,
             'locked': 1470413848937762960
         }
+        # Shared queue for REST actions; cogs submit with a priority lane
+        self.rest = RestScheduler()
+        self.extension_loader = ExtensionLoader(self)
+        # Indexed message waiters/consumers; use instead of wait_for('message')
+        self.router = MessageRouter()
+        self.add_listener(self.router.dispatch, 'on_message')
+        # Prometheus-text endpoint and lag watcher, started in setup_hook; see utils.metrics
+        self.metrics_server = None
+        self._lag_watcher = None
+        # Opt-in blocking-code detector for staging: STALL_WATCHDOG=<threshold ms>
+        self.stall_watchdog = None
         
+    def owns_guild(self, guild_id):
+        """Whether the guild's shard runs in this process."""
+        return self.shard_ids is None or shard_for(guild_id, self.shard_count) in self.shard_ids
+    
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            EVENT_SECONDS.labels(event_name).observe(time.perf_counter() - started)
+
+    async def on_app_command_completion(self, interaction, command):
+        record_command(interaction, command)
+
     async def setup_hook(self):
-        # Load all cogs
-        cogs = [
-            'cogs.security',
-            'cogs.courtroom',
-            'cogs.moderation',
-            'cogs.roblox',
-            'cogs.economy',
-            'cogs.social',
-            'cogs.utility',
-            'cogs.images'
-        ]
-        
-        for cog in cogs:
+        if os.getenv("STALL_WATCHDOG"):
+            report = os.getenv("STALL_REPORT", "data/stall_report.txt")
+            if os.getenv("CLUSTER_ID") is not None:
+                report = report.replace(".txt", f".{self.cluster_id}.txt")
+            self.stall_watchdog = StallWatchdog(int(os.environ["STALL_WATCHDOG"]) / 1000, report).start()
+            print(f"Stall watchdog on: stalls over {os.environ['STALL_WATCHDOG']}ms are reported to {report}")
+        self.rest.start()
+        instrument_http(self.http)
+        collect_rest_scheduler(self.rest)
+        self._lag_watcher = asyncio.create_task(watch_loop_lag())
+        # In a cluster the supervisor serves the base port and worker N serves base + 1 + N
+        port = metrics_port(self.cluster_id + 1 if os.getenv("CLUSTER_ID") is not None else 0)
+        if port is not None:
             try:
-                await self.load_extension(cog)
-                print(f"Loaded cog: {cog}")
-            except Exception as e:
-                print(f"Failed to load cog {cog}: {e}")
+                self.metrics_server = await MetricsServer(host=os.getenv("METRICS_HOST", "127.0.0.1"), port=port).start()
+                print(f"Metrics on http://{self.metrics_server.host}:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                print(f"Metrics endpoint disabled: {e}")
+        if os.getenv("CLUSTER_ID") is not None:
+            # Shut down cleanly when the supervisor goes away
+            watch_supervisor(lambda: self.loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.close())))
         
-        # Sync slash commands globally
-        await self.tree.sync()
-        print("Slash commands synced!")
+        results = await self.extension_loader.load(EXTENSIONS)
+        print(self.extension_loader.report(results))
+        print(f"Extensions ready in {(time.perf_counter() - LAUNCHED_AT) * 1000:.0f}ms, connecting to the gateway")
+        
+        # Heavy extensions and the command sync must not hold up the gateway connect
+        self.loop.create_task(self.finish_startup())
+
+    async def finish_startup(self):
+        await self.wait_until_ready()
+        print(f"Gateway ready {(time.perf_counter() - LAUNCHED_AT) * 1000:.0f}ms after launch")
+        
+        results = await self.extension_loader.load(DEFERRED_EXTENSIONS, deferred=True)
+        print(self.extension_loader.report(results))
+        
+        # Sync slash commands only where their definitions changed; in a cluster one worker does it
+        if self.cluster_id == 0:
+            await CommandSync(self.tree, mode=os.getenv("COMMAND_SYNC", "auto")).run()
+
+    async def close(self):
+        if self._lag_watcher is not None:
+            self._lag_watcher.cancel()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.rest.close()
+        await super().close()
+        if self.stall_watchdog is not None:
+            self.stall_watchdog.stop()
 
     async def on_ready(self):
         print(f'✅ {self.user} has connected to Discord!')
-        print(f'📊 Serving {len(self.guilds)} guilds')
+        print(f'📊 Serving {len(self.guilds)} guilds ({self.cache_profile.name} cache profile)')
         await self.change_presence(activity=discord.Game(name="Elite Red Edition"))
 
 # Helper function to create embeds
@@ -66,24 +160,23 @@ bot = EliteRedBot()
 
 # Core command template
 async def execute_command(ctx, func, *args, **kwargs):
-    """Universal command execution with loading → success flow"""
+    """Universal command execution: answer with the result, or loading → success when slow"""
     loading_emoji = f"<:loading:{bot.emoji_ids['loading']}>"
     success_emoji = f"<:success:{bot.emoji_ids['success']}>"
     
-    # Send loading embed
-    embed = create_embed(
-        title=f"{loading_emoji} Processing Command...",
-        color=0xff0000
-    )
-    message = await ctx.send(embed=embed)
-    
-    # Wait 1.5 seconds
-    await asyncio.sleep(1.5)
+    # Only show the loading embed if the command is not done within the threshold
+    task = asyncio.ensure_future(func(*args, **kwargs))
+    done, _ = await asyncio.wait({task}, timeout=DEFER_THRESHOLD)
+    message = None
+    if not done:
+        embed = create_embed(
+            title=f"{loading_emoji} Processing Command...",
+            color=0xff0000
+        )
+        message = await ctx.send(embed=embed)
     
-    # Execute command function
-    result = await func(*args, **kwargs)
+    result = await task
     
-    # Edit with result
     if isinstance(result, discord.Embed):
         embed = result
     elif isinstance(result, str):
@@ -92,7 +185,10 @@ async def execute_command(ctx, func, *args, **kwargs):
         embed = create_embed(description="Command executed!", color=0xff0000)
     
     embed.set_footer(text=f"{success_emoji} Task completed successfully")
-    await message.edit(embed=result)
+    if message is None:
+        await ctx.send(embed=embed)
+    else:
+        await message.edit(embed=embed)
 
 # Basic ping command
 @bot.tree.command(name="ping", description="Check bot latency")
@@ -103,7 +199,7 @@ async def ping(interaction: discord.Interaction):
         color=0xff0000
     )
     embed.set_footer(text=f"<:success:{bot.emoji_ids['success']}> Task completed successfully")
-    await interaction.response.send_message(embed=embed)
+    await send(interaction, embed=embed)
 
 @bot.tree.command(name="help", description="Show all commands")
 async def help_command(interaction: discord.Interaction):
@@ -121,7 +217,7 @@ async def help_command(interaction: discord.Interaction):
         color=0xff0000
     )
     embed.set_footer(text="Use ?[command] or /[command]")
-    await interaction.response.send_message(embed=embed)
+    await send(interaction, embed=embed)
 
 # Run the bot
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+import random
+import time
+
+RANKS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+SUITS = ("♠", "♥", "♦", "♣")
+
+# Outcomes
+BLACKJACK = "blackjack"
+WIN = "win"
+DEALER_BUST = "dealer_bust"
+PUSH = "push"
+LOSE = "lose"
+BUST = "bust"
+
+
+class Rules:
+    """Table rules. The simulator (benchmarks/blackjack_sim.py) reads the same object."""
+
+    __slots__ = ("decks", "penetration", "dealer_hits_soft_17", "blackjack_pays", "double_any_two")
+
+    def __init__(self, decks=6, penetration=0.75, dealer_hits_soft_17=False, blackjack_pays=1.5, double_any_two=True):
+        self.decks = decks
+        self.penetration = penetration
+        self.dealer_hits_soft_17 = dealer_hits_soft_17
+        self.blackjack_pays = blackjack_pays
+        self.double_any_two = double_any_two
+
+    def payout(self, outcome, doubled=False):
+        """What the player gets back per unit staked (stake included)."""
+        if outcome == BLACKJACK:
+            return 1 + self.blackjack_pays
+        stake = 2 if doubled else 1
+        if outcome in (WIN, DEALER_BUST):
+            return 2 * stake
+        if outcome == PUSH:
+            return stake
+        return 0
+
+
+RULES = Rules()
+
+
+def card_value(card):
+    rank = card % 13
+    return 1 if rank == 0 else min(rank + 1, 10)
+
+
+def card_name(card):
+    return f"{RANKS[card % 13]}{SUITS[card // 13 % 4]}"
+
+
+def hand_value(cards):
+    """(total, soft): aces count 11 when that does not bust; soft means one still does."""
+    total = 0
+    aces = False
+    for card in cards:
+        value = card_value(card)
+        total += value
+        aces = aces or value == 1
+    if aces and total + 10 <= 21:
+        return total + 10, True
+    return total, False
+
+
+def is_blackjack(cards):
+    return len(cards) == 2 and hand_value(cards)[0] == 21
+
+
+class Shoe:
+    """Multi-deck shoe; cards are 0..51 per deck, reshuffled at the cut card."""
+
+    __slots__ = ("cards", "position", "cut", "rng")
+
+    def __init__(self, decks=6, penetration=0.75, rng=None):
+        self.rng = rng or random.Random()
+        self.cards = bytearray(range(52)) * decks
+        self.cut = int(len(self.cards) * penetration)
+        self.shuffle()
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+        self.position = 0
+
+    def draw(self):
+        if self.position >= self.cut:
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+
+class Session:
+    """One player's hand in progress. Small on purpose: thousands can be open at once."""
+
+    __slots__ = ("user_id", "bet", "player", "dealer", "doubled", "expires_at", "interaction")
+
+    def __init__(self, user_id, bet, player, dealer, expires_at, interaction=None):
+        self.user_id = user_id
+        self.bet = bet
+        self.player = player
+        self.dealer = dealer
+        self.doubled = False
+        self.expires_at = expires_at
+        # Latest interaction for this game, used to edit its message
+        self.interaction = interaction
+
+    @property
+    def stake(self):
+        return self.bet * 2 if self.doubled else self.bet
+
+    def can_double(self, rules=RULES):
+        if self.doubled or len(self.player) != 2:
+            return False
+        return rules.double_any_two or hand_value(self.player)[0] in (9, 10, 11)
+
+
+class BlackjackTable:
+    """Deals and settles hands; one shoe per guild, one open session per user.
+
+    Sessions that see no action for `timeout` seconds are picked up by
+    expired() and stood on by the owner.
+    """
+
+    def __init__(self, rules=RULES, timeout=60, rng=None):
+        self.rules = rules
+        self.timeout = timeout
+        self.rng = rng or random.Random()
+        self.shoes = {}
+        self.sessions = {}
+
+    def shoe(self, guild_id):
+        shoe = self.shoes.get(guild_id)
+        if shoe is None:
+            shoe = self.shoes[guild_id] = Shoe(self.rules.decks, self.rules.penetration, self.rng)
+        return shoe
+
+    def deal(self, guild_id, user_id, bet, interaction=None):
+        shoe = self.shoe(guild_id)
+        player = bytearray((shoe.draw(), shoe.draw()))
+        dealer = bytearray((shoe.draw(), shoe.draw()))
+        session = Session(user_id, bet, player, dealer, time.monotonic() + self.timeout, interaction)
+        self.sessions[user_id] = session
+        return session
+
+    def get(self, user_id):
+        return self.sessions.get(user_id)
+
+    def touch(self, session, interaction=None):
+        session.expires_at = time.monotonic() + self.timeout
+        if interaction is not None:
+            session.interaction = interaction
+
+    def expired(self, now=None):
+        now = time.monotonic() if now is None else now
+        return [session for session in self.sessions.values() if session.expires_at <= now]
+
+    def natural(self, session):
+        """Outcome if either side was dealt blackjack (dealer peeks), else None."""
+        player, dealer = is_blackjack(session.player), is_blackjack(session.dealer)
+        if player and dealer:
+            return PUSH
+        if player:
+            return BLACKJACK
+        if dealer:
+            return LOSE
+        return None
+
+    def hit(self, guild_id, session):
+        """Draw a card. Returns True while the player can still act."""
+        session.player.append(self.shoe(guild_id).draw())
+        return hand_value(session.player)[0] < 21
+
+    def double(self, guild_id, session):
+        session.doubled = True
+        session.player.append(self.shoe(guild_id).draw())
+
+    def settle(self, guild_id, session):
+        """Play out the dealer, close the session and return the outcome; None if it was already settled."""
+        if self.sessions.get(session.user_id) is not session:
+            return None
+        del self.sessions[session.user_id]
+        natural = self.natural(session)
+        if natural is not None:
+            return natural
+        player = hand_value(session.player)[0]
+        if player > 21:
+            return BUST
+        shoe = self.shoe(guild_id)
+        while True:
+            total, soft = hand_value(session.dealer)
+            if total < 17 or (total == 17 and soft and self.rules.dealer_hits_soft_17):
+                session.dealer.append(shoe.draw())
+            else:
+                break
+        if total > 21:
+            return DEALER_BUST
+        if player > total:
+            return WIN
+        if player < total:
+            return LOSE
+        return PUSH
@@ -0,0 +1,61 @@
+import discord
+
+
+class CacheProfile:
+    """Gateway intents and client cache settings chosen together.
+
+    lean      members intent only for join events; no member or message
+              cache. Commands fetch what they need.
+    balanced  members seen at runtime (joins, voice) stay cached, no
+              startup chunking, no presences, a small message cache.
+    full      everything: all intents, every member chunked at startup,
+              presences and the default message cache.
+    """
+
+    __slots__ = ("name", "intents", "member_cache_flags", "chunk_guilds_at_startup", "max_messages")
+
+    def __init__(self, name, intents, member_cache_flags, chunk_guilds_at_startup, max_messages):
+        self.name = name
+        self.intents = intents
+        self.member_cache_flags = member_cache_flags
+        self.chunk_guilds_at_startup = chunk_guilds_at_startup
+        self.max_messages = max_messages
+
+    def client_options(self):
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages
+        }
+
+
+def _base_intents():
+    # Join events (raid detection) and message content (word filter, confirmations)
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    return intents
+
+
+def lean():
+    return CacheProfile("lean", _base_intents(), discord.MemberCacheFlags.none(), False, None)
+
+
+def balanced():
+    intents = _base_intents()
+    return CacheProfile("balanced", intents, discord.MemberCacheFlags.from_intents(intents), False, 200)
+
+
+def full():
+    return CacheProfile("full", discord.Intents.all(), discord.MemberCacheFlags.all(), True, 1000)
+
+
+PROFILES = {"lean": lean, "balanced": balanced, "full": full}
+
+
+def cache_profile(name):
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache profile {name!r}, expected one of {', '.join(PROFILES)}") from None
@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+ACTIVE = "active"
+CLOSED = "closed"
+FAILED = "failed"
+
+
+class Case:
+    __slots__ = ("guild_id", "number", "plaintiff", "defendant", "reason", "thread_id", "status", "opened", "closed")
+
+    def __init__(self, guild_id, number, plaintiff, defendant, reason, thread_id=None, status=ACTIVE, opened=None, closed=None):
+        self.guild_id = guild_id
+        self.number = number
+        self.plaintiff = plaintiff
+        self.defendant = defendant
+        self.reason = reason
+        self.thread_id = thread_id
+        self.status = status
+        self.opened = opened or datetime.now().isoformat()
+        self.closed = closed
+
+    @property
+    def case_id(self):
+        return f"CASE-{self.guild_id}-{self.number:04d}"
+
+    def row(self):
+        return (
+            self.guild_id, self.number, self.plaintiff, self.defendant, self.reason,
+            self.thread_id, self.status, self.opened, self.closed
+        )
+
+
+class CaseRegistry:
+    """Court cases, persisted in SQLite and indexed in memory.
+
+    Case numbers are allocated per guild from a counter that only moves
+    forward, so numbers are never reused, even for cases that failed to
+    open. Lookups by plaintiff, defendant, status and thread go through
+    in-memory indexes. Writes are queued and committed in batches by a
+    writer thread, like the economy store, so opening many cases at once
+    costs one transaction.
+    """
+
+    def __init__(self, path, batch_delay=0.05):
+        self.path = path
+        self.batch_delay = batch_delay
+        self._cases = {}
+        self._sequences = {}
+        self._by_user = {}
+        self._by_status = {}
+        self._by_thread = {}
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._pending_sequences = {}
+        self._writing = False
+        self._closing = False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cases ("
+            "guild_id INTEGER NOT NULL, "
+            "number INTEGER NOT NULL, "
+            "plaintiff INTEGER NOT NULL, "
+            "defendant INTEGER NOT NULL, "
+            "reason TEXT NOT NULL, "
+            "thread_id INTEGER, "
+            "status TEXT NOT NULL, "
+            "opened TEXT NOT NULL, "
+            "closed TEXT, "
+            "PRIMARY KEY (guild_id, number))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS case_sequences (guild_id INTEGER PRIMARY KEY, last INTEGER NOT NULL)")
+        self._load()
+        self._writer = threading.Thread(target=self._writer_loop, name="CaseRegistry-writer", daemon=True)
+        self._writer.start()
+
+    def _load(self):
+        for row in self._conn.execute("SELECT * FROM cases"):
+            self._index(Case(*row))
+        for guild_id, last in self._conn.execute("SELECT guild_id, last FROM case_sequences"):
+            self._sequences[guild_id] = last
+
+    def _index(self, case):
+        key = (case.guild_id, case.number)
+        self._cases[key] = case
+        for user_id in {case.plaintiff, case.defendant}:
+            self._by_user.setdefault((case.guild_id, user_id), []).append(case.number)
+        self._by_status.setdefault((case.guild_id, case.status), set()).add(case.number)
+        if case.thread_id is not None:
+            self._by_thread[case.thread_id] = key
+
+    # Lookups
+    def get(self, guild_id, number):
+        return self._cases.get((guild_id, number))
+
+    def by_thread(self, thread_id):
+        key = self._by_thread.get(thread_id)
+        return self._cases[key] if key else None
+
+    def for_user(self, guild_id, user_id, status=None, limit=None):
+        """Cases the user is party to, newest first."""
+        cases = []
+        for number in reversed(self._by_user.get((guild_id, user_id), ())):
+            case = self._cases[(guild_id, number)]
+            if status is None or case.status == status:
+                cases.append(case)
+                if limit and len(cases) >= limit:
+                    break
+        return cases
+
+    def with_status(self, guild_id, status):
+        return [self._cases[(guild_id, number)] for number in sorted(self._by_status.get((guild_id, status), ()))]
+
+    def count_for_user(self, guild_id, user_id):
+        return len(self._by_user.get((guild_id, user_id), ()))
+
+    # Changes
+    def open_case(self, guild_id, plaintiff, defendant, reason, thread_id=None):
+        number = self._sequences.get(guild_id, 0) + 1
+        self._sequences[guild_id] = number
+        case = Case(guild_id, number, plaintiff, defendant, reason, thread_id)
+        self._index(case)
+        self._queue(case)
+        return case
+
+    def update(self, case, **changes):
+        """Change a case's status and/or thread and persist it."""
+        if "status" in changes and changes["status"] != case.status:
+            self._by_status[(case.guild_id, case.status)].discard(case.number)
+            case.status = changes["status"]
+            self._by_status.setdefault((case.guild_id, case.status), set()).add(case.number)
+            if case.status != ACTIVE:
+                case.closed = datetime.now().isoformat()
+        if "thread_id" in changes and changes["thread_id"] != case.thread_id:
+            self._by_thread.pop(case.thread_id, None)
+            case.thread_id = changes["thread_id"]
+            if case.thread_id is not None:
+                self._by_thread[case.thread_id] = (case.guild_id, case.number)
+        self._queue(case)
+        return case
+
+    # Persistence
+    def _queue(self, case):
+        with self._cond:
+            self._pending[(case.guild_id, case.number)] = case.row()
+            self._pending_sequences[case.guild_id] = self._sequences[case.guild_id]
+            self._cond.notify_all()
+
+    def flush(self):
+        """Block until every queued write has been committed."""
+        with self._cond:
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._pending and not self._writing)
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._conn.close()
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending and self._closing:
+                    return
+                # Give a burst of /sue calls a moment to land in the same transaction
+                self._cond.wait(self.batch_delay)
+                rows, self._pending = self._pending, {}
+                sequences, self._pending_sequences = self._pending_sequences, {}
+                self._writing = True
+            try:
+                self._write_batch(rows, sequences)
+            except Exception as e:
+                print(f"Case registry write failed ({len(rows)} cases): {e}", file=sys.stderr)
+                with self._cond:
+                    for key, row in rows.items():
+                        self._pending.setdefault(key, row)
+                    for guild_id, last in sequences.items():
+                        self._pending_sequences[guild_id] = max(last, self._pending_sequences.get(guild_id, 0))
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _write_batch(self, rows, sequences):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", list(rows.values()))
+            conn.executemany(
+                "INSERT INTO case_sequences (guild_id, last) VALUES (?, ?) "
+                "ON CONFLICT(guild_id) DO UPDATE SET last = MAX(last, excluded.last)",
+                list(sequences.items())
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from utils.cluster_store import StoreServer
+from utils.economy_service import EconomyService
+from utils.metrics import MetricsServer, metrics_port
+
+# Seconds before a crashed worker is started again; doubles while it keeps crashing
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+# A worker that stayed up this long is healthy again and restarts from RESTART_DELAY
+STABLE_SECONDS = 60
+# Discord allows max_concurrency identifies per 5 seconds across all processes
+IDENTIFY_INTERVAL = 5
+# Seconds a worker gets to shut down before it is killed
+STOP_TIMEOUT = 15
+
+
+def shard_ranges(shard_count, workers):
+    """Split shards 0..shard_count-1 into `workers` contiguous ranges of near-equal size."""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def shard_for(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+async def gateway_info(token):
+    """(recommended shard count, identify max_concurrency) from Discord."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {token}"}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["shards"], data["session_start_limit"]["max_concurrency"]
+
+
+def watch_supervisor(on_exit):
+    """Call on_exit() once stdin closes, i.e. when the supervisor that started us is gone."""
+    def watch():
+        try:
+            while sys.stdin.buffer.read(1024):
+                pass
+        except (OSError, ValueError):
+            pass
+        on_exit()
+    threading.Thread(target=watch, name="supervisor-watch", daemon=True).start()
+
+
+class Worker:
+    __slots__ = ("cluster_id", "shard_ids", "process", "restarts", "started_at")
+
+    def __init__(self, cluster_id, shard_ids):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.restarts = 0
+        self.started_at = None
+
+
+class Supervisor:
+    """Runs one worker process per shard range and restarts the ones that exit.
+
+    Each worker gets CLUSTER_ID, SHARD_IDS and SHARD_COUNT in its environment
+    (plus whatever `env` adds, such as the CLUSTER_STORE address) and owns
+    those shards' gateway connections and guilds. Workers are started
+    `stagger` seconds apart per shard so their identifies stay within
+    Discord's limit. A worker that exits while the cluster is running is
+    started again after a delay that grows while it keeps crashing. Workers
+    hold a pipe on stdin and shut down when it closes, so they do not
+    outlive the supervisor.
+    """
+
+    def __init__(self, command, workers, shard_count, env=None, stagger=0):
+        self.command = command
+        self.shard_count = shard_count
+        self.env = env or {}
+        self.stagger = stagger
+        self.workers = [Worker(i, shards) for i, shards in enumerate(shard_ranges(shard_count, workers))]
+        self._stopping = False
+        self._watchers = []
+
+    @property
+    def restarts(self):
+        return sum(worker.restarts for worker in self.workers)
+
+    async def start(self):
+        for worker in self.workers:
+            if self._stopping:
+                return
+            self._watchers.append(asyncio.create_task(self._watch(worker)))
+            if worker is not self.workers[-1]:
+                await asyncio.sleep(self.stagger * len(worker.shard_ids))
+
+    async def wait(self):
+        await asyncio.gather(*self._watchers)
+
+    async def stop(self):
+        self._stopping = True
+        running = [worker.process for worker in self.workers if worker.process and worker.process.returncode is None]
+        for process in running:
+            # Closing stdin asks the worker to shut down cleanly
+            process.stdin.close()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in running)), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+
+    async def _spawn(self, worker):
+        env = {
+            **os.environ,
+            **self.env,
+            "CLUSTER_ID": str(worker.cluster_id),
+            "SHARD_IDS": ",".join(map(str, worker.shard_ids)),
+            "SHARD_COUNT": str(self.shard_count)
+        }
+        worker.process = await asyncio.create_subprocess_exec(*self.command, stdin=asyncio.subprocess.PIPE, env=env)
+        worker.started_at = time.monotonic()
+        print(f"Cluster {worker.cluster_id}: started pid {worker.process.pid} for shards "
+              f"{worker.shard_ids[0]}-{worker.shard_ids[-1]}")
+
+    async def _watch(self, worker):
+        delay = RESTART_DELAY
+        while not self._stopping:
+            await self._spawn(worker)
+            code = await worker.process.wait()
+            if self._stopping:
+                return
+            if time.monotonic() - worker.started_at >= STABLE_SECONDS:
+                delay = RESTART_DELAY
+            print(f"Cluster {worker.cluster_id}: exited with {code}, restarting in {delay}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+            worker.restarts += 1
+
+
+async def run_cluster(workers, shard_count=None, store_address="127.0.0.1:0"):
+    load_dotenv()
+    max_concurrency = 1
+    if shard_count is None:
+        shard_count, max_concurrency = await gateway_info(os.environ["DISCORD_TOKEN"])
+    shard_count = max(shard_count, workers)
+
+    # The supervisor owns the economy; workers reach it over CLUSTER_STORE
+    store = await StoreServer(EconomyService(os.getenv("ECONOMY_BACKEND", "sqlite")), store_address).start()
+    print(f"Economy store listening on {store.address}")
+    # Store write latency is recorded here, so the supervisor serves its own /metrics
+    metrics = None
+    if metrics_port() is not None:
+        metrics = await MetricsServer(host=os.getenv("METRICS_HOST", "127.0.0.1"), port=metrics_port()).start()
+    supervisor = Supervisor(
+        [sys.executable, "main.py"], workers, shard_count,
+        env={"CLUSTER_STORE": store.address}, stagger=IDENTIFY_INTERVAL / max_concurrency
+    )
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopped.set)
+        except (NotImplementedError, AttributeError):
+            # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+            pass
+    try:
+        await supervisor.start()
+        await stopped.wait()
+    finally:
+        print("Stopping cluster")
+        await supervisor.stop()
+        await store.close()
+        if metrics is not None:
+            await metrics.close()
+
+
+# python -m utils.cluster <workers> [shard_count]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m utils.cluster <workers> [shard_count]")
+        sys.exit(1)
+    try:
+        asyncio.run(run_cluster(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else None))
+    except KeyboardInterrupt:
+        pass
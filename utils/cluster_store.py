@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import json
+import sys
+
+from utils.economy_store import Account
+from utils.ledger import LedgerEntry
+
+# Seconds a worker waits on the store before giving up on a call
+CALL_TIMEOUT = 10
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _encode(value):
+    if isinstance(value, Account):
+        return value.to_dict()
+    raise TypeError(f"Cannot send {type(value).__name__} to a worker")
+
+
+class StoreServer:
+    """Serves one EconomyService to the worker processes of a cluster.
+
+    Workers keep a connection open and send newline-delimited JSON
+    requests [id, operation, args]; each is answered with [id, ok, result]
+    as soon as it completes, so one slow call does not hold up the rest.
+    Every operation runs on the server's event loop against the same
+    service, with the service's own per-account locks.
+    """
+
+    def __init__(self, service, address="127.0.0.1:0"):
+        self.service = service
+        self.address = address
+        self._server = None
+        self._handlers = {
+            "account": lambda user_id: service.account(user_id),
+            "transfer": lambda changes, kind: service.transfer(dict(changes), kind),
+            "claim_daily": lambda user_id: service.claim_daily(user_id),
+            "rob": lambda robber_id, target_id: service.rob(robber_id, target_id),
+            "history": lambda user_id, limit: service.history(user_id, limit),
+            "leaderboard_loaded": lambda: service.leaderboard_loaded(),
+            "leaderboard_page": lambda count, start: service.leaderboard_page(count, start),
+            "standing": lambda user_id: service.standing(user_id),
+        }
+
+    async def start(self):
+        await self.service.start()
+        host, port = parse_address(self.address)
+        self._server = await asyncio.start_server(self._serve, host, port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        # The real port when 0 was asked for
+        self.address = f"{host}:{port}"
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.service.close()
+
+    async def _serve(self, reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._call(json.loads(line), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            # Calls already running still finish; their replies just go nowhere
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _call(self, request, writer):
+        call_id, operation, args = request
+        try:
+            reply = json.dumps([call_id, True, await self._handlers[operation](*args)], default=_encode)
+        except Exception as e:
+            print(f"Cluster store {operation} failed: {e}", file=sys.stderr)
+            reply = json.dumps([call_id, False, f"{type(e).__name__}: {e}"])
+        if not writer.is_closing():
+            writer.write(reply.encode() + b"\n")
+
+
+class RemoteEconomy:
+    """Worker-side stand-in for EconomyService, talking to the cluster's StoreServer.
+
+    Same async operations, same return shapes. Calls from every command share
+    one connection and are matched to replies by id; a dropped connection
+    fails the calls in flight and is reopened on the next call.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._writer = None
+        self._connecting = None
+        self._listener = None
+        self._pending = {}
+        self._ids = itertools.count()
+
+    async def start(self):
+        await self._connection()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+    async def _connection(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        # Concurrent callers share one connect attempt
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        return await asyncio.shield(self._connecting)
+
+    async def _connect(self):
+        try:
+            reader, self._writer = await asyncio.open_connection(*parse_address(self.address))
+            self._listener = asyncio.create_task(self._listen(reader, self._writer))
+            return self._writer
+        finally:
+            self._connecting = None
+
+    async def _listen(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                call_id, ok, result = json.loads(line)
+                future = self._pending.pop(call_id, None)
+                if future is not None and not future.done():
+                    if ok:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(RuntimeError(result))
+        except ConnectionError:
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost the cluster store connection"))
+
+    async def _call(self, operation, *args):
+        writer = await self._connection()
+        call_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        writer.write(json.dumps([call_id, operation, args]).encode() + b"\n")
+        try:
+            return await asyncio.wait_for(future, CALL_TIMEOUT)
+        finally:
+            self._pending.pop(call_id, None)
+
+    async def account(self, user_id):
+        return Account.from_dict(await self._call("account", user_id))
+
+    async def transfer(self, changes, kind):
+        # JSON object keys are strings, so send the changes as pairs
+        return await self._call("transfer", list(changes.items()), kind)
+
+    async def claim_daily(self, user_id):
+        claimed = await self._call("claim_daily", user_id)
+        if claimed is None:
+            return None
+        base, streak_bonus, data = claimed
+        return base, streak_bonus, Account.from_dict(data)
+
+    async def rob(self, robber_id, target_id):
+        outcome, amount, robber, target = await self._call("rob", robber_id, target_id)
+        return outcome, amount, Account.from_dict(robber), Account.from_dict(target)
+
+    async def history(self, user_id, limit=None):
+        return [LedgerEntry(*entry) for entry in await self._call("history", user_id, limit)]
+
+    async def leaderboard_loaded(self):
+        return await self._call("leaderboard_loaded")
+
+    async def leaderboard_page(self, count=10, start=0):
+        entries, ranked = await self._call("leaderboard_page", count, start)
+        return [tuple(entry) for entry in entries], ranked
+
+    async def standing(self, user_id):
+        standing = await self._call("standing", user_id)
+        if standing is None:
+            return None
+        rank, ranked, around = standing
+        return rank, ranked, [tuple(entry) for entry in around]
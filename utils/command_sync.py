@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+
+import discord
+
+GLOBAL = "global"
+
+
+def _digest(payload):
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def scope_payloads(tree):
+    """{scope: {command name: payload}} for the global scope and every guild with its own commands."""
+    guild_ids = sorted(getattr(tree, "_guild_commands", {}))
+    scopes = {GLOBAL: None}
+    scopes.update({str(guild_id): discord.Object(id=guild_id) for guild_id in guild_ids})
+    return {
+        scope: {command.name: command.to_dict() for command in tree.get_commands(guild=guild)}
+        for scope, guild in scopes.items()
+    }
+
+
+def scope_hashes(payloads):
+    """{scope: {"hash", "commands": {name: hash}}}; the scope hash covers every command in it."""
+    hashes = {}
+    for scope, commands in payloads.items():
+        per_command = {name: _digest(payload) for name, payload in commands.items()}
+        hashes[scope] = {"hash": _digest(sorted(per_command.items())), "commands": per_command}
+    return hashes
+
+
+def diff(stored, current):
+    """{scope: {"added", "removed", "changed"}} for every scope whose hash differs.
+
+    A scope that was synced before but no longer has commands shows up with
+    everything removed, so syncing it clears the stale commands on Discord.
+    """
+    changes = {}
+    for scope in sorted(set(stored) | set(current)):
+        old = stored.get(scope, {"hash": None, "commands": {}})
+        new = current.get(scope, {"hash": _digest([]), "commands": {}})
+        if old["hash"] == new["hash"]:
+            continue
+        old_commands, new_commands = old["commands"], new["commands"]
+        changes[scope] = {
+            "added": sorted(set(new_commands) - set(old_commands)),
+            "removed": sorted(set(old_commands) - set(new_commands)),
+            "changed": sorted(name for name in set(old_commands) & set(new_commands) if old_commands[name] != new_commands[name])
+        }
+    return changes
+
+
+def format_diff(changes):
+    if not changes:
+        return "Slash commands unchanged, nothing to sync"
+    lines = []
+    for scope, change in changes.items():
+        label = "global" if scope == GLOBAL else f"guild {scope}"
+        lines.append(f"{label}:")
+        for kind, sign in (("added", "+"), ("removed", "-"), ("changed", "~")):
+            lines.extend(f"  {sign} /{name}" for name in change[kind])
+        if not any(change.values()):
+            lines.append("  ~ (resync, definitions unchanged)")
+    return "\n".join(lines)
+
+
+class CommandSync:
+    """Syncs the app command tree only where its definitions changed.
+
+    The hash of every scope's payload is kept in a local JSON file. On boot
+    the tree is hashed again and only scopes with a different hash are
+    synced; a scope is recorded as synced only after Discord accepted it, so
+    a failed sync is retried on the next start. mode is "auto", "force"
+    (sync every scope) or "dry-run" (print the diff and sync nothing).
+    """
+
+    def __init__(self, tree, path="data/command_sync.json", mode="auto"):
+        if mode not in ("auto", "force", "dry-run"):
+            raise ValueError(f"Unknown sync mode: {mode}")
+        self.tree = tree
+        self.path = path
+        self.mode = mode
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self, hashes):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    async def run(self):
+        """Sync changed scopes and return the diff that was (or in dry-run, would be) applied."""
+        stored = self.load()
+        current = scope_hashes(scope_payloads(self.tree))
+        if self.mode == "force":
+            stored = {scope: dict(entry, hash=None) for scope, entry in stored.items()}
+        changes = diff(stored, current)
+        print(format_diff(changes))
+        if self.mode == "dry-run":
+            return changes
+
+        synced = dict(stored)
+        try:
+            for scope in changes:
+                guild = None if scope == GLOBAL else discord.Object(id=int(scope))
+                await self.tree.sync(guild=guild)
+                if scope in current:
+                    synced[scope] = current[scope]
+                else:
+                    synced.pop(scope, None)
+                print(f"Synced slash commands: {scope}")
+        finally:
+            if synced != stored:
+                self.save(synced)
+        return changes
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from utils.economy_store import Account, SQLiteEconomyStore
+from utils.economy_snapshot import SnapshotEconomyStore, migrate_json
+from utils.ledger import Ledger
+from utils.locks import StripedLock
+from utils.leaderboard import Leaderboard
+
+# Accounts untouched for this long are dropped from memory (they stay in the store)
+ACCOUNT_IDLE_SECONDS = 15 * 60
+# Seconds between ledger flushes / idle-account sweeps
+LEDGER_FLUSH_SECONDS = 1
+EVICT_SECONDS = 5 * 60
+# A failed leaderboard load is retried after this many seconds, doubling up to LEADERBOARD_RETRY_MAX
+LEADERBOARD_RETRY_SECONDS = 5
+LEADERBOARD_RETRY_MAX = 5 * 60
+
+DAILY_BASE = 1000
+DAILY_STREAK_BONUS = 50
+
+# /rob outcomes
+TOO_POOR = "too_poor"
+ROBBED = "robbed"
+CAUGHT = "caught"
+
+
+class EconomyService:
+    """Accounts, the ledger and the leaderboard behind async operations.
+
+    A single bot process owns one directly. In cluster mode (utils.cluster)
+    the supervisor owns the only instance and workers call it through
+    utils.cluster_store.RemoteEconomy, so every account change, ledger
+    record and leaderboard update is made by one process and one event loop.
+    """
+
+    def __init__(self, backend="sqlite", data_dir="data"):
+        self.data_file = os.path.join(data_dir, "economy.json")
+        self.store = self.open_store(backend, data_dir)
+        # Accounts are loaded on first access and kept in least-recently-used order.
+        # Users who have never acted are not stored at all and read as the default account.
+        self.user_data = {}
+        self.last_access = {}
+        self.ledger = Ledger(os.path.join(data_dir, "ledger"))
+        # Per-account locks; multi-account changes go through transfer()
+        self.locks = StripedLock()
+        self.leaderboard = Leaderboard()
+        # False until every stored account is on the leaderboard
+        self._leaderboard_loaded = False
+        self._tasks = []
+
+    def open_store(self, backend, data_dir):
+        if backend == "snapshot":
+            path = os.path.join(data_dir, "economy.snap")
+            # One-time migration from the old JSON layout
+            if not os.path.exists(path) and os.path.exists(self.data_file):
+                count = migrate_json(self.data_file, path)
+                print(f"Migrated {count} economy accounts from {self.data_file}")
+            return SnapshotEconomyStore(path)
+
+        store = SQLiteEconomyStore(os.path.join(data_dir, "economy.db"))
+        # One-time migration from the old JSON layout; the JSON file stays as an export format
+        if store.is_empty() and os.path.exists(self.data_file):
+            count = store.import_json(self.data_file)
+            print(f"Imported {count} economy accounts from {self.data_file}")
+        return store
+
+    async def start(self):
+        # Build the leaderboard off the event loop; changes made meanwhile are kept
+        self._tasks = [
+            asyncio.create_task(self.load_leaderboard()),
+            asyncio.create_task(self._maintain())
+        ]
+
+    async def load_leaderboard(self):
+        delay = LEADERBOARD_RETRY_SECONDS
+        while True:
+            try:
+                entries = await asyncio.to_thread(
+                    lambda: [(user_id, data['wallet'] + data['bank']) for user_id, data in self.store.iter_accounts()]
+                )
+                break
+            except Exception as e:
+                # /leaderboard and /rank say they are still loading meanwhile
+                print(f"Leaderboard load failed, retrying in {delay}s: {e}", file=sys.stderr)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, LEADERBOARD_RETRY_MAX)
+        self.leaderboard.load(entries)
+        self._leaderboard_loaded = True
+        print(f"Leaderboard loaded with {len(self.leaderboard)} accounts")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.ledger.close()
+        await asyncio.to_thread(self.store.close)
+
+    async def _maintain(self):
+        last_evict = time.monotonic()
+        while True:
+            await asyncio.sleep(LEDGER_FLUSH_SECONDS)
+            self.ledger.flush()
+            if time.monotonic() - last_evict >= EVICT_SECONDS:
+                self.evict_idle_accounts()
+                last_evict = time.monotonic()
+
+    def evict_idle_accounts(self):
+        cutoff = time.monotonic() - ACCOUNT_IDLE_SECONDS
+        # Oldest accounts sit at the front, so stop at the first recently used one
+        while self.user_data:
+            key = next(iter(self.user_data))
+            if self.last_access[key] > cutoff:
+                break
+            del self.user_data[key]
+            del self.last_access[key]
+
+    # Account cache
+    def get_user_data(self, user_id):
+        """Read-only view of an account; unknown users get a default account that is not stored."""
+        key = int(user_id)
+        data = self.user_data.get(key)
+        if data is None:
+            stored = self.store.get(key)
+            if stored is None:
+                return Account()
+            data = self.user_data[key] = Account.from_dict(stored)
+        else:
+            # Re-insert to keep the dict in least-recently-used order
+            self.user_data[key] = self.user_data.pop(key)
+        self.last_access[key] = time.monotonic()
+        return data
+
+    def get_account_for_update(self, user_id):
+        key = int(user_id)
+        data = self.get_user_data(key)
+        if key not in self.user_data:
+            self.user_data[key] = data
+            self.last_access[key] = time.monotonic()
+        return data
+
+    def save_data(self, *user_ids):
+        for user_id in user_ids:
+            self.store.put(user_id, self.get_account_for_update(user_id).to_dict())
+
+    def change_wallet(self, user_id, delta, kind, counterparty=0):
+        """Apply a wallet change and record it in the ledger."""
+        data = self.get_account_for_update(user_id)
+        if delta:
+            data.wallet += delta
+            self.ledger.append(user_id, delta, data.wallet, kind, counterparty)
+            self.leaderboard.update(int(user_id), data.total)
+        return data
+
+    def apply_changes(self, changes, kind, counterparty=0):
+        """Apply {user_id: delta} all-or-nothing. Caller must hold the accounts' locks."""
+        if any(self.get_user_data(user_id).wallet + delta < 0 for user_id, delta in changes.items()):
+            return False
+
+        # Two-party changes record each side as the other's counterparty
+        parties = list(changes)
+        for user_id, delta in changes.items():
+            other = next((p for p in parties if p != user_id), 0) if len(parties) == 2 else counterparty
+            self.change_wallet(user_id, delta, kind, other)
+        self.save_data(*changes)
+        return True
+
+    # Operations
+    async def account(self, user_id):
+        return self.get_user_data(user_id)
+
+    async def transfer(self, changes, kind):
+        """Lock every account involved (in a fixed order) and apply the changes atomically."""
+        async with self.locks.hold(*changes):
+            return self.apply_changes(changes, kind)
+
+    async def claim_daily(self, user_id):
+        """(base, streak bonus, account) or None if today's reward was already claimed."""
+        async with self.locks.hold(user_id):
+            data = self.get_account_for_update(user_id)
+            # Check if daily was already claimed today
+            if data.last_daily and datetime.fromisoformat(data.last_daily).date() == datetime.now().date():
+                return None
+            streak_bonus = data.daily_streak * DAILY_STREAK_BONUS
+            self.change_wallet(user_id, DAILY_BASE + streak_bonus, "daily")
+            data.daily_streak += 1
+            data.last_daily = datetime.now().isoformat()
+            self.save_data(user_id)
+            return DAILY_BASE, streak_bonus, data
+
+    async def rob(self, robber_id, target_id):
+        """(outcome, amount stolen or fine paid, robber account, target account)."""
+        async with self.locks.hold(robber_id, target_id):
+            robber = self.get_user_data(robber_id)
+            target = self.get_user_data(target_id)
+            amount = 0
+            if target.wallet < 100:
+                outcome = TOO_POOR
+            elif random.random() < 0.4:  # 40% success rate
+                outcome = ROBBED
+                amount = random.randint(50, min(500, target.wallet))
+                self.apply_changes({robber_id: amount, target_id: -amount}, "rob")
+            else:
+                outcome = CAUGHT
+                amount = random.randint(100, 500)
+                self.apply_changes({robber_id: -min(amount, robber.wallet)}, "rob_fine", target_id)
+            return outcome, amount, self.get_user_data(robber_id), self.get_user_data(target_id)
+
+    async def history(self, user_id, limit=None):
+        return list(self.ledger.history(user_id, limit=limit))
+
+    async def leaderboard_loaded(self):
+        return self._leaderboard_loaded
+
+    async def leaderboard_page(self, count=10, start=0):
+        """([(rank, user_id, score)], number of ranked accounts)."""
+        return self.leaderboard.top(count, start), len(self.leaderboard)
+
+    async def standing(self, user_id):
+        """(rank, number of ranked accounts, neighbours) or None for unranked users."""
+        rank = self.leaderboard.rank(user_id)
+        if rank is None:
+            return None
+        return rank, len(self.leaderboard), self.leaderboard.around(user_id)
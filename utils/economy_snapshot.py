@@ -0,0 +1,226 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+
+from utils.economy_store import EconomyStore, default_account
+
+# Snapshot layout:
+#   header  <4sHHQ>  magic, version, reserved, account count
+#   index   <QQ> * count  (user_id, record offset) sorted by user_id
+#   records <qqiHI> wallet, bank, daily_streak, len(last_daily), len(inventory json)
+#           followed by the last_daily and inventory bytes
+MAGIC = b"ECOS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+INDEX_ENTRY = struct.Struct("<QQ")
+RECORD = struct.Struct("<qqiHI")
+
+
+def encode_account(data):
+    last_daily = (data["last_daily"] or "").encode()
+    inventory = json.dumps(data["inventory"], separators=(",", ":")).encode() if data["inventory"] else b""
+    return RECORD.pack(data["wallet"], data["bank"], data["daily_streak"], len(last_daily), len(inventory)) + last_daily + inventory
+
+
+def decode_account(buf, offset):
+    wallet, bank, daily_streak, date_len, inv_len = RECORD.unpack_from(buf, offset)
+    start = offset + RECORD.size
+    last_daily = bytes(buf[start:start + date_len]).decode() or None
+    start += date_len
+    inventory = json.loads(bytes(buf[start:start + inv_len])) if inv_len else []
+    return {
+        "wallet": wallet,
+        "bank": bank,
+        "daily_streak": daily_streak,
+        "last_daily": last_daily,
+        "inventory": inventory
+    }
+
+
+def write_snapshot(path, accounts):
+    """Write (user_id, data) pairs, sorted by user_id, to a snapshot file atomically."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    keys = array("Q")
+    offsets = array("Q")
+    with tempfile.TemporaryFile(dir=directory) as records:
+        position = 0
+        for user_id, data in accounts:
+            encoded = encode_account(data)
+            keys.append(int(user_id))
+            offsets.append(position)
+            records.write(encoded)
+            position += len(encoded)
+        records.seek(0)
+
+        base = HEADER.size + INDEX_ENTRY.size * len(keys)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(keys)))
+            for user_id, offset in zip(keys, offsets):
+                f.write(INDEX_ENTRY.pack(user_id, base + offset))
+            shutil.copyfileobj(records, f)
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def migrate_json(json_path, snapshot_path):
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    accounts = sorted((int(user_id), {**default_account(), **account}) for user_id, account in data.items())
+    return write_snapshot(snapshot_path, accounts)
+
+
+class SnapshotEconomyStore(EconomyStore):
+    """Economy store backed by an mmap'd snapshot plus an append-only journal.
+
+    Opening only maps the file and reads the header, so startup cost does not
+    depend on the number of accounts; each lookup is a binary search over the
+    index. Changed accounts are appended to the journal and folded back into a
+    fresh snapshot once the journal grows past compact_threshold entries.
+    """
+
+    def __init__(self, path, batch_delay=0.05, compact_threshold=50000):
+        super().__init__(batch_delay)
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_threshold = compact_threshold
+        self._map_lock = threading.RLock()
+        self._map = None
+        self._count = 0
+        self._journal = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open_snapshot()
+        self._replay_journal()
+        self._journal_file = open(self.journal_path, "a")
+        self.start()
+
+    def _open_snapshot(self):
+        # A replaced map is not closed explicitly: iterators still holding it
+        # keep reading the old file until they finish
+        self._map = None
+        self._count = 0
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return
+        with open(self.path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not an economy snapshot (version {VERSION})")
+        self._map, self._count = buf, count
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    user_id, data = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+                self._journal[int(user_id)] = data
+
+    def is_empty(self):
+        return self._count == 0 and not self._journal
+
+    def _lookup(self, user_id):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset = INDEX_ENTRY.unpack_from(self._map, HEADER.size + mid * INDEX_ENTRY.size)
+            if key == user_id:
+                return offset
+            if key < user_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _read(self, user_id):
+        with self._map_lock:
+            data = self._journal.get(user_id)
+            if data is not None:
+                return {**data, "inventory": list(data["inventory"])}
+            if not self._count:
+                return None
+            offset = self._lookup(user_id)
+            return decode_account(self._map, offset) if offset is not None else None
+
+    def _write_batch(self, rows):
+        for user_id, data in rows.items():
+            self._journal_file.write(json.dumps([user_id, data], separators=(",", ":")) + "\n")
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+        with self._map_lock:
+            self._journal.update(rows)
+        if len(self._journal) >= self.compact_threshold:
+            self.compact()
+
+    def _iter_rows(self):
+        with self._map_lock:
+            journal = sorted(self._journal.items())
+            buf, count = self._map, self._count
+        yield from _merge_sorted(_iter_snapshot(buf, count), journal)
+
+    def compact(self):
+        """Fold the journal into a new snapshot. Runs on the writer thread."""
+        with self._map_lock:
+            journal = sorted(self._journal.items())
+            buf, count = self._map, self._count
+        write_snapshot(self.path, _merge_sorted(_iter_snapshot(buf, count), journal))
+        with self._map_lock:
+            self._open_snapshot()
+            self._journal = {}
+            self._journal_file.close()
+            self._journal_file = open(self.journal_path, "w")
+
+    def _shutdown(self):
+        self._journal_file.close()
+        with self._map_lock:
+            if self._map is not None:
+                self._map.close()
+            self._map = None
+            self._count = 0
+
+
+def _iter_snapshot(buf, count):
+    for i in range(count):
+        user_id, offset = INDEX_ENTRY.unpack_from(buf, HEADER.size + i * INDEX_ENTRY.size)
+        yield user_id, decode_account(buf, offset)
+
+
+def _merge_sorted(base, updates):
+    # Both inputs are sorted by user_id; updates win on collisions
+    updates = iter(updates)
+    pending = next(updates, None)
+    for user_id, data in base:
+        while pending is not None and pending[0] < user_id:
+            yield pending
+            pending = next(updates, None)
+        if pending is not None and pending[0] == user_id:
+            yield pending
+            pending = next(updates, None)
+        else:
+            yield user_id, data
+    while pending is not None:
+        yield pending
+        pending = next(updates, None)
+
+
+# python -m utils.economy_snapshot migrate data/economy.json [data/economy.snap]
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "migrate":
+        print("Usage: python -m utils.economy_snapshot migrate <json_path> [snapshot_path]")
+        sys.exit(1)
+    json_path = sys.argv[2]
+    snapshot_path = sys.argv[3] if len(sys.argv) > 3 else "data/economy.snap"
+    print(f"Wrote {migrate_json(json_path, snapshot_path)} accounts to {snapshot_path}")
@@ -0,0 +1,313 @@
+import abc
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from utils.metrics import STORE_WRITE_ROWS, STORE_WRITE_SECONDS
+
+# A failing batch is retried after WRITE_RETRY_BASE seconds, doubling up to WRITE_RETRY_MAX
+WRITE_RETRY_BASE = 0.1
+WRITE_RETRY_MAX = 30.0
+# Seconds flush() waits for queued writes, and close() keeps retrying them, before giving up
+WRITE_TIMEOUT = 30.0
+
+
+def default_account():
+    return {
+        "wallet": 1000,
+        "bank": 0,
+        "daily_streak": 0,
+        "last_daily": None,
+        "inventory": []
+    }
+
+
+class Account:
+    """In-memory account record.
+
+    Slots instead of a per-account dict roughly halve the memory of a cached
+    account; the empty inventory is a shared tuple.
+    """
+
+    __slots__ = ("wallet", "bank", "daily_streak", "last_daily", "inventory")
+
+    def __init__(self, wallet=1000, bank=0, daily_streak=0, last_daily=None, inventory=()):
+        self.wallet = wallet
+        self.bank = bank
+        self.daily_streak = daily_streak
+        self.last_daily = last_daily
+        self.inventory = inventory
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["wallet"], data["bank"], data["daily_streak"], data["last_daily"], tuple(data["inventory"]))
+
+    def to_dict(self):
+        return {
+            "wallet": self.wallet,
+            "bank": self.bank,
+            "daily_streak": self.daily_streak,
+            "last_daily": self.last_daily,
+            "inventory": list(self.inventory)
+        }
+
+    @property
+    def total(self):
+        return self.wallet + self.bank
+
+
+class EconomyStore(abc.ABC):
+    """Base class for economy storage backends.
+
+    Reads are served synchronously (they are point lookups). Writes are
+    queued with put() and committed in batches by a dedicated writer thread,
+    so the event loop never waits on disk.
+
+    A batch that fails is kept and retried with exponential backoff; the
+    latest error is in last_error until a write succeeds. flush() raises
+    TimeoutError instead of waiting forever on a failing store, and close()
+    stops retrying after its timeout, reporting the rows it dropped.
+    """
+
+    def __init__(self, batch_delay=0.05):
+        self.batch_delay = batch_delay
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._inflight = {}
+        self._closing = False
+        self._close_deadline = float("inf")
+        self.last_error = None
+        # user_id -> row that close() gave up on
+        self.dropped = {}
+        self._writer = threading.Thread(target=self._writer_loop, name=f"{type(self).__name__}-writer", daemon=True)
+
+    def start(self):
+        self._writer.start()
+        return self
+
+    # Backend hooks
+    @abc.abstractmethod
+    def _read(self, user_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _iter_rows(self):
+        raise NotImplementedError
+
+    def _shutdown(self):
+        pass
+
+    # Public API
+    def get(self, user_id):
+        user_id = int(user_id)
+        with self._cond:
+            # Read-your-writes: rows still queued or being committed win over disk
+            row = self._pending.get(user_id) or self._inflight.get(user_id)
+        if row is not None:
+            return _copy_account(row)
+        return self._read(user_id)
+
+    def put(self, user_id, data):
+        with self._cond:
+            self._pending[int(user_id)] = _copy_account(data)
+            self._cond.notify_all()
+
+    def iter_accounts(self):
+        """Yield (user_id, data) for every stored account, including queued writes."""
+        self.flush()
+        yield from self._iter_rows()
+
+    def flush(self, timeout=WRITE_TIMEOUT):
+        """Block until every queued write has been committed; TimeoutError if writes keep failing."""
+        with self._cond:
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout):
+                unsaved = len(self._pending) + len(self._inflight)
+                raise TimeoutError(f"{unsaved} economy rows not written after {timeout}s: {self.last_error}")
+
+    def close(self, timeout=WRITE_TIMEOUT):
+        """Write what is queued, retrying failures for up to `timeout` seconds; returns the dropped user IDs."""
+        with self._cond:
+            self._closing = True
+            self._close_deadline = time.monotonic() + timeout
+            self._cond.notify_all()
+        if self._writer.is_alive():
+            self._writer.join()
+        self._shutdown()
+        if self.dropped:
+            user_ids = sorted(self.dropped)
+            print(
+                f"Economy store closed with {len(user_ids)} unwritten rows ({self.last_error}); "
+                f"dropped user IDs: {', '.join(map(str, user_ids))}",
+                file=sys.stderr
+            )
+        return sorted(self.dropped)
+
+    def import_json(self, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for user_id, account in data.items():
+            self.put(user_id, {**default_account(), **account})
+        self.flush()
+        return len(data)
+
+    def export_json(self, path):
+        accounts = {str(user_id): data for user_id, data in self.iter_accounts()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(accounts, f, indent=4)
+        os.replace(tmp_path, path)
+        return len(accounts)
+
+    def _writer_loop(self):
+        failures = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending and self._closing:
+                    return
+                if failures:
+                    # Back off before retrying; close() cuts the wait short at its deadline
+                    retry_at = time.monotonic() + min(WRITE_RETRY_MAX, WRITE_RETRY_BASE * 2 ** (failures - 1))
+                    while (remaining := min(retry_at, self._close_deadline) - time.monotonic()) > 0:
+                        self._cond.wait(remaining)
+                else:
+                    # Give concurrent commands a moment to land in the same transaction
+                    self._cond.wait(self.batch_delay)
+                self._inflight, self._pending = self._pending, {}
+                batch = self._inflight
+            try:
+                started = time.perf_counter()
+                self._write_batch(batch)
+                store = type(self).__name__
+                STORE_WRITE_SECONDS.labels(store).observe(time.perf_counter() - started)
+                STORE_WRITE_ROWS.labels(store).inc(len(batch))
+                failures = 0
+                self.last_error = None
+            except Exception as e:
+                failures += 1
+                self.last_error = e
+                print(f"Economy store write failed ({len(batch)} rows, attempt {failures}): {e}", file=sys.stderr)
+                with self._cond:
+                    if self._closing and time.monotonic() >= self._close_deadline:
+                        # close() has waited long enough; everything still unwritten is lost
+                        self.dropped = {**batch, **self._pending}
+                        self._pending, self._inflight = {}, {}
+                        self._cond.notify_all()
+                        return
+                    # Keep the rows so the next batch retries them
+                    for user_id, row in batch.items():
+                        self._pending.setdefault(user_id, row)
+            with self._cond:
+                self._inflight = {}
+                self._cond.notify_all()
+
+
+class SQLiteEconomyStore(EconomyStore):
+    def __init__(self, path, batch_delay=0.05):
+        super().__init__(batch_delay)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write_conn = self._connect()
+        self._write_conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "user_id INTEGER PRIMARY KEY, "
+            "wallet INTEGER NOT NULL, "
+            "bank INTEGER NOT NULL, "
+            "daily_streak INTEGER NOT NULL, "
+            "last_daily TEXT, "
+            "inventory TEXT NOT NULL)"
+        )
+        self._write_conn.commit()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def is_empty(self):
+        with self._read_lock:
+            return self._read_conn.execute("SELECT 1 FROM accounts LIMIT 1").fetchone() is None
+
+    def _read(self, user_id):
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT wallet, bank, daily_streak, last_daily, inventory FROM accounts WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        return _row_to_account(row) if row else None
+
+    def _write_batch(self, rows):
+        conn = self._write_conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO accounts (user_id, wallet, bank, daily_streak, last_daily, inventory) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, d["wallet"], d["bank"], d["daily_streak"], d["last_daily"], json.dumps(d["inventory"]))
+                    for user_id, d in rows.items()
+                ]
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _iter_rows(self):
+        conn = self._connect()
+        try:
+            cursor = conn.execute("SELECT user_id, wallet, bank, daily_streak, last_daily, inventory FROM accounts")
+            for row in cursor:
+                yield row[0], _row_to_account(row[1:])
+        finally:
+            conn.close()
+
+    def _shutdown(self):
+        self._write_conn.close()
+        self._read_conn.close()
+
+
+def _copy_account(data):
+    return {**data, "inventory": list(data["inventory"])}
+
+
+def _row_to_account(row):
+    wallet, bank, daily_streak, last_daily, inventory = row
+    return {
+        "wallet": wallet,
+        "bank": bank,
+        "daily_streak": daily_streak,
+        "last_daily": last_daily,
+        "inventory": json.loads(inventory)
+    }
+
+
+# python -m utils.economy_store import data/economy.json [data/economy.db]
+# python -m utils.economy_store export data/economy.json [data/economy.db]
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python -m utils.economy_store import|export <json_path> [db_path]")
+        sys.exit(1)
+    action, json_path = sys.argv[1], sys.argv[2]
+    db_path = sys.argv[3] if len(sys.argv) > 3 else "data/economy.db"
+    store = SQLiteEconomyStore(db_path)
+    try:
+        if action == "import":
+            print(f"Imported {store.import_json(json_path)} accounts into {db_path}")
+        else:
+            print(f"Exported {store.export_json(json_path)} accounts to {json_path}")
+    finally:
+        store.close()
@@ -0,0 +1,97 @@
+import asyncio
+import importlib
+import importlib.util
+import time
+
+LOADED = "loaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class ExtensionResult:
+    __slots__ = ("name", "status", "import_ms", "setup_ms", "detail", "deferred")
+
+    def __init__(self, name, deferred=False):
+        self.name = name
+        self.status = None
+        self.import_ms = 0.0
+        self.setup_ms = 0.0
+        self.detail = ""
+        self.deferred = deferred
+
+
+class ExtensionLoader:
+    """Loads extensions concurrently, in dependency order, with timings.
+
+    extensions maps an extension name to the extensions it needs loaded
+    first. Every module is imported on a worker thread at the same time, so
+    slow imports (and the libraries they pull in) overlap; setup() then runs
+    on the event loop as soon as the extension's dependencies are up.
+    Missing modules are skipped, and so is anything depending on an
+    extension that was skipped or failed.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.results = {}
+
+    async def load(self, extensions, deferred=False):
+        results = {name: ExtensionResult(name, deferred) for name in extensions}
+        self.results.update(results)
+        imports = {
+            name: asyncio.create_task(self._import(results[name]))
+            for name in extensions
+        }
+        loads = {}
+
+        async def load_one(name):
+            result = results[name]
+            for dependency in extensions[name]:
+                task = loads.get(dependency)
+                dependency_ok = (await task) if task else dependency in self.bot.extensions
+                if not dependency_ok:
+                    result.status, result.detail = SKIPPED, f"needs {dependency}"
+                    return False
+            if not await imports[name]:
+                return False
+            started = time.perf_counter()
+            try:
+                await self.bot.load_extension(name)
+            except Exception as e:
+                result.status, result.detail = FAILED, f"{type(e).__name__}: {e}"
+                return False
+            finally:
+                result.setup_ms = (time.perf_counter() - started) * 1000
+            result.status = LOADED
+            return True
+
+        for name in extensions:
+            loads[name] = asyncio.create_task(load_one(name))
+        await asyncio.gather(*loads.values())
+        return [results[name] for name in extensions]
+
+    async def _import(self, result):
+        started = time.perf_counter()
+        try:
+            if importlib.util.find_spec(result.name) is None:
+                result.status, result.detail = SKIPPED, "module not found"
+                return False
+            # Warms sys.modules for the extension's own imports; load_extension
+            # re-executes only the extension module itself
+            await asyncio.to_thread(importlib.import_module, result.name)
+        except Exception as e:
+            result.status, result.detail = FAILED, f"import {type(e).__name__}: {e}"
+            return False
+        finally:
+            result.import_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    def report(self, results=None):
+        lines = [f"{'extension':<24}{'status':<10}{'import':>10}{'setup':>10}  detail"]
+        for result in results or self.results.values():
+            status = result.status or "pending"
+            detail = ", ".join(filter(None, (result.detail, "deferred" if result.deferred else "")))
+            lines.append(
+                f"{result.name:<24}{status:<10}{result.import_ms:>8.1f}ms{result.setup_ms:>8.1f}ms  {detail}".rstrip()
+            )
+        return "\n".join(lines)
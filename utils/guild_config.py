@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from utils.raid_detector import JOIN_THRESHOLD, JOIN_WINDOW
+from utils.word_filter import WordFilter
+
+
+class GuildSettings:
+    __slots__ = ("antinuke", "anti_alt_days", "whitelist", "word_filter", "raid_joins", "raid_window")
+
+    def __init__(self, antinuke=False, anti_alt_days=0, whitelist=(), blacklisted_words=(),
+                 raid_joins=JOIN_THRESHOLD, raid_window=JOIN_WINDOW):
+        self.antinuke = antinuke
+        self.anti_alt_days = anti_alt_days
+        self.whitelist = set(whitelist)
+        self.word_filter = WordFilter(blacklisted_words)
+        # Joins within raid_window seconds that start raid mode
+        self.raid_joins = raid_joins
+        self.raid_window = raid_window
+
+    @property
+    def blacklisted_words(self):
+        return self.word_filter.words
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("antinuke", False),
+            data.get("anti_alt_days", 0),
+            data.get("whitelist", ()),
+            data.get("blacklisted_words", ()),
+            data.get("raid_joins", JOIN_THRESHOLD),
+            data.get("raid_window", JOIN_WINDOW)
+        )
+
+    def to_dict(self):
+        return {
+            "antinuke": self.antinuke,
+            "anti_alt_days": self.anti_alt_days,
+            "whitelist": sorted(self.whitelist),
+            "blacklisted_words": sorted(self.word_filter.words),
+            "raid_joins": self.raid_joins,
+            "raid_window": self.raid_window
+        }
+
+
+class GuildConfigStore:
+    """Per-guild settings in SQLite behind an LRU read-through cache.
+
+    Hot-path checks (is antinuke on, is this user whitelisted) are a dict hit
+    plus an attribute or set lookup. update() applies a change to the cached
+    settings, writes them off the event loop and replaces the cache entry;
+    invalidate() drops an entry that was changed elsewhere. At most
+    max_cached guilds are kept; the least recently used are evicted.
+    """
+
+    def __init__(self, path, max_cached=10000):
+        self.path = path
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._write_lock = asyncio.Lock()
+        self._db_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS guild_config (guild_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+
+    def get(self, guild_id):
+        settings = self._cache.get(guild_id)
+        if settings is not None:
+            self._cache.move_to_end(guild_id)
+            return settings
+        with self._db_lock:
+            row = self._conn.execute("SELECT data FROM guild_config WHERE guild_id = ?", (guild_id,)).fetchone()
+        settings = GuildSettings.from_dict(json.loads(row[0])) if row else GuildSettings()
+        self._cache[guild_id] = settings
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return settings
+
+    def is_antinuke(self, guild_id):
+        return self.get(guild_id).antinuke
+
+    def is_whitelisted(self, guild_id, user_id):
+        return user_id in self.get(guild_id).whitelist
+
+    async def update(self, guild_id, change):
+        """Apply change(settings) and persist it. Returns whatever change returns."""
+        async with self._write_lock:
+            settings = self.get(guild_id)
+            result = change(settings)
+            try:
+                await asyncio.to_thread(self._write, guild_id, json.dumps(settings.to_dict()))
+            except Exception:
+                # Never serve a change that did not reach the database
+                self.invalidate(guild_id)
+                raise
+            self._cache[guild_id] = settings
+            return result
+
+    def _write(self, guild_id, data):
+        with self._db_lock:
+            self._conn.execute("INSERT OR REPLACE INTO guild_config (guild_id, data) VALUES (?, ?)", (guild_id, data))
+
+    def invalidate(self, guild_id):
+        self._cache.pop(guild_id, None)
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
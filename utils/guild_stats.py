@@ -0,0 +1,70 @@
+class GuildCounts:
+    __slots__ = ("bots", "online", "boosters", "online_exact")
+
+    def __init__(self, bots=0, online=0, boosters=0, online_exact=True):
+        self.bots = bots
+        self.online = online
+        self.boosters = boosters
+        # False when online is Discord's approximate_presence_count
+        self.online_exact = online_exact
+
+
+class GuildStats:
+    """Per-guild member counters kept current by gateway events.
+
+    A guild is only tracked once it has been counted in full (recount()),
+    which the owner does lazily on first use and then periodically, for
+    guilds still being viewed, to correct drift; events for untracked
+    guilds are ignored. Every update
+    and read is O(1).
+    """
+
+    def __init__(self):
+        self._guilds = {}
+
+    def get(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def tracked(self):
+        return list(self._guilds)
+
+    def forget(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def recount(self, guild_id, members, is_online, online=None):
+        """Count members from scratch. is_online(member) decides presence unless online is given."""
+        counts = GuildCounts()
+        for member in members:
+            if member.bot:
+                counts.bots += 1
+            if member.premium_since is not None:
+                counts.boosters += 1
+            if online is None and is_online(member):
+                counts.online += 1
+        if online is not None:
+            counts.online, counts.online_exact = online, False
+        self._guilds[guild_id] = counts
+        return counts
+
+    def member_joined(self, guild_id, bot, online=False):
+        counts = self._guilds.get(guild_id)
+        if counts is not None:
+            counts.bots += bot
+            counts.online += online and counts.online_exact
+
+    def member_left(self, guild_id, bot, online=False, boosting=False):
+        counts = self._guilds.get(guild_id)
+        if counts is not None:
+            counts.bots -= bot
+            counts.online -= online and counts.online_exact
+            counts.boosters -= boosting
+
+    def presence_changed(self, guild_id, was_online, is_online):
+        counts = self._guilds.get(guild_id)
+        if counts is not None and counts.online_exact and was_online != is_online:
+            counts.online += 1 if is_online else -1
+
+    def boost_changed(self, guild_id, was_boosting, is_boosting):
+        counts = self._guilds.get(guild_id)
+        if counts is not None and was_boosting != is_boosting:
+            counts.boosters += 1 if is_boosting else -1
@@ -0,0 +1,61 @@
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """Order-statistics index of account totals.
+
+    Entries are kept sorted as (-score, user_id), so updates, rank lookups
+    and slices around a rank are all O(log n) with no full scan.
+    """
+
+    def __init__(self):
+        self._ranking = SortedList()
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def update(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._ranking.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._ranking.add((-score, user_id))
+
+    def remove(self, user_id):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._ranking.remove((-old, user_id))
+
+    def load(self, entries):
+        """Bulk-load (user_id, score) pairs; users updated since the load started keep their newer score."""
+        fresh = [(-score, user_id) for user_id, score in entries if user_id not in self._scores]
+        for score, user_id in fresh:
+            self._scores[user_id] = -score
+        self._ranking.update(fresh)
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def rank(self, user_id):
+        """1-based rank, or None for users not on the board."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._ranking.index((-score, user_id)) + 1
+
+    def top(self, count=10, start=0):
+        """[(rank, user_id, score)] for ranks start+1 .. start+count."""
+        return [
+            (start + i + 1, user_id, -score)
+            for i, (score, user_id) in enumerate(self._ranking.islice(start, start + count))
+        ]
+
+    def around(self, user_id, radius=2):
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(0, rank - 1 - radius)
+        return self.top(rank - start + radius, start)
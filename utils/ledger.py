@@ -0,0 +1,270 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from utils.economy_store import default_account
+
+# Every wallet change is one fixed-size record:
+#   timestamp, user_id, counterparty, delta, balance_after, kind (padded to 48 bytes)
+RECORD = struct.Struct("<dQQqqB7x")
+# Sealed segments get a sidecar index of (user_id, record number) sorted by user
+INDEX_ENTRY = struct.Struct("<QI")
+SEGMENT_RECORDS = 1 << 20
+
+KINDS = {
+    "adjust": 0,
+    "daily": 1,
+    "blackjack": 2,
+    "rob": 3,
+    "rob_fine": 4
+}
+KIND_NAMES = {value: name for name, value in KINDS.items()}
+
+LedgerEntry = namedtuple("LedgerEntry", "timestamp user_id counterparty delta balance kind")
+
+
+class Ledger:
+    """Segmented, append-only log of wallet changes.
+
+    Appends go to a buffered file and an in-memory per-user index of the
+    active segment. When a segment fills up it is sealed and its per-user
+    index is written next to it on a background thread, so history lookups
+    never scan old segments.
+    """
+
+    def __init__(self, directory="data/ledger", segment_records=SEGMENT_RECORDS):
+        self.directory = directory
+        self.segment_records = segment_records
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".seg"))
+        if not self._segments:
+            self._segments.append(1)
+        self._sealed_indexes = {}
+        # Segments sealed in this process whose index file is still being written
+        self._pending_indexes = {}
+        self._lock = threading.Lock()
+
+        for segment in self._segments[:-1]:
+            if not os.path.exists(self._path(segment, "idx")):
+                self._seal(segment, self._scan_index(segment))
+        self._open_active(self._segments[-1])
+
+    def _path(self, segment, ext):
+        return os.path.join(self.directory, f"{segment:08d}.{ext}")
+
+    def _open_active(self, segment):
+        path = self._path(segment, "seg")
+        self._active_index = self._scan_index(segment) if os.path.exists(path) else {}
+        # Drop a torn trailing record left by a crash
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._active_count = size // RECORD.size
+        self._file = open(path, "ab")
+        if size % RECORD.size:
+            self._file.truncate(self._active_count * RECORD.size)
+        self._active_fd = os.open(path, os.O_RDONLY)
+
+    def _scan_index(self, segment):
+        index = {}
+        for number, entry in enumerate(self._read_segment(segment)):
+            index.setdefault(entry.user_id, []).append(number)
+        return index
+
+    def _read_segment(self, segment):
+        path = self._path(segment, "seg")
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(RECORD.size * 4096)
+                if not chunk:
+                    break
+                for i in range(0, len(chunk) - RECORD.size + 1, RECORD.size):
+                    yield _decode(chunk, i)
+
+    def append(self, user_id, delta, balance, kind, counterparty=0):
+        self._file.write(RECORD.pack(time.time(), user_id, counterparty, delta, balance, KINDS[kind]))
+        self._active_index.setdefault(user_id, []).append(self._active_count)
+        self._active_count += 1
+        if self._active_count >= self.segment_records:
+            self._rotate()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        os.close(self._active_fd)
+        with self._lock:
+            threads = list(self._pending_indexes.values())
+        for _, thread in threads:
+            thread.join()
+
+    def _rotate(self):
+        self._file.close()
+        os.close(self._active_fd)
+        segment = self._segments[-1]
+        self._seal(segment, self._active_index)
+        self._segments.append(segment + 1)
+        self._open_active(segment + 1)
+
+    def _seal(self, segment, index):
+        thread = threading.Thread(target=self._write_index, args=(segment, index), daemon=True)
+        with self._lock:
+            self._pending_indexes[segment] = (index, thread)
+        thread.start()
+
+    def _write_index(self, segment, index):
+        path = self._path(segment, "idx")
+        with open(f"{path}.tmp", "wb") as f:
+            for user_id in sorted(index):
+                for number in index[user_id]:
+                    f.write(INDEX_ENTRY.pack(user_id, number))
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            del self._pending_indexes[segment]
+
+    def _sealed_positions(self, segment, user_id):
+        with self._lock:
+            pending = self._pending_indexes.get(segment)
+        if pending is not None:
+            return pending[0].get(user_id, [])
+
+        buf = self._sealed_indexes.get(segment)
+        if buf is None:
+            path = self._path(segment, "idx")
+            if os.path.getsize(path) == 0:
+                return []
+            with open(path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._sealed_indexes[segment] = buf
+
+        count = len(buf) // INDEX_ENTRY.size
+        start = _lower_bound(buf, count, user_id)
+        positions = []
+        for i in range(start, count):
+            key, number = INDEX_ENTRY.unpack_from(buf, i * INDEX_ENTRY.size)
+            if key != user_id:
+                break
+            positions.append(number)
+        return positions
+
+    def history(self, user_id, limit=None):
+        """Yield a user's entries, newest first."""
+        self.flush()
+        yielded = 0
+        for segment in reversed(self._segments):
+            if segment == self._segments[-1]:
+                positions = list(self._active_index.get(user_id, ()))
+                fd, close_fd = self._active_fd, False
+            else:
+                positions = self._sealed_positions(segment, user_id)
+                if not positions:
+                    continue
+                fd, close_fd = os.open(self._path(segment, "seg"), os.O_RDONLY), True
+            try:
+                for number in reversed(positions):
+                    if limit is not None and yielded >= limit:
+                        return
+                    yield _decode(os.pread(fd, RECORD.size, number * RECORD.size), 0)
+                    yielded += 1
+            finally:
+                if close_fd:
+                    os.close(fd)
+
+    def replay(self):
+        """Yield every entry in append order."""
+        self.flush()
+        for segment in self._segments:
+            yield from self._read_segment(segment)
+
+
+def _decode(buf, offset):
+    timestamp, user_id, counterparty, delta, balance, kind = RECORD.unpack_from(buf, offset)
+    return LedgerEntry(timestamp, user_id, counterparty, delta, balance, KIND_NAMES.get(kind, "unknown"))
+
+
+def _lower_bound(buf, count, user_id):
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if INDEX_ENTRY.unpack_from(buf, mid * INDEX_ENTRY.size)[0] < user_id:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def rebuild_balances(ledger):
+    """Replay the ledger into {user_id: wallet}, plus entries whose balance does not follow from the delta."""
+    start = default_account()["wallet"]
+    balances = {}
+    broken = []
+    for entry in ledger.replay():
+        expected = balances.get(entry.user_id, start) + entry.delta
+        if expected != entry.balance:
+            broken.append(entry)
+        # The recorded balance is authoritative for the next step of the chain
+        balances[entry.user_id] = entry.balance
+    return balances, broken
+
+
+def open_store(path):
+    if path.endswith(".snap"):
+        from utils.economy_snapshot import SnapshotEconomyStore
+        return SnapshotEconomyStore(path)
+    from utils.economy_store import SQLiteEconomyStore
+    return SQLiteEconomyStore(path)
+
+
+def verify(ledger, store):
+    balances, broken = rebuild_balances(ledger)
+    start = default_account()["wallet"]
+    mismatched = []
+    for user_id, data in store.iter_accounts():
+        expected = balances.pop(user_id, start)
+        if data["wallet"] != expected:
+            mismatched.append((user_id, expected, data["wallet"]))
+    # Ledger users the store has never persisted
+    for user_id, expected in balances.items():
+        if expected != start:
+            mismatched.append((user_id, expected, None))
+    return broken, mismatched
+
+
+def seed(ledger, store):
+    """Record opening balances for accounts that predate the ledger."""
+    start = default_account()["wallet"]
+    seeded = 0
+    for user_id, data in store.iter_accounts():
+        if data["wallet"] != start and next(ledger.history(user_id, limit=1), None) is None:
+            ledger.append(user_id, data["wallet"] - start, data["wallet"], "adjust")
+            seeded += 1
+    ledger.flush()
+    return seeded
+
+
+# python -m utils.ledger verify [data/economy.db] [data/ledger]
+# python -m utils.ledger seed [data/economy.db] [data/ledger]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("verify", "seed"):
+        print("Usage: python -m utils.ledger verify|seed [store_path] [ledger_dir]")
+        sys.exit(1)
+    store_path = sys.argv[2] if len(sys.argv) > 2 else "data/economy.db"
+    ledger = Ledger(sys.argv[3] if len(sys.argv) > 3 else "data/ledger")
+    store = open_store(store_path)
+    try:
+        if sys.argv[1] == "seed":
+            print(f"Seeded {seed(ledger, store)} opening balances")
+        else:
+            broken, mismatched = verify(ledger, store)
+            for entry in broken:
+                print(f"Broken chain: {entry}")
+            for user_id, expected, actual in mismatched:
+                print(f"Mismatch for {user_id}: ledger says {expected}, store has {actual}")
+            print(f"{len(broken)} broken entries, {len(mismatched)} mismatched balances")
+            sys.exit(1 if broken or mismatched else 0)
+    finally:
+        store.close()
+        ledger.close()
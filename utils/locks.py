@@ -0,0 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class StripedLock:
+    """Fixed table of asyncio locks shared by hashing keys onto stripes.
+
+    Unrelated keys rarely share a stripe, so work on different accounts runs
+    in parallel without one lock per account. hold() always takes stripes in
+    ascending order, so two callers locking overlapping key sets cannot
+    deadlock.
+    """
+
+    def __init__(self, stripes=1024):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    def stripes_for(self, *keys):
+        return sorted({hash(key) % len(self._locks) for key in keys})
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        acquired = []
+        try:
+            for stripe in self.stripes_for(*keys):
+                await self._locks[stripe].acquire()
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                self._locks[stripe].release()
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+from itertools import product
+
+
+class Subscription:
+    __slots__ = ("router", "key", "handler", "check", "future")
+
+    def __init__(self, router, key, handler=None, check=None, future=None):
+        self.router = router
+        self.key = key
+        self.handler = handler
+        self.check = check
+        self.future = future
+
+    def cancel(self):
+        self.router._remove(self)
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
+
+
+class MessageRouter:
+    """Routes each message only to the waiters and consumers that could want it.
+
+    Registrations are indexed by (guild, channel, author); any of the three
+    may be None to match everything. A message is looked up under the eight
+    combinations of its own IDs and None, so its cost depends on how many
+    registrations actually match, not on how many exist. Registrations must
+    name at least a channel or an author.
+    """
+
+    def __init__(self):
+        self._index = {}
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self._index.values())
+
+    def _add(self, subscription):
+        guild_id, channel_id, author_id = subscription.key
+        if channel_id is None and author_id is None:
+            raise ValueError("A message subscription needs a channel or an author")
+        self._index.setdefault(subscription.key, {})[subscription] = None
+        return subscription
+
+    def _remove(self, subscription):
+        subscriptions = self._index.get(subscription.key)
+        if subscriptions is not None:
+            subscriptions.pop(subscription, None)
+            if not subscriptions:
+                del self._index[subscription.key]
+
+    def subscribe(self, handler, *, guild_id=None, channel_id=None, author_id=None, check=None):
+        """Call handler(message) for every matching message until the subscription is cancelled.
+
+        The handler runs inline in the dispatch and must not block; REST work
+        belongs in a task.
+        """
+        return self._add(Subscription(self, (guild_id, channel_id, author_id), handler=handler, check=check))
+
+    async def wait_for(self, *, guild_id=None, channel_id=None, author_id=None, check=None, timeout=None):
+        """The next matching message, like bot.wait_for('message'). Raises asyncio.TimeoutError."""
+        future = asyncio.get_running_loop().create_future()
+        subscription = self._add(Subscription(self, (guild_id, channel_id, author_id), check=check, future=future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._remove(subscription)
+
+    async def dispatch(self, message):
+        guild_id = message.guild.id if message.guild else None
+        ids = ((guild_id, None), (message.channel.id, None), (message.author.id, None))
+        for key in product(*ids):
+            subscriptions = self._index.get(key)
+            if not subscriptions:
+                continue
+            # Handlers may cancel subscriptions while we iterate
+            for subscription in list(subscriptions):
+                if subscription not in subscriptions:
+                    continue
+                # One broken consumer must not starve the others
+                try:
+                    if subscription.check is not None and not subscription.check(message):
+                        continue
+                    if subscription.future is not None:
+                        if not subscription.future.done():
+                            subscription.future.set_result(message)
+                        self._remove(subscription)
+                    else:
+                        subscription.handler(message)
+                except Exception as e:
+                    print(f"Message subscriber failed: {e}", file=sys.stderr)
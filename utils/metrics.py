@@ -0,0 +1,302 @@
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import time
+from bisect import bisect_left
+
+import discord
+from discord import app_commands
+
+# Upper bounds in seconds for latency histograms; anything slower lands in +Inf
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Seconds between event-loop lag samples
+LAG_INTERVAL = 0.5
+# Default port of the /metrics endpoint; METRICS_PORT overrides it, "off" disables it
+METRICS_PORT = 9464
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Fixed-bucket histogram: an observation is one bisect and three additions."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (the last finite bound for +Inf)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[min(i, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+
+class Family:
+    """One metric name; children per label values, created on first use."""
+
+    def __init__(self, name, help, kind, labelnames, factory):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self.children.items():
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            braced = f"{{{labels}}}" if labels else ""
+            if self.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip((*child.bounds, "+Inf"), child.counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+                lines.append(f"{self.name}_sum{braced} {child.sum}")
+                lines.append(f"{self.name}_count{braced} {child.count}")
+            else:
+                lines.append(f"{self.name}{braced} {child.value}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Metrics kept in plain Python objects and rendered as Prometheus text on request.
+
+    Recording never formats or allocates beyond the first use of a label
+    set. Collectors registered with on_collect() run just before rendering,
+    for values that are cheaper to read than to track (queue depths...).
+    """
+
+    def __init__(self):
+        self.families = {}
+        self.collectors = []
+
+    def _family(self, name, help, kind, labelnames, factory):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = Family(name, help, kind, tuple(labelnames), factory)
+        return family
+
+    def counter(self, name, help, labelnames=()):
+        return self._family(name, help, "counter", labelnames, Counter)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._family(name, help, "gauge", labelnames, Gauge)
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._family(name, help, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def on_collect(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}", file=sys.stderr)
+        lines = []
+        for family in self.families.values():
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+COMMAND_SECONDS = METRICS.histogram("bot_command_duration_seconds", "Slash command run time", ("command",))
+COMMAND_ERRORS = METRICS.counter("bot_command_errors_total", "Slash commands that raised", ("command", "error"))
+EVENT_SECONDS = METRICS.histogram("bot_event_handler_duration_seconds", "Event handler run time", ("event",))
+REST_SECONDS = METRICS.histogram("bot_rest_request_duration_seconds", "Discord REST requests, retries included", ("route",))
+REST_REQUESTS = METRICS.counter("bot_rest_requests_total", "Discord REST requests by outcome", ("route", "status"))
+REST_RATE_LIMITED = METRICS.counter("bot_rest_rate_limited_total", "429 responses from Discord", ("route",))
+STORE_WRITE_SECONDS = METRICS.histogram("bot_store_write_seconds", "Economy store batch commit time", ("store",))
+STORE_WRITE_ROWS = METRICS.counter("bot_store_written_rows_total", "Economy store rows committed", ("store",))
+LOOP_LAG = METRICS.gauge("bot_event_loop_lag_seconds", "Latest event loop lag sample")
+LOOP_LAG_SECONDS = METRICS.histogram("bot_event_loop_lag_distribution_seconds", "Event loop lag samples")
+REST_LANE_DEPTH = METRICS.gauge("bot_rest_lane_depth", "REST scheduler jobs waiting", ("lane",))
+REST_LANE_RUNNING = METRICS.gauge("bot_rest_lane_running", "REST scheduler jobs running", ("lane",))
+
+# Route of the REST request running in the current task, for the 429 log filter
+_current_route = contextvars.ContextVar("current_route", default="unknown")
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    """Command tree that times every slash command and counts its errors.
+
+    The start time rides on interaction.extras; the bot records the duration
+    from on_app_command_completion, failures are recorded in on_error.
+    """
+
+    async def interaction_check(self, interaction):
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        started = interaction.extras.get("started")
+        name = interaction.command.qualified_name if interaction.command else "unknown"
+        if started is not None:
+            COMMAND_SECONDS.labels(name).observe(time.perf_counter() - started)
+        original = getattr(error, "original", error)
+        COMMAND_ERRORS.labels(name, type(original).__name__).inc()
+        await super().on_error(interaction, error)
+
+
+def record_command(interaction, command):
+    started = interaction.extras.get("started")
+    if started is not None:
+        COMMAND_SECONDS.labels(command.qualified_name).observe(time.perf_counter() - started)
+
+
+class _RateLimitFilter(logging.Filter):
+    # discord.py retries 429s itself and only logs them; count them by the route being requested
+    def filter(self, record):
+        if "responded with 429" in str(record.msg):
+            REST_RATE_LIMITED.labels(_current_route.get()).inc()
+        return True
+
+
+def instrument_http(http):
+    """Count and time every REST request made through a discord.py HTTPClient."""
+    request = http.request
+
+    async def timed_request(route, **kwargs):
+        key = f"{route.method} {route.path}"
+        token = _current_route.set(key)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await request(route, **kwargs)
+        except discord.RateLimited:
+            # Already counted by the log filter, which sees it before this is raised
+            status = "429"
+            raise
+        except discord.HTTPException as e:
+            status = str(e.status)
+            if e.status == 429:
+                # Cloudflare bans come back as 429 without the rate limit warning being logged
+                REST_RATE_LIMITED.labels(key).inc()
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            REST_SECONDS.labels(key).observe(time.perf_counter() - started)
+            REST_REQUESTS.labels(key, status).inc()
+            _current_route.reset(token)
+
+    http.request = timed_request
+    logging.getLogger("discord.http").addFilter(_RateLimitFilter())
+
+
+def collect_rest_scheduler(scheduler):
+    """Export the RestScheduler's lane queues whenever metrics are rendered."""
+    def collect():
+        for lane, stats in scheduler.metrics().items():
+            REST_LANE_DEPTH.labels(lane).set(stats["depth"])
+            REST_LANE_RUNNING.labels(lane).set(stats["running"])
+    METRICS.on_collect(collect)
+
+
+async def watch_loop_lag(interval=LAG_INTERVAL):
+    """Sleep `interval` over and over; how late each wake-up is, is the loop's lag."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        LOOP_LAG.labels().set(lag)
+        LOOP_LAG_SECONDS.labels().observe(lag)
+
+
+def metrics_port(offset=0):
+    """Port for the /metrics endpoint from METRICS_PORT, or None when disabled."""
+    value = os.getenv("METRICS_PORT", str(METRICS_PORT)).strip().lower()
+    if value in ("", "off", "false", "none"):
+        return None
+    return int(value) + offset
+
+
+class MetricsServer:
+    """Minimal HTTP endpoint serving the registry as Prometheus text on GET /metrics."""
+
+    def __init__(self, registry=METRICS, host="127.0.0.1", port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+            if path.split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Seconds before a release that failed is attempted again
+RETRY_DELAY = 60
+
+
+class Sentence:
+    __slots__ = ("guild_id", "user_id", "kind", "expires_at", "data")
+
+    def __init__(self, guild_id, user_id, kind, expires_at, data=None):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.kind = kind
+        self.expires_at = expires_at
+        self.data = data or {}
+
+    @property
+    def key(self):
+        return (self.guild_id, self.user_id, self.kind)
+
+
+class PunishmentScheduler:
+    """Persistent timers for timed punishments (jail sentences, mutes...).
+
+    Pending sentences live in SQLite and in a min-heap ordered by expiry.
+    A single task sleeps until the earliest expiry and then calls
+    on_expire(sentence); a new sentence that expires sooner wakes it early.
+    Replacing or cancelling a sentence leaves its old heap entry behind,
+    which is skipped when it comes up. On start() every stored sentence is
+    loaded again, and those that expired while the bot was down are
+    released straight away.
+    """
+
+    def __init__(self, path, on_expire):
+        self.path = path
+        self.on_expire = on_expire
+        self._sentences = {}
+        self._heap = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self._releasing = set()
+        self._db_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentences ("
+            "guild_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, "
+            "kind TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "data TEXT NOT NULL, "
+            "PRIMARY KEY (guild_id, user_id, kind))"
+        )
+
+    def start(self, owns=None):
+        """Load stored sentences and start releasing them.
+
+        owns(guild_id) limits this process to its own guilds' sentences when
+        several processes share the database (see utils.cluster).
+        """
+        with self._db_lock:
+            rows = self._conn.execute("SELECT guild_id, user_id, kind, expires_at, data FROM sentences").fetchall()
+        for guild_id, user_id, kind, expires_at, data in rows:
+            if owns is not None and not owns(guild_id):
+                continue
+            # Scheduled before start(): already tracked, and a second heap entry would release it twice
+            if (guild_id, user_id, kind) in self._sentences:
+                continue
+            self._track(Sentence(guild_id, user_id, kind, expires_at, json.loads(data)))
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        for task in [self._task, *self._releasing]:
+            if task:
+                task.cancel()
+        await asyncio.gather(*filter(None, [self._task, *self._releasing]), return_exceptions=True)
+        with self._db_lock:
+            self._conn.close()
+
+    def __len__(self):
+        return len(self._sentences)
+
+    def get(self, guild_id, user_id, kind):
+        return self._sentences.get((guild_id, user_id, kind))
+
+    def pending(self, guild_id=None, kind=None):
+        return sorted(
+            (s for s in self._sentences.values()
+             if (guild_id is None or s.guild_id == guild_id) and (kind is None or s.kind == kind)),
+            key=lambda s: s.expires_at
+        )
+
+    async def schedule(self, guild_id, user_id, kind, duration, data=None):
+        """Start (or replace) a sentence ending `duration` seconds from now."""
+        sentence = Sentence(guild_id, user_id, kind, time.time() + duration, data)
+        await asyncio.to_thread(self._write, sentence)
+        self._track(sentence)
+        return sentence
+
+    async def cancel(self, guild_id, user_id, kind):
+        """Drop a sentence without releasing it. Returns the sentence, or None."""
+        sentence = self._sentences.pop((guild_id, user_id, kind), None)
+        if sentence is not None:
+            await asyncio.to_thread(self._delete, sentence.key)
+        return sentence
+
+    def _track(self, sentence):
+        self._sentences[sentence.key] = sentence
+        heapq.heappush(self._heap, (sentence.expires_at, sentence.key))
+        if self._heap[0][1] == sentence.key:
+            self._wake.set()
+
+    def _write(self, sentence):
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sentences (guild_id, user_id, kind, expires_at, data) VALUES (?, ?, ?, ?, ?)",
+                (sentence.guild_id, sentence.user_id, sentence.kind, sentence.expires_at, json.dumps(sentence.data))
+            )
+
+    def _delete(self, key):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM sentences WHERE guild_id = ? AND user_id = ? AND kind = ?", key)
+
+    async def _run(self):
+        while True:
+            # Discard entries for sentences that were replaced or cancelled
+            while self._heap:
+                expires_at, key = self._heap[0]
+                sentence = self._sentences.get(key)
+                if sentence is not None and sentence.expires_at == expires_at:
+                    break
+                heapq.heappop(self._heap)
+
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                timer = asyncio.get_running_loop().call_later(delay, self._wake.set)
+                try:
+                    await self._wake.wait()
+                finally:
+                    timer.cancel()
+                continue
+
+            # Release everything that is due; the REST scheduler bounds the concurrency
+            _, key = heapq.heappop(self._heap)
+            task = asyncio.create_task(self._release(self._sentences[key]))
+            self._releasing.add(task)
+            task.add_done_callback(self._releasing.discard)
+
+    async def _release(self, sentence):
+        key = sentence.key
+        try:
+            await self.on_expire(sentence)
+        except Exception as e:
+            print(f"Releasing {sentence.kind} {sentence.user_id} in {sentence.guild_id} failed: {e}", file=sys.stderr)
+            if self._sentences.get(key) is sentence:
+                sentence.expires_at = time.time() + RETRY_DELAY
+                self._track(sentence)
+            return
+        if self._sentences.get(key) is sentence:
+            del self._sentences[key]
+            await asyncio.to_thread(self._delete, key)
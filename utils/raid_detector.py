@@ -0,0 +1,101 @@
+from collections import deque
+
+YOUNG_ACCOUNT = "young_account"
+JOIN_RATE = "join_rate"
+CREATION_CLUSTER = "creation_cluster"
+RAID_MODE = "raid_mode"
+
+# Defaults for guilds that have not set their own join-rate limit: joins per window seconds
+JOIN_THRESHOLD = 10
+JOIN_WINDOW = 10.0
+
+
+class _GuildJoins:
+    __slots__ = ("joins", "buckets", "raid_until", "raid_buckets")
+
+    def __init__(self):
+        # (joined_at, member_id, creation bucket) for joins inside the window
+        self.joins = deque()
+        self.buckets = {}
+        self.raid_until = 0.0
+        # Creation buckets of the batches that started or fed the current raid
+        self.raid_buckets = set()
+
+
+class RaidDetector:
+    """Per-guild join-rate and account-age raid detection.
+
+    Each guild keeps a sliding window of recent joins plus counts of how many
+    of those accounts were created in the same creation_bucket seconds (a
+    batch is counted over a bucket and its two neighbours), so
+    every join costs amortised O(1). A raid starts when the window holds
+    join_threshold joins or cluster_threshold same-batch accounts, and lasts
+    until raid_cooldown seconds pass without a suspicious join: one from a
+    flagged creation batch, one younger than min_account_age, or one while
+    the window is still at join_threshold. Every join during a raid is
+    flagged, but ordinary ones do not extend it. on_join()
+    can override window and join_threshold per call, for guilds that set
+    their own limit.
+    """
+
+    def __init__(self, window=JOIN_WINDOW, join_threshold=JOIN_THRESHOLD, creation_bucket=600, cluster_threshold=5, raid_cooldown=60.0):
+        self.window = window
+        self.join_threshold = join_threshold
+        self.creation_bucket = creation_bucket
+        self.cluster_threshold = cluster_threshold
+        self.raid_cooldown = raid_cooldown
+        self._guilds = {}
+
+    def in_raid(self, guild_id, now):
+        state = self._guilds.get(guild_id)
+        return state is not None and state.raid_until > now
+
+    def reset(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def on_join(self, guild_id, member_id, joined_at, created_at, min_account_age=0.0, join_threshold=None, window=None):
+        """Record a join (timestamps in seconds) and return [(member_id, reason)] to act on."""
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildJoins()
+
+        joins, buckets = state.joins, state.buckets
+        cutoff = joined_at - (window or self.window)
+        while joins and joins[0][0] < cutoff:
+            _, _, old_bucket = joins.popleft()
+            remaining = buckets[old_bucket] - 1
+            if remaining:
+                buckets[old_bucket] = remaining
+            else:
+                del buckets[old_bucket]
+
+        bucket = int(created_at // self.creation_bucket)
+        joins.append((joined_at, member_id, bucket))
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+        # Neighbouring buckets too, so a batch created across a bucket edge still counts as one
+        nearby = (bucket - 1, bucket, bucket + 1)
+        cluster = sum(buckets.get(near, 0) for near in nearby)
+
+        join_threshold = join_threshold or self.join_threshold
+        young = min_account_age and joined_at - created_at < min_account_age
+        if state.raid_until > joined_at:
+            # Raid mode flags every joiner; only suspicious joins keep it going
+            if cluster >= self.cluster_threshold:
+                state.raid_buckets.update(nearby)
+            if bucket in state.raid_buckets or young or len(joins) >= join_threshold:
+                state.raid_until = joined_at + self.raid_cooldown
+            return [(member_id, RAID_MODE)]
+
+        if cluster >= self.cluster_threshold:
+            # Everyone in the window from the same creation batch
+            state.raid_until = joined_at + self.raid_cooldown
+            state.raid_buckets = set(nearby)
+            return [(joined_id, CREATION_CLUSTER) for _, joined_id, joined_bucket in joins if joined_bucket in state.raid_buckets]
+        if len(joins) >= join_threshold:
+            state.raid_until = joined_at + self.raid_cooldown
+            state.raid_buckets = set()
+            return [(joined_id, JOIN_RATE) for _, joined_id, _ in joins]
+
+        if young:
+            return [(member_id, YOUNG_ACCOUNT)]
+        return []
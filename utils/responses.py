@@ -0,0 +1,118 @@
+import asyncio
+import sys
+import time
+
+import discord
+
+# Work that finishes inside this window is answered directly with its result;
+# anything slower is deferred first. Must stay well under Discord's 3s deadline.
+DEFER_THRESHOLD = 0.4
+
+# command name -> [responses, total seconds, worst seconds]
+response_times = {}
+
+
+def _command_name(interaction):
+    command = getattr(interaction, "command", None)
+    return command.qualified_name if command else "unknown"
+
+
+def _created(interaction):
+    # Measured from the interaction's snowflake timestamp, the same clock
+    # Discord's 3s response deadline runs on
+    created_at = getattr(interaction, "created_at", None)
+    return created_at.timestamp() if created_at else time.time()
+
+
+def record_first_response(interaction, started):
+    elapsed = max(0.0, time.time() - started)
+    stats = response_times.setdefault(_command_name(interaction), [0, 0.0, 0.0])
+    stats[0] += 1
+    stats[1] += elapsed
+    stats[2] = max(stats[2], elapsed)
+
+
+def response_stats():
+    """{command: {"count", "avg_ms", "max_ms"}} for time-to-first-response."""
+    return {
+        name: {"count": count, "avg_ms": round(total / count * 1000, 2), "max_ms": round(worst * 1000, 2)}
+        for name, (count, total, worst) in response_times.items()
+    }
+
+
+async def send(interaction, **kwargs):
+    """Immediate response (validation errors, instant commands), with timing recorded."""
+    started = _created(interaction)
+    await interaction.response.send_message(**kwargs)
+    record_first_response(interaction, started)
+
+
+class Responder:
+    """Handle passed to respond() work functions.
+
+    update() shows an intermediate state (progress, confirmation prompts):
+    it becomes the first response if nothing was sent yet, otherwise it
+    edits the original response. Once the interaction is lost (the defer
+    failed), both are silently dropped so the work can still finish.
+    """
+
+    def __init__(self, interaction, ephemeral=False):
+        self.interaction = interaction
+        self.ephemeral = ephemeral
+        self.started = _created(interaction)
+        self.lost = False
+        self._lock = asyncio.Lock()
+
+    async def _first(self, send_first):
+        await send_first()
+        record_first_response(self.interaction, self.started)
+
+    async def defer(self):
+        async with self._lock:
+            if not self.interaction.response.is_done():
+                await self._first(lambda: self.interaction.response.defer(ephemeral=self.ephemeral, thinking=True))
+
+    async def update(self, embed=None, **kwargs):
+        async with self._lock:
+            if self.lost:
+                return
+            if not self.interaction.response.is_done():
+                await self._first(lambda: self.interaction.response.send_message(embed=embed, ephemeral=self.ephemeral, **kwargs))
+            else:
+                await self.interaction.edit_original_response(embed=embed, **kwargs)
+
+    async def finish(self, result, **kwargs):
+        if isinstance(result, str):
+            result = discord.Embed(description=result, color=0xff0000)
+        await self.update(embed=result, **kwargs)
+
+
+async def respond(interaction, work, *, ephemeral=False, threshold=DEFER_THRESHOLD):
+    """Run work(responder) and answer with the embed it returns.
+
+    Fast work costs a single REST call: the result is the first response.
+    If the work is still running after `threshold` seconds the interaction
+    is deferred (Discord shows its loading state) and the result edits that
+    response when ready. Work that returns None has answered on its own.
+    The work is cancelled only if respond() itself is; if the defer fails
+    it still runs to completion and just goes unanswered.
+    """
+    responder = Responder(interaction, ephemeral)
+    task = asyncio.ensure_future(work(responder))
+    try:
+        done, _ = await asyncio.wait({task}, timeout=threshold)
+        if not done:
+            try:
+                await responder.defer()
+            except Exception as e:
+                # Expired interaction or an HTTP error: only the reply is lost. Cancelling
+                # half-done work (a lockdown mid-way, a transfer between steps) would be worse.
+                responder.lost = True
+                print(f"Could not defer /{_command_name(interaction)}, finishing without a reply: {e}", file=sys.stderr)
+        result = await task
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if result is not None:
+        await responder.finish(result)
+    return responder
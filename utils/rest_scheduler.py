@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# Priority lanes, most urgent first
+SECURITY = 0
+MODERATION = 1
+COSMETIC = 2
+LANE_NAMES = {SECURITY: "security", MODERATION: "moderation", COSMETIC: "cosmetic"}
+
+# Requests in flight per route group. discord.py still honours the real
+# buckets and retries 429s; these keep one burst from eating the global budget.
+ROUTE_LIMITS = {
+    "channel_permissions": 10,
+    "member_roles": 10,
+    "member_edit": 5,
+    "member_kick": 5,
+    "member_ban": 5,
+    "channel_create": 2,
+    "thread_create": 2,
+    "send_message": 5
+}
+DEFAULT_ROUTE_LIMIT = 5
+
+
+class _Job:
+    __slots__ = ("factory", "lane", "route", "key", "future", "enqueued", "task")
+
+    def __init__(self, factory, lane, route, key, future):
+        self.factory = factory
+        self.lane = lane
+        self.route = route
+        self.key = key
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.task = None
+
+
+class _LaneStats:
+    __slots__ = ("depth", "running", "submitted", "completed", "failed", "cancelled", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.depth = self.running = self.submitted = self.completed = self.failed = self.cancelled = 0
+        self.wait_total = self.wait_max = 0.0
+
+
+class RestScheduler:
+    """Bot-wide queue for REST actions.
+
+    Cogs submit zero-argument coroutine factories tagged with a lane and a
+    route group. Each route group has its own concurrency limit. A job only
+    reaches the workers' queue once it holds one of its route's slots;
+    until then it waits in that route's own queue. Workers take the most
+    urgent admitted job first and never block on a full route, so a burst
+    on one route cannot tie up the workers and hold up security actions
+    on the others.
+    """
+
+    def __init__(self, workers=16, route_limits=None):
+        self.workers = workers
+        self.route_limits = {**ROUTE_LIMITS, **(route_limits or {})}
+        # Jobs holding a route slot, ready for a worker
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        # route -> slots taken (admitted or running); route -> heap of jobs waiting for a slot
+        self._in_use = {}
+        self._waiting = {}
+        self._jobs_by_key = {}
+        self._tasks = []
+        self._stats = {lane: _LaneStats() for lane in LANE_NAMES}
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop the workers and cancel every job's future: running, admitted or waiting for a route."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.future.cancel()
+        for waiting in self._waiting.values():
+            for _, _, job in waiting:
+                job.future.cancel()
+        self._waiting.clear()
+        self._in_use.clear()
+
+    def submit(self, factory, lane=MODERATION, route="default", key=None):
+        """Queue factory() and return a future for its result. Cancel the future to drop the action."""
+        self.start()
+        job = _Job(factory, lane, route, key, asyncio.get_running_loop().create_future())
+        job.future.add_done_callback(lambda future: self._on_done(job))
+        if key is not None:
+            self._jobs_by_key.setdefault(key, set()).add(job)
+        stats = self._stats[lane]
+        stats.submitted += 1
+        stats.depth += 1
+        entry = (lane, next(self._sequence), job)
+        if self._in_use.get(route, 0) < self.route_limits.get(route, DEFAULT_ROUTE_LIMIT):
+            self._in_use[route] = self._in_use.get(route, 0) + 1
+            self._queue.put_nowait(entry)
+        else:
+            heapq.heappush(self._waiting.setdefault(route, []), entry)
+        return job.future
+
+    async def run(self, factory, lane=MODERATION, route="default", key=None):
+        return await self.submit(factory, lane, route, key)
+
+    def cancel(self, key):
+        """Cancel every queued or running action submitted with this key."""
+        jobs = self._jobs_by_key.pop(key, ())
+        for job in list(jobs):
+            job.future.cancel()
+        return len(jobs)
+
+    def _on_done(self, job):
+        if job.future.cancelled():
+            self._stats[job.lane].cancelled += 1
+            if job.task is not None:
+                job.task.cancel()
+        if job.key is not None:
+            jobs = self._jobs_by_key.get(job.key)
+            if jobs is not None:
+                jobs.discard(job)
+                if not jobs:
+                    del self._jobs_by_key[job.key]
+
+    def _release(self, route):
+        """Free a slot on the route and hand it to the most urgent job waiting for it."""
+        waiting = self._waiting.get(route)
+        while waiting:
+            entry = heapq.heappop(waiting)
+            job = entry[2]
+            if job.future.done():
+                # Cancelled while waiting
+                self._stats[job.lane].depth -= 1
+                continue
+            self._queue.put_nowait(entry)
+            return
+        if waiting is not None:
+            del self._waiting[route]
+        self._in_use[route] -= 1
+        if not self._in_use[route]:
+            del self._in_use[route]
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            stats = self._stats[job.lane]
+            stats.depth -= 1
+            try:
+                if job.future.done():
+                    continue
+                wait = time.monotonic() - job.enqueued
+                stats.wait_total += wait
+                stats.wait_max = max(stats.wait_max, wait)
+                stats.running += 1
+                job.task = asyncio.create_task(job.factory())
+                try:
+                    result = await asyncio.shield(job.task)
+                except asyncio.CancelledError:
+                    if not job.task.cancelled():
+                        # The worker itself is being shut down; whoever awaits the job must not hang
+                        job.task.cancel()
+                        job.future.cancel()
+                        raise
+                except Exception as e:
+                    stats.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    stats.completed += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    stats.running -= 1
+            finally:
+                self._release(job.route)
+
+    def metrics(self):
+        """Per-lane queue depth, throughput and wait times."""
+        report = {}
+        for lane, stats in self._stats.items():
+            started = stats.completed + stats.failed + stats.running
+            report[LANE_NAMES[lane]] = {
+                "depth": stats.depth,
+                "running": stats.running,
+                "submitted": stats.submitted,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "cancelled": stats.cancelled,
+                "avg_wait_ms": round(stats.wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(stats.wait_max * 1000, 2)
+            }
+        return report
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+# Seconds the loop must be blocked to count as a stall (main.py reads it from STALL_WATCHDOG, in ms)
+STALL_THRESHOLD = 0.1
+# Seconds between report rewrites while stalls keep coming in
+REPORT_SECONDS = 60
+# Frames kept per captured stack
+STACK_DEPTH = 30
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(THIS_FILE))
+
+
+class StallSite:
+    __slots__ = ("stalls", "total", "worst", "stack")
+
+    def __init__(self):
+        self.stalls = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack = None
+
+
+def callback_frames(stack):
+    """The frames of the running callback: below the loop's Handle._run is only the loop and bot.run."""
+    start = 0
+    for i, frame in enumerate(stack):
+        if frame.name == "_run" and frame.filename.endswith(os.path.join("asyncio", "events.py")):
+            start = i + 1
+    return stack[start:] or stack
+
+
+def call_site(stack):
+    """Innermost frame of our own code (cogs, utils, main) in the running callback, else the innermost frame."""
+    for frame in reversed(callback_frames(stack)):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(PROJECT_ROOT + os.sep) and "site-packages" not in path and path != THIS_FILE:
+            return f"{os.path.relpath(path, PROJECT_ROOT)}:{frame.lineno or '?'} in {frame.name}"
+    frame = stack[-1]
+    # A frame sampled mid-instruction from another thread can report no line number
+    return f"{frame.filename}:{frame.lineno or '?'} in {frame.name}"
+
+
+class StallWatchdog:
+    """Finds the code that blocks the event loop.
+
+    A callback on the loop records a heartbeat every `interval` seconds. A
+    sampler thread checks it on the same period; once the heartbeat is more
+    than `threshold` late, it captures the loop thread's Python stack on every
+    check until the loop comes back. Each stall is attributed to the call
+    site seen in most of its samples, and stalls are aggregated by site into
+    a report rewritten at most every REPORT_SECONDS and on stop().
+
+    A C call that never releases the GIL cannot be sampled while it runs;
+    such stalls are still counted, under "no sample".
+
+    Opt-in: costs one loop callback per interval and an idle thread.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD, report_path="data/stall_report.txt", interval=None):
+        self.threshold = threshold
+        self.interval = interval or threshold / 4
+        self.report_path = report_path
+        self.sites = {}
+        self.stalls = 0
+        self.blocked = 0.0
+        self.started_at = None
+        self._loop = None
+        self._thread_id = None
+        self._last_beat = 0.0
+        self._handle = None
+        # (beat the stall started after, duration), appended by the loop and drained by the sampler
+        self._ended = []
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._dirty = False
+
+    def start(self):
+        """Watch the running event loop; call from a coroutine on it."""
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self.started_at = datetime.now()
+        self._last_beat = time.perf_counter()
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._sampler = threading.Thread(target=self._sample_loop, name="stall-watchdog", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.write_report()
+
+    def _beat(self):
+        now = time.perf_counter()
+        late = now - self._last_beat - self.interval
+        if late >= self.threshold:
+            self._ended.append((self._last_beat, late))
+        self._last_beat = now
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _sample_loop(self):
+        last_report = time.monotonic()
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            if time.perf_counter() - beat - self.interval >= self.threshold:
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    stack = traceback.extract_stack(frame, limit=STACK_DEPTH)
+                    self._samples.setdefault(beat, []).append(stack)
+                    del frame
+            self._collect()
+            if self._dirty and time.monotonic() - last_report >= REPORT_SECONDS:
+                self.write_report()
+                last_report = time.monotonic()
+        self._collect()
+
+    def _collect(self):
+        while self._ended:
+            beat, duration = self._ended.pop(0)
+            samples = self._samples.pop(beat, [])
+            if samples:
+                sites = Counter(call_site(stack) for stack in samples)
+                site = sites.most_common(1)[0][0]
+                stack = next(stack for stack in samples if call_site(stack) == site)
+            else:
+                site, stack = "no sample (the loop held the GIL throughout, or the stall was too short)", None
+            with self._lock:
+                entry = self.sites.get(site)
+                if entry is None:
+                    entry = self.sites[site] = StallSite()
+                entry.stalls += 1
+                entry.total += duration
+                if duration >= entry.worst:
+                    entry.worst = duration
+                    entry.stack = stack or entry.stack
+                self.stalls += 1
+                self.blocked += duration
+                self._dirty = True
+            print(f"Event loop stalled {duration * 1000:.0f}ms at {site}", file=sys.stderr)
+
+    def report(self):
+        with self._lock:
+            sites = sorted(self.sites.items(), key=lambda item: -item[1].total)
+            lines = [
+                f"Event loop stalls over {self.threshold * 1000:.0f}ms since {self.started_at:%Y-%m-%d %H:%M:%S}: "
+                f"{self.stalls} stall(s), {self.blocked:.2f}s blocked",
+                ""
+            ]
+            for site, entry in sites:
+                lines.append(
+                    f"{entry.stalls:>5} stall(s) {entry.total * 1000:>9.0f}ms total {entry.worst * 1000:>7.0f}ms worst  {site}"
+                )
+                if entry.stack:
+                    frames = traceback.format_list(callback_frames(entry.stack))
+                    lines.extend("      " + line for line in "".join(frames).rstrip().splitlines())
+                lines.append("")
+        return "\n".join(lines)
+
+    def write_report(self):
+        if not self.report_path or self.started_at is None:
+            return
+        text = self.report()
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        tmp_path = f"{self.report_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.report_path)
+        self._dirty = False
@@ -0,0 +1,165 @@
+import re
+import unicodedata
+
+# Lookalike letters from other scripts and common leetspeak, mapped onto ASCII
+CONFUSABLES = {
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "х": "x", "у": "y", "к": "k",
+    "м": "m", "т": "t", "н": "h", "в": "b", "і": "i", "ј": "j", "ѕ": "s", "ԁ": "d",
+    "ԛ": "q", "ԝ": "w", "ɡ": "g", "ο": "o", "α": "a", "ε": "e", "ι": "i", "κ": "k",
+    "ν": "v", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ß": "ss", "ø": "o", "ł": "l",
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g"
+}
+# Leetspeak punctuation; mapped one-to-one after the rest, and still a word boundary ("ass!" ends at the "!")
+SYMBOLS = {"@": "a", "$": "s", "!": "i", "|": "l", "+": "t"}
+# Zero-width characters people use to split words
+INVISIBLE = ["\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad"]
+_TABLE = str.maketrans({**CONFUSABLES, **{ch: None for ch in INVISIBLE}})
+_SYMBOL_TABLE = str.maketrans(SYMBOLS)
+# Most messages have none of them; a search is cheaper than a second translate
+_SYMBOL_RE = re.compile("[" + re.escape("".join(SYMBOLS)) + "]")
+
+# Prefix marking a blacklist entry that also matches inside longer words
+SUBSTRING_PREFIX = "*"
+
+
+def _fold(text):
+    """text with case, accents, lookalikes and invisibles normalised, but leetspeak punctuation kept."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    if not text.isascii():
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_TABLE)
+
+
+def _map_symbols(folded):
+    return folded.translate(_SYMBOL_TABLE) if _SYMBOL_RE.search(folded) else folded
+
+
+def normalize(text):
+    return _map_symbols(_fold(text))
+
+
+class WordFilter:
+    """Aho-Corasick automaton over a guild's blacklisted words.
+
+    Matching walks the message once, so the cost per message does not depend
+    on how many words are blacklisted. Entries match whole words only ("ass"
+    does not match "class"); an entry written as "*ass" matches anywhere. Adding a word extends the trie in
+    place; removing one only deactivates it. Failure links are recomputed
+    lazily before the next match, and the trie is rebuilt from scratch once
+    removed words outnumber active ones.
+    """
+
+    def __init__(self, words=()):
+        self.words = set()
+        self._reset()
+        for word in words:
+            self.add(word)
+
+    def _reset(self):
+        self._goto = [{}]
+        self._word_at = [None]
+        self._fail = [0]
+        self._match = [None]
+        self._removed = 0
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        term, _ = self._parse(word)
+        return term in self.words or SUBSTRING_PREFIX + term in self.words
+
+    @staticmethod
+    def _parse(word):
+        """(normalised term, entry as stored): the entry keeps the substring prefix, if any."""
+        word = word.strip()
+        substring = word.startswith(SUBSTRING_PREFIX)
+        term = normalize(word.lstrip(SUBSTRING_PREFIX)).strip()
+        return term, SUBSTRING_PREFIX + term if substring else term
+
+    def add(self, word):
+        term, entry = self._parse(word)
+        if not term or entry in self.words:
+            return False
+        node = 0
+        for ch in term:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._word_at.append(None)
+                self._goto[node][ch] = child
+            node = child
+        previous = self._word_at[node]
+        if previous is not None and previous not in self.words:
+            # Reusing a removed word's node: it is no longer a tombstone
+            self._removed -= 1
+        # One entry per term: adding "*ass" replaces "ass" and the other way round
+        self.words.discard(previous)
+        self.words.add(entry)
+        self._word_at[node] = entry
+        self._dirty = True
+        return True
+
+    def remove(self, word):
+        term, _ = self._parse(word)
+        entry = next((e for e in (term, SUBSTRING_PREFIX + term) if e in self.words), None)
+        if entry is None:
+            return False
+        self.words.discard(entry)
+        self._removed += 1
+        if self._removed > len(self.words):
+            words = self.words
+            self.words = set()
+            self._reset()
+            for kept in words:
+                self.add(kept)
+        self._dirty = True
+        return True
+
+    def _build(self):
+        goto, word_at = self._goto, self._word_at
+        fail = [0] * len(goto)
+        # Active entries ending at each node, following failure links: (entry, term length, matches inside words)
+        match = [()] * len(goto)
+        for node, entry in enumerate(word_at):
+            if entry in self.words:
+                substring = entry.startswith(SUBSTRING_PREFIX)
+                match[node] = ((entry, len(entry) - substring, substring),)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                match[child] += match[fail[child]]
+                queue.append(child)
+        self._fail, self._match = fail, match
+        self._dirty = False
+
+    def find(self, text):
+        """First blacklisted entry in text (after normalisation), or None."""
+        if not self.words:
+            return None
+        if self._dirty:
+            self._build()
+        goto, fail, match = self._goto, self._fail, self._match
+        folded = _fold(text)
+        state = 0
+        for end, ch in enumerate(_map_symbols(folded)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not match[state]:
+                continue
+            for entry, length, substring in match[state]:
+                if substring:
+                    return entry
+                # Whole word: no letter or digit either side (leetspeak punctuation counts as a boundary)
+                start = end - length + 1
+                if (start == 0 or not folded[start - 1].isalnum()) and (end + 1 == len(folded) or not folded[end + 1].isalnum()):
+                    return entry
+        return None